@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""远程日志压缩传输对比
+
+对同一份合成日志分别模拟四种传输模式，统计线上字节数和两端CPU耗时：
+- none: 原始字节，本地只做按行切分
+- ssh:  SSH传输层zlib压缩（与paramiko一致，每个32KB数据包做一次Z_FULL_FLUSH）
+- gzip: 远程gzip -1，本地流式解压后切分
+- zstd: 远程zstd -1，本地流式解压后切分（需要安装zstandard）
+"""
+import argparse
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.compression import LineSplitter, get_decompressor, zstandard
+from synthetic import generate_logs
+
+PACKET_SIZE = 32768
+RECV_SIZE = 65536
+
+
+def chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def measure(func, repeat: int):
+    """返回(结果, 平均CPU秒数)"""
+    start = time.process_time()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.process_time() - start) / repeat
+
+
+def split_plain(raw: bytes):
+    splitter = LineSplitter()
+    for chunk in chunks(raw, RECV_SIZE):
+        splitter.feed(chunk)
+    return splitter.close()
+
+
+def ssh_compress(raw: bytes) -> list:
+    compressor = zlib.compressobj()
+    return [compressor.compress(p) + compressor.flush(zlib.Z_FULL_FLUSH) for p in chunks(raw, PACKET_SIZE)]
+
+
+def ssh_decompress(packets: list):
+    decompressor = zlib.decompressobj()
+    splitter = LineSplitter()
+    for packet in packets:
+        splitter.feed(decompressor.decompress(packet))
+    return splitter.close()
+
+
+def gzip_compress(raw: bytes) -> bytes:
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def stream_decompress(mode: str, payload: bytes):
+    decompressor = get_decompressor(mode)
+    splitter = LineSplitter()
+    for chunk in chunks(payload, RECV_SIZE):
+        splitter.feed(decompressor.decompress(chunk))
+    splitter.feed(decompressor.flush())
+    return splitter.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='远程日志压缩传输对比')
+    parser.add_argument('--lines', type=int, default=20000, help='日志行数')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='错误事件占比')
+    parser.add_argument('--repeat', type=int, default=5, help='每种模式重复次数')
+    args = parser.parse_args()
+    
+    raw = generate_logs(args.lines, args.error_rate).encode('utf-8')
+    expected = split_plain(raw)
+    results = []
+    
+    lines, decode_cpu = measure(lambda: split_plain(raw), args.repeat)
+    results.append(('none', len(raw), 0.0, decode_cpu, lines))
+    
+    packets, encode_cpu = measure(lambda: ssh_compress(raw), args.repeat)
+    lines, decode_cpu = measure(lambda: ssh_decompress(packets), args.repeat)
+    results.append(('ssh', sum(len(p) for p in packets), encode_cpu, decode_cpu, lines))
+    
+    payload, encode_cpu = measure(lambda: gzip_compress(raw), args.repeat)
+    lines, decode_cpu = measure(lambda: stream_decompress('gzip', payload), args.repeat)
+    results.append(('gzip', len(payload), encode_cpu, decode_cpu, lines))
+    
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=1)
+        payload, encode_cpu = measure(lambda: compressor.compress(raw), args.repeat)
+        lines, decode_cpu = measure(lambda: stream_decompress('zstd', payload), args.repeat)
+        results.append(('zstd', len(payload), encode_cpu, decode_cpu, lines))
+    
+    mb = len(raw) / 1024 / 1024
+    print("📊 远程日志压缩传输对比")
+    print("=" * 72)
+    print(f"原始日志: {args.lines} 行, {len(raw)} 字节 ({mb:.2f} MB)")
+    print(f"{'模式':<6}{'线上字节':>12}{'压缩率':>10}{'远程压缩ms':>14}{'本地解压切分ms':>18}")
+    for mode, wire_bytes, encode_cpu, decode_cpu, lines in results:
+        if lines != expected:
+            print(f"❌ {mode} 模式解压后的日志与原始日志不一致")
+            return 1
+        print(f"{mode:<6}{wire_bytes:>12}{wire_bytes / len(raw):>10.1%}"
+              f"{encode_cpu * 1000:>14.2f}{decode_cpu * 1000:>18.2f}")
+    if zstandard is None:
+        print("ℹ️ 未安装zstandard，跳过zstd模式")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
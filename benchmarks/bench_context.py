@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""错误上下文压缩：通知大小与耗时
+
+对几类堆栈分别聚合错误上下文，对比enable_smart_truncation关闭（按行数截取后按字符截断）和开启
+（ContextCompressor合并重复帧、保留Caused by链、按行数预算压缩）时的上下文字节数、行数、
+是否包含根因（最后一个Caused by或Python异常类型行）以及每次耗时：
+
+    python benchmarks/bench_context.py
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.monitor import DockerLogMonitor
+from core.settings import Settings
+from fakes import FakeDockerClient
+from synthetic import LogGenerator
+
+STAMP = '2024-09-04T15:00:00.000000000Z '
+
+
+def java_chain(depth: int = 80) -> tuple:
+    """Spring风格的多层Caused by，根因在最后"""
+    lines = ['12:00:00.000 [http-nio-8080-exec-7] ERROR c.e.web.OrderController - Request failed',
+             'org.springframework.web.util.NestedServletException: Request processing failed']
+    lines += [f'\tat org.springframework.web.servlet.Frame{i}.invoke(Frame{i}.java:{100 + i})' for i in range(depth)]
+    lines += ['Caused by: org.springframework.dao.DataAccessResourceFailureException: could not acquire lock']
+    lines += [f'\tat org.hibernate.internal.Session{i}.flush(Session{i}.java:{200 + i})' for i in range(depth // 2)]
+    lines += ['\t... 86 more', 'Caused by: java.sql.SQLException: Lock wait timeout exceeded']
+    lines += [f'\tat com.mysql.cj.jdbc.Driver{i}.execute(Driver{i}.java:{300 + i})' for i in range(depth // 4)]
+    lines += ['\t... 127 more']
+    return lines, 'java.sql.SQLException'
+
+
+def java_recursion(depth: int = 900) -> tuple:
+    lines = ['12:00:00.000 [main] ERROR c.e.TreeService - Tree walk failed', 'java.lang.StackOverflowError: null']
+    lines += ['\tat com.example.Tree.walk(Tree.java:42)', '\tat com.example.Tree.visit(Tree.java:17)'] * (depth // 2)
+    return lines, '... 以上2帧'
+
+
+def python_recursion(depth: int = 300) -> tuple:
+    lines = ['[ERROR] request failed', 'Traceback (most recent call last):',
+             '  File "/app/main.py", line 10, in <module>', '    main()']
+    lines += ['  File "/app/tree.py", line 5, in walk', '    return walk(node.child)'] * depth
+    lines += ['RecursionError: maximum recursion depth exceeded']
+    return lines, 'RecursionError'
+
+
+def synthetic_java(seed: int = 1) -> tuple:
+    lines = [line.split(' ', 1)[1] for line in LogGenerator(seed).java_traceback()]
+    return lines, 'Caused by'
+
+
+CASES = {
+    'java_chain': java_chain,
+    'java_recursion': java_recursion,
+    'python_recursion': python_recursion,
+    'synthetic_java': synthetic_java,
+}
+
+
+def run(case: str, smart: bool, repeat: int) -> dict:
+    lines, root_cause = CASES[case]()
+    logs = [STAMP + line for line in lines] + [STAMP + 'INFO request completed']
+    settings = Settings({'context_settings': {'enable_smart_truncation': smart}})
+    monitor = DockerLogMonitor(settings, docker_client=FakeDockerClient())
+    start_idx, _ = monitor.find_error_boundaries(logs, 0)
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        context = monitor.aggregate_error_context('app', logs, start_idx)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {
+        'bytes': len(context.encode('utf-8')),
+        'lines': context.count('\n') + 1,
+        'root_cause': root_cause in context,
+        'us': elapsed * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='错误上下文压缩：通知大小与耗时')
+    parser.add_argument('--repeat', type=int, default=200, help='每种情况重复聚合的次数')
+    args = parser.parse_args()
+    
+    print("📊 错误上下文: 截断 vs 压缩")
+    print("=" * 78)
+    print(f"{'堆栈':<18}{'方式':<10}{'字节':>8}{'行数':>8}{'根因':>8}{'µs/次':>10}")
+    for case in CASES:
+        for smart in (False, True):
+            result = run(case, smart, args.repeat)
+            print(f"{case:<18}{'compress' if smart else 'truncate':<10}{result['bytes']:>8}{result['lines']:>8}"
+                  f"{'✅' if result['root_cause'] else '❌':>8}{result['us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""故障关联对通知数量的影响
+
+模拟共享数据库故障：多台服务器上的所有副本在故障期间陆续输出同一错误，同时有少量互不相关的零星错误。
+每台服务器使用一个RemoteDockerLogMonitor（日志由替身投放），按检查间隔推进模拟时钟，
+对比直接发送和经过IncidentCorrelator后的通知数：
+
+    python benchmarks/bench_correlation.py --servers 6 --replicas 5 --ticks 120
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.correlation import IncidentCorrelator
+from core.remote_monitor import RemoteDockerLogMonitor
+from core.settings import Settings
+from fakes import FakeDockerClient, FakeRemoteDockerManager
+
+CHECK_INTERVAL = 5
+
+_OUTAGE = "ERROR sqlalchemy.exc.OperationalError: could not connect to server db-main:5432: Connection refused (pid {pid})"
+_NOISE = [
+    "ERROR Failed to render template invoice_{n}.html: missing variable",
+    "ERROR Payment gateway timeout after {n}ms for order",
+    "ERROR Unable to resize image upload: unsupported format",
+    "WARN Cache eviction storm: {n} keys dropped",
+]
+
+
+def build(servers: int, replicas: int, settings: Settings):
+    manager = FakeRemoteDockerManager()
+    monitors = []
+    for s in range(servers):
+        name = f"node-{s + 1}"
+        for r in range(replicas):
+            manager.add_container(name, f"api-{r + 1}")
+        monitor = RemoteDockerLogMonitor(settings, {'name': name, 'host': name}, docker_client=FakeDockerClient())
+        monitor.set_remote_manager(manager)
+        monitors.append(monitor)
+    return manager, monitors
+
+
+def run(servers: int, replicas: int, ticks: int, correlate: bool, seed: int = 7) -> dict:
+    settings = Settings({'error_threshold': 3, 'cooldown_minutes': 30, 'correlation': {'window': 600}})
+    manager, monitors = build(servers, replicas, settings)
+    correlator = IncidentCorrelator(settings) if correlate else None
+    rng = random.Random(seed)
+    # 故障在第10轮开始，持续三分之一的时间，各副本在前几轮陆续受影响
+    outage = range(10, 10 + ticks // 3)
+    affected_from = {feed_key: outage.start + rng.randint(0, 6) for feed_key in manager.feeds}
+    
+    events = notifications = 0
+    elapsed = 0.0
+    base = time.time()
+    for tick in range(ticks):
+        now = base + tick * CHECK_INTERVAL
+        for key, feed in manager.feeds.items():
+            lines = []
+            if tick in outage and tick >= affected_from[key]:
+                lines += [_OUTAGE.format(pid=rng.randint(100, 9999)) for _ in range(rng.randint(1, 3))]
+            if rng.random() < 0.01:
+                lines.append(rng.choice(_NOISE).format(n=rng.randint(1, 999)))
+            feed.push([f"2024-01-01T00:00:00.{tick:09d}Z {line}" for line in lines])
+        
+        tick_events = []
+        for monitor in monitors:
+            monitor.clock = lambda: now
+            for container in monitor.get_monitored_containers():
+                tick_events.extend(monitor.process_container_logs(container))
+        events += len(tick_events)
+        
+        if correlator:
+            start = time.perf_counter()
+            tick_events = correlator.process(tick_events, now)
+            elapsed += time.perf_counter() - start
+        notifications += len(tick_events)
+    
+    return {'events': events, 'notifications': notifications, 'us_per_event': elapsed / max(events, 1) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='故障关联对通知数量的影响')
+    parser.add_argument('--servers', type=int, default=6, help='服务器数')
+    parser.add_argument('--replicas', type=int, default=5, help='每台服务器的副本数')
+    parser.add_argument('--ticks', type=int, default=120, help=f'检查轮数（每轮{CHECK_INTERVAL}秒）')
+    args = parser.parse_args()
+    
+    print("📊 故障关联: 通知数量")
+    print("=" * 48)
+    print(f"{args.servers}台服务器 × {args.replicas}个副本，{args.ticks}轮检查")
+    print(f"{'方式':<10}{'事件数':>10}{'通知数':>10}{'µs/事件':>12}")
+    for correlate in (False, True):
+        result = run(args.servers, args.replicas, args.ticks, correlate)
+        label = 'correlate' if correlate else 'direct'
+        print(f"{label:<10}{result['events']:>10}{result['notifications']:>10}{result['us_per_event']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
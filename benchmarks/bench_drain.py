@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""错误指纹对比：正则标准化 vs Drain模板
+
+生成由少量错误模板产生、只在用户名、路径、引号内的值、耗时等处不同的错误日志，对比两种指纹：
+- regex: 数字和十六进制替换后截取前100个字符
+- drain: DrainMiner模板编号
+统计产生的不同指纹数（即error_counts条目数）和每行耗时：
+
+    python benchmarks/bench_drain.py --lines 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.monitor import DockerLogMonitor
+from core.settings import Settings
+from fakes import FakeDockerClient
+
+_USERS = ['alice', 'bob', 'carol', 'dave', 'erin', 'frank', 'grace', 'heidi', 'ivan', 'judy', 'mallory', 'oscar']
+_WORDS = ['orders', 'billing', 'profile', 'cart', 'search', 'inventory', 'reports', 'session', 'upload', 'export']
+
+_TEMPLATES = [
+    "ERROR Failed to send email to {user}@example.com: SMTP {code}",
+    "ERROR Worker {word} crashed with exit status {code}, restarting",
+    "ERROR Deadlock detected while updating {word} for {user}, transaction rolled back",
+    "ERROR Invalid token for {user}: signature mismatch",
+    "ERROR Login failed for user '{user}' from /home/{user}/.ssh/{word}",
+    "ERROR Permission denied opening /var/data/{word}/{user}.json",
+    "ERROR Request to /api/{word}/{user} failed: upstream returned {code} after {ms}ms",
+    "ERROR Unable to parse field \"{word}\" in payload from {user}",
+    "ERROR Task {word}-sync for tenant {user} raised KeyError: '{word}'",
+    "WARN Slow query on table {word} by {user}: {ms}ms",
+    "ERROR Cache miss storm on key {word}:{user}:{code}",
+    "ERROR Connection reset by peer {ip} while writing {word}",
+]
+
+
+def generate(lines: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(lines):
+        message = rng.choice(_TEMPLATES).format(
+            user=rng.choice(_USERS), word=rng.choice(_WORDS), code=rng.choice([500, 502, 503, 504]),
+            ms=rng.randint(100, 30000), ip=f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        )
+        out.append(f"2024-01-01T00:00:{i % 60:02d}.{i:09d}Z {message}")
+    return out
+
+
+def run(mode: str, lines: list) -> dict:
+    monitor = DockerLogMonitor(Settings({'fingerprint': {'mode': mode}}), docker_client=FakeDockerClient())
+    start = time.perf_counter()
+    keys = {monitor.get_error_key('app', line) for line in lines}
+    elapsed = time.perf_counter() - start
+    return {'mode': mode, 'keys': len(keys), 'us_per_line': elapsed / len(lines) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='错误指纹对比：正则标准化 vs Drain模板')
+    parser.add_argument('--lines', type=int, default=100000, help='错误日志行数')
+    args = parser.parse_args()
+    
+    lines = generate(args.lines)
+    print("📊 错误指纹对比")
+    print("=" * 48)
+    print(f"错误日志 {args.lines} 行，来自 {len(_TEMPLATES)} 个模板")
+    print(f"{'方式':<8}{'指纹数':>10}{'µs/行':>12}")
+    for mode in ('regex', 'drain'):
+        result = run(mode, lines)
+        print(f"{result['mode']:<8}{result['keys']:>10}{result['us_per_line']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""紧急告警端到端延迟：从日志写入到发出告警
+
+每个容器每轮输出noise_lines行访问日志，每隔period秒（各容器错开）写入一次OutOfMemoryError，
+写入时间记在日志行中。按主循环的方式运行（轮询模式每轮依次处理各容器、本轮结束后统一发送；
+分片模式由工作进程处理，主进程收集），记录每次告警的时间。每次写入的延迟为同一容器在写入之后第一次告警的时间差，
+运行结束时仍未告警的写入计为漏报。对比priority关闭（error_threshold为3和1）与开启时的延迟和告警覆盖率：
+
+    python benchmarks/bench_latency.py --containers 20 --duration 10
+    python benchmarks/bench_latency.py --shards 2
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.monitor import DockerLogMonitor
+from core.priority import PriorityLane
+from core.settings import Settings
+from core.sharding import ShardCoordinator
+from fakes import FakeDockerClient
+from synthetic import LogGenerator
+
+
+class _ScheduledFeed:
+    """每次读取返回全部噪声（忽略tail）和计划写入时间已到的紧急错误，写入时间记在行尾"""
+    
+    def __init__(self, noise, times):
+        self.noise = noise
+        self.times = times
+        self.next = 0
+    
+    def read(self, tail: int = 500):
+        lines = self.noise
+        now = time.time()
+        while self.next < len(self.times) and self.times[self.next] <= now:
+            written = self.times[self.next]
+            stamp = datetime.fromtimestamp(written, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f000Z')
+            lines = lines + [
+                f"{stamp} FATAL [worker-{self.next}] java.lang.OutOfMemoryError: Java heap space written={written:.6f}",
+                f"{stamp}     at com.example.cache.Loader.load(Loader.java:88)",
+                f"{stamp}     at com.example.cache.Loader.refresh(Loader.java:42)",
+            ]
+            self.next += 1
+        return lines
+
+
+def write_times(bench: dict) -> dict:
+    """各容器计划写入紧急错误的时间"""
+    containers, period = bench['containers'], bench['period']
+    schedule = {}
+    for i in range(containers):
+        offset = bench['start'] + period * (i + 0.5) / containers
+        schedule[f'app-{i}'] = [offset + period * k for k in range(int(bench['duration'] / period))]
+    return schedule
+
+
+def latency_monitor(settings: Settings, priority=None) -> DockerLogMonitor:
+    """按配置的bench段构造使用替身的本地监控器，也用作分片模式的local_factory"""
+    bench = settings.get('bench')
+    gen = LogGenerator(seed=7)
+    noise = [line for _ in range(bench['noise_lines']) for line in gen.nginx_access()]
+    client = FakeDockerClient()
+    for name, times in write_times(bench).items():
+        client.add_container(name, _ScheduledFeed(noise, times))
+    return DockerLogMonitor(settings, docker_client=client, priority=priority)
+
+
+def build_settings(args, priority: bool, threshold: int, start: float) -> Settings:
+    return Settings({
+        'containers': [f'app-{i}' for i in range(args.containers)],
+        'log_levels': ['ERROR', 'FATAL'],
+        'error_threshold': threshold,
+        'cooldown_minutes': 0,
+        'check_interval': args.check_interval,
+        'context_settings': {'buffer_size': args.noise_lines * 2},
+        'priority': {'enabled': priority, 'cooldown': 0},
+        'config_reload': {'enabled': False},
+        'bench': {'containers': args.containers, 'noise_lines': args.noise_lines, 'period': args.period,
+                  'duration': args.duration, 'start': start},
+    })
+
+
+def run_polling(settings: Settings, alerts: list, end: float):
+    """与主循环相同：依次处理各容器，本轮结束后发送，然后等待check_interval"""
+    def on_alert(event):
+        alerts.append((event['container'], time.time()))
+    
+    monitor = latency_monitor(settings, PriorityLane(settings, sink=on_alert))
+    while time.time() < end:
+        errors = []
+        for name in monitor.get_monitored_containers():
+            errors.extend(monitor.process_container_logs(name))
+        for event in errors:
+            on_alert(event)
+        time.sleep(settings.check_interval)
+
+
+def run_sharded(settings: Settings, alerts: list, end: float, workers: int):
+    """与分片模式的主循环相同：收集候选事件后发送，等待期间发送工作进程上报的紧急告警"""
+    coordinator = ShardCoordinator(settings, workers, local_factory=latency_monitor)
+    try:
+        if not coordinator.wait_ready(timeout=60):
+            raise RuntimeError("工作进程启动超时")
+        while time.time() < end:
+            for event in coordinator.collect() + coordinator.take_priority():
+                alerts.append((event['container'], time.time()))
+            deadline = time.monotonic() + settings.check_interval
+            while time.monotonic() < deadline:
+                remaining = deadline - time.monotonic()
+                if settings.get('priority.enabled'):
+                    events = coordinator.take_priority(remaining)
+                else:
+                    time.sleep(remaining)
+                    events = []
+                for event in events:
+                    alerts.append((event['container'], time.time()))
+    finally:
+        coordinator.stop()
+
+
+def run(args, priority: bool, threshold: int, workers: int) -> dict:
+    # 工作进程启动需要时间，写入计划从启动之后开始
+    start = time.time() + (3.0 if workers else 0.5)
+    settings = build_settings(args, priority, threshold, start)
+    end = start + args.duration + args.check_interval * 2
+    alerts = []
+    if workers:
+        run_sharded(settings, alerts, end, workers)
+    else:
+        run_polling(settings, alerts, end)
+    
+    by_container = {}
+    for name, at in sorted(alerts, key=lambda alert: alert[1]):
+        by_container.setdefault(name, []).append(at)
+    latencies, injected = [], 0
+    for name, times in write_times(settings.get('bench')).items():
+        for written in times:
+            injected += 1
+            alerted = next((at for at in by_container.get(name, []) if at >= written), None)
+            if alerted is not None:
+                latencies.append(alerted - written)
+    
+    latencies.sort()
+    
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float('nan')
+    
+    return {'injected': injected, 'covered': len(latencies), 'alerts': len(alerts),
+            'p50': percentile(0.5), 'p99': percentile(0.99), 'max': percentile(1.0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='紧急告警端到端延迟')
+    parser.add_argument('--containers', type=int, default=20, help='容器数')
+    parser.add_argument('--noise-lines', type=int, default=2000, help='每个容器每次读取的噪声行数')
+    parser.add_argument('--period', type=float, default=2.0, help='每个容器写入紧急错误的间隔（秒）')
+    parser.add_argument('--check-interval', type=float, default=2.0, help='check_interval（秒）')
+    parser.add_argument('--duration', type=float, default=10.0, help='每种配置写入紧急错误的时长（秒）')
+    parser.add_argument('--shards', type=int, default=2, help='分片模式的工作进程数，0表示不测分片模式')
+    args = parser.parse_args()
+    
+    cases = [('轮询', False, 3, 0), ('轮询', False, 1, 0), ('轮询', True, 3, 0)]
+    if args.shards:
+        cases += [('分片', False, 1, args.shards), ('分片', True, 3, args.shards)]
+    
+    print(f"📊 紧急告警延迟: {args.containers} 个容器, 每次读取 {args.noise_lines} 行噪声, "
+          f"每 {args.period}秒写入一次, check_interval={args.check_interval}秒")
+    print("=" * 78)
+    print(f"{'模式':<8}{'priority':>10}{'阈值':>6}{'告警/写入':>14}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode, priority, threshold, workers in cases:
+        result = run(args, priority, threshold, workers)
+        print(f"{mode:<8}{'on' if priority else 'off':>10}{threshold:>6}"
+              f"{result['covered']:>8}/{result['injected']:<5}"
+              f"{result['p50']:>10.1f}{result['p99']:>10.1f}{result['max']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
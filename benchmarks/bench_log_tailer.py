@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""直接读取json-file日志的吞吐基准测试
+
+在临时目录中为每个容器生成json-file格式的日志文件，按批追加并按大小轮转（.log -> .log.1），
+通过log_source=json_file的DockerLogMonitor读取，统计：
+- 读取吞吐（行/秒）以及读到的行数是否与写入一致（轮转时不丢行、不重复）
+- 没有新日志时每个容器每轮的开销（只做一次stat）
+
+不需要Docker守护进程；Docker API方式的守护进程开销无法在这里测量，只作为接入后的对照：
+
+    python benchmarks/bench_log_tailer.py --containers 16 --lines 20000 --rotate-bytes 1048576
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.monitor import DockerLogMonitor
+from core.settings import Settings
+from fakes import FakeDockerClient
+from synthetic import generate_scenario
+
+BENCH_CONFIG = {
+    'local_monitoring': {'enabled': True, 'log_source': 'json_file'},
+    'log_levels': ['ERROR', 'WARN'],
+    'error_threshold': 3,
+    'context_settings': {'buffer_size': 1000},
+}
+
+
+class JsonFileWriter:
+    """按json-file驱动的格式追加日志，超过rotate_bytes时轮转"""
+    
+    def __init__(self, path: str, rotate_bytes: int, max_files: int = 3):
+        self.path = path
+        self.rotate_bytes = rotate_bytes
+        self.max_files = max_files
+        self.rotations = 0
+        self.file = open(path, 'ab')
+    
+    def write(self, lines):
+        data = b''.join(
+            json.dumps({'log': message + '\n', 'stream': 'stdout', 'time': stamp}).encode() + b'\n'
+            for stamp, _, message in (line.partition(' ') for line in lines)
+        )
+        self.file.write(data)
+        self.file.flush()
+        if self.rotate_bytes and self.file.tell() > self.rotate_bytes:
+            self.file.close()
+            for i in range(self.max_files - 1, 0, -1):
+                source = self.path if i == 1 else f"{self.path}.{i - 1}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i}")
+            self.file = open(self.path, 'ab')
+            self.rotations += 1
+    
+    def close(self):
+        self.file.close()
+
+
+def run(containers: int, lines: int, batch: int, rotate_bytes: int, error_rate: float) -> dict:
+    pool = generate_scenario('mixed', 5000, error_rate)
+    with tempfile.TemporaryDirectory() as directory:
+        client = FakeDockerClient()
+        writers = {}
+        for i in range(containers):
+            name = f'app-{i}'
+            path = os.path.join(directory, f'{name}-json.log')
+            writers[name] = JsonFileWriter(path, rotate_bytes)
+            client.add_container(name, log_path=path)
+        
+        config = {**BENCH_CONFIG, 'containers': list(writers)}
+        monitor = DockerLogMonitor(Settings(config), docker_client=client)
+        # 空文件接入，之后每轮追加一批再读取
+        for name in writers:
+            monitor.buffer_new_logs(name)
+        
+        written = 0
+        elapsed = 0.0
+        position = 0
+        while written < lines:
+            count = min(batch, lines - written)
+            chunk = [pool[(position + j) % len(pool)] for j in range(count)]
+            position += count
+            for writer in writers.values():
+                writer.write(chunk)
+            written += count
+            
+            start = time.perf_counter()
+            for name in writers:
+                monitor.buffer_new_logs(name)
+            elapsed += time.perf_counter() - start
+        
+        # 空闲轮询
+        idle_rounds = 200
+        start = time.perf_counter()
+        for _ in range(idle_rounds):
+            for name in writers:
+                monitor.buffer_new_logs(name)
+        idle = (time.perf_counter() - start) / (idle_rounds * containers)
+        
+        rotations = sum(writer.rotations for writer in writers.values())
+        for writer in writers.values():
+            writer.close()
+        monitor.log_tailer.close()
+    
+    return {
+        'lines': written * containers,
+        'read': monitor.lines_ingested,
+        'seconds': elapsed,
+        'lines_per_sec': monitor.lines_ingested / elapsed,
+        'idle_us': idle * 1e6,
+        'rotations': rotations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='直接读取json-file日志的吞吐基准测试')
+    parser.add_argument('--containers', type=int, default=16, help='容器数')
+    parser.add_argument('--lines', type=int, default=20000, help='每个容器写入的行数')
+    parser.add_argument('--batch', type=int, default=500, help='每轮每个容器追加的行数')
+    parser.add_argument('--rotate-bytes', type=int, default=1024 * 1024, help='日志文件轮转大小，0表示不轮转')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='错误事件占比')
+    args = parser.parse_args()
+    
+    result = run(args.containers, args.lines, args.batch, args.rotate_bytes, args.error_rate)
+    print("📊 json-file直接读取")
+    print("=" * 48)
+    print(f"写入行数:     {result['lines']}")
+    print(f"读取行数:     {result['read']} ({'一致' if result['read'] == result['lines'] else '不一致'})")
+    print(f"轮转次数:     {result['rotations']}")
+    print(f"读取吞吐:     {result['lines_per_sec']:.0f} 行/秒")
+    print(f"空闲轮询:     {result['idle_us']:.1f} µs/容器")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""监控热路径基准测试
+
+用合成日志和Docker/SSH替身驱动DockerLogMonitor与RemoteDockerLogMonitor，不需要Docker守护进程或SSH：
+- pipeline_local / pipeline_remote: 按批次投放日志并调用process_container_logs，统计吞吐（行/秒）
+  和检测延迟（日志投放到返回错误事件的耗时）p50/p99
+- should_notify / get_error_key / aggregate_error_context: 单函数吞吐和单次调用耗时p50/p99
+
+结果保存为JSON，可用--compare与之前的结果对比：
+
+    python benchmarks/bench_monitor.py --output before.json
+    python benchmarks/bench_monitor.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.monitor import DockerLogMonitor
+from core.remote_monitor import RemoteDockerLogMonitor
+from fakes import FakeDockerClient, FakeRemoteDockerManager
+from synthetic import SCENARIOS, generate_scenario
+
+BENCH_CONFIG = {
+    'log_levels': ['ERROR', 'WARN'],
+    'keywords': [],
+    'blacklist': {'keywords': [], 'patterns': [], 'containers': []},
+    'error_threshold': 1,
+    'cooldown_minutes': 0,
+    'context_settings': {
+        'max_context_lines': 25,
+        'stack_trace_lines': 15,
+        'include_surrounding_lines': 5,
+        'max_log_length': 8000,
+        'buffer_size': 1000,
+    },
+}
+
+
+def percentile(values, pct: float) -> float:
+    """最近秩百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(lines: int, elapsed: float, latencies) -> dict:
+    return {
+        'lines': lines,
+        'seconds': round(elapsed, 6),
+        'lines_per_sec': round(lines / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+    }
+
+
+def run_pipeline(monitor, feed, logs, batch: int) -> dict:
+    """按批次投放日志，统计process_container_logs吞吐和检测延迟"""
+    latencies = []
+    events = 0
+    elapsed = 0.0
+    for i in range(0, len(logs), batch):
+        feed.push(logs[i:i + batch])
+        start = time.perf_counter()
+        errors = monitor.process_container_logs('app')
+        duration = time.perf_counter() - start
+        elapsed += duration
+        events += len(errors)
+        latencies.extend([duration] * len(errors))
+    result = summarize(len(logs), elapsed, latencies)
+    result['events'] = events
+    return result
+
+
+def bench_pipeline_local(logs, batch: int) -> dict:
+    client = FakeDockerClient()
+    feed = client.add_container('app')
+    monitor = DockerLogMonitor(BENCH_CONFIG, docker_client=client)
+    return run_pipeline(monitor, feed, logs, batch)
+
+
+def bench_pipeline_remote(logs, batch: int) -> dict:
+    manager = FakeRemoteDockerManager()
+    feed = manager.add_container('bench-server', 'app')
+    monitor = RemoteDockerLogMonitor(
+        BENCH_CONFIG, {'name': 'bench-server', 'host': '127.0.0.1'}, docker_client=FakeDockerClient()
+    )
+    monitor.set_remote_manager(manager)
+    return run_pipeline(monitor, feed, logs, batch)
+
+
+def bench_calls(func, args_list) -> dict:
+    """逐次计时调用func，统计吞吐和单次耗时"""
+    latencies = []
+    perf_counter = time.perf_counter
+    for args in args_list:
+        start = perf_counter()
+        func(*args)
+        latencies.append(perf_counter() - start)
+    return summarize(len(args_list), sum(latencies), latencies)
+
+
+def bench_functions(logs, window: int) -> dict:
+    monitor = DockerLogMonitor(BENCH_CONFIG, docker_client=FakeDockerClient())
+    matched = [i for i, line in enumerate(logs) if monitor.should_notify('app', line)]
+    
+    contexts = []
+    for index in matched:
+        start = max(0, index - window // 2)
+        buffer = logs[start:start + window]
+        contexts.append(('app', buffer, index - start))
+    
+    return {
+        'should_notify': bench_calls(monitor.should_notify, [('app', line) for line in logs]),
+        'get_error_key': bench_calls(monitor.get_error_key, [('app', logs[i]) for i in matched]),
+        'aggregate_error_context': bench_calls(monitor.aggregate_error_context, contexts),
+    }
+
+
+def git_revision() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=Path(__file__).parent)
+        return result.stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    """按lines_per_sec对比，下降超过tolerance视为回退"""
+    regressions = 0
+    print(f"\n📐 与基线对比 (容差 {tolerance:.0%})")
+    for key in ('lines', 'error_rate', 'batch', 'seed'):
+        if baseline.get('meta', {}).get(key) != results['meta'][key]:
+            print(f"⚠️ 参数 {key} 与基线不同: {baseline.get('meta', {}).get(key)} -> {results['meta'][key]}")
+    for scenario, benches in results['results'].items():
+        for name, current in benches.items():
+            previous = baseline.get('results', {}).get(scenario, {}).get(name)
+            if not previous or not previous.get('lines_per_sec'):
+                continue
+            change = current['lines_per_sec'] / previous['lines_per_sec'] - 1
+            flag = '❌' if change < -tolerance else '✅'
+            if change < -tolerance:
+                regressions += 1
+            print(f"{flag} {scenario:<8}{name:<26}{previous['lines_per_sec']:>14.0f} -> "
+                  f"{current['lines_per_sec']:>12.0f} 行/秒 ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监控热路径基准测试')
+    parser.add_argument('--scenarios', nargs='*', default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument('--lines', type=int, default=20000, help='每个场景的日志行数')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='错误事件占比')
+    parser.add_argument('--batch', type=int, default=200, help='每轮投放的日志行数')
+    parser.add_argument('--window', type=int, default=1000, help='aggregate_error_context使用的缓冲区行数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='结果JSON输出路径')
+    parser.add_argument('--compare', help='基线结果JSON路径')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='吞吐下降超过该比例视为回退')
+    args = parser.parse_args()
+    
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': git_revision(),
+            'lines': args.lines,
+            'error_rate': args.error_rate,
+            'batch': args.batch,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    
+    print("📊 监控热路径基准测试")
+    print("=" * 88)
+    print(f"{'场景':<8}{'测试项':<26}{'行数':>8}{'行/秒':>14}{'p50 ms':>12}{'p99 ms':>12}{'事件':>8}")
+    for scenario in args.scenarios:
+        logs = generate_scenario(scenario, args.lines, args.error_rate, args.seed)
+        benches = {
+            'pipeline_local': bench_pipeline_local(logs, args.batch),
+            'pipeline_remote': bench_pipeline_remote(logs, args.batch),
+        }
+        benches.update(bench_functions(logs, args.window))
+        results['results'][scenario] = benches
+        for name, result in benches.items():
+            print(f"{scenario:<8}{name:<26}{result['lines']:>8}{result['lines_per_sec']:>14.0f}"
+                  f"{result['p50_ms']:>12.4f}{result['p99_ms']:>12.4f}{result.get('events', ''):>8}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 结果已保存: {args.output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
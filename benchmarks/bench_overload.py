@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""过载保护：一个刷屏容器对其他容器的影响
+
+一个容器每轮输出flood_lines行访问日志噪声，其中夹杂少量Python异常；其余容器每轮输出少量日志和一个异常。
+刷屏容器在配置中排在最前。log_source为json_file时日志写入临时目录中的json-file日志文件，每轮读到全部新行；
+为api时通过docker logs --tail读取，每轮最多500行，更早的行在读取时就丢失了，过载保护只能对截断计数和告警。
+对比两种读取方式下overload关闭和开启时每轮耗时、每轮开始到其他容器全部处理完的延迟（中位数）、刷屏容器中异常的检出数，
+洪泛告警数，以及降级丢弃、采样的行数和读取截断次数：
+
+    python benchmarks/bench_overload.py --flood-lines 50000 --containers 8 --ticks 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from bench_log_tailer import JsonFileWriter
+from core.monitor import FLOOD_FINGERPRINT, DockerLogMonitor
+from core.settings import Settings
+from fakes import FakeDockerClient
+from synthetic import LogGenerator
+
+FLOOD = 'flood'
+
+
+class _JsonFileFeed(JsonFileWriter):
+    """与LogFeed相同的投放接口，写入json-file日志文件"""
+    
+    def push(self, lines):
+        self.write(lines)
+
+
+def build(args, overload: bool, log_source: str, directory: str):
+    """构造监控器，返回(监控器, 各容器的投放对象)"""
+    client = FakeDockerClient()
+    names = [FLOOD] + [f'app-{i + 1}' for i in range(args.containers)]
+    feeds = {}
+    for name in names:
+        if log_source == 'json_file':
+            path = os.path.join(directory, f'{name}-json.log')
+            feeds[name] = _JsonFileFeed(path, rotate_bytes=0)
+            client.add_container(name, log_path=path)
+        else:
+            feeds[name] = client.add_container(name)
+    settings = Settings({
+        'containers': names,
+        'local_monitoring': {'enabled': True, 'log_source': log_source},
+        'log_levels': ['ERROR'],
+        'error_threshold': 1,
+        'cooldown_minutes': 0,
+        'context_settings': {'buffer_size': args.buffer_size},
+        'overload': {'enabled': overload, 'tick_budget': args.tick_budget},
+        'config_reload': {'enabled': False},
+    })
+    monitor = DockerLogMonitor(settings, docker_client=client)
+    # 接入时读取一次，之后每轮投放一批再读取
+    for name in names:
+        monitor.buffer_new_logs(name)
+    return monitor, feeds
+
+
+def push_tick(feeds, gen: LogGenerator, args) -> int:
+    """投放一轮日志，返回刷屏容器中的异常数"""
+    errors_at = {int(args.flood_lines * (i + 0.5) / args.flood_errors) for i in range(args.flood_errors)}
+    flood = []
+    for i in range(args.flood_lines):
+        flood.extend(gen.python_traceback() if i in errors_at else gen.nginx_access())
+    feeds[FLOOD].push(flood)
+    for name, feed in feeds.items():
+        if name != FLOOD:
+            feed.push([line for _ in range(args.normal_lines) for line in gen.app_info()] + gen.java_traceback())
+    return len(errors_at)
+
+
+def run(args, overload: bool, log_source: str) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        monitor, feeds = build(args, overload, log_source, directory)
+        gen = LogGenerator(seed=3)
+        injected = detected = alerts = 0
+        tick_times, latencies = [], []
+        for _ in range(args.ticks):
+            injected += push_tick(feeds, gen, args)
+            start = time.perf_counter()
+            normal_done = start
+            for name in monitor.get_monitored_containers():
+                for event in monitor.process_container_logs(name):
+                    if event.get('fingerprint') == FLOOD_FINGERPRINT:
+                        alerts += 1
+                    elif name == FLOOD:
+                        detected += 1
+                if name != FLOOD:
+                    normal_done = time.perf_counter()
+            tick_times.append(time.perf_counter() - start)
+            # 正常容器全部处理完的时间，即它们的告警被刷屏容器推迟了多久
+            latencies.append(normal_done - start)
+        if log_source == 'json_file':
+            for feed in feeds.values():
+                feed.close()
+    
+    stats = monitor.overload.stats().get(FLOOD, {})
+    return {
+        'tick_ms': sum(tick_times) / len(tick_times) * 1000,
+        'latency_ms': sorted(latencies)[len(latencies) // 2] * 1000,
+        'injected': injected,
+        'detected': detected,
+        'alerts': alerts,
+        'dropped': stats.get('dropped', 0),
+        'sampled': stats.get('sampled', 0),
+        'truncated': stats.get('truncated', 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='过载保护：一个刷屏容器对其他容器的影响')
+    parser.add_argument('--flood-lines', type=int, default=50000, help='刷屏容器每轮输出的行数')
+    parser.add_argument('--flood-errors', type=int, default=20, help='刷屏容器每轮夹杂的异常数')
+    parser.add_argument('--containers', type=int, default=8, help='正常容器数')
+    parser.add_argument('--normal-lines', type=int, default=200, help='正常容器每轮输出的行数')
+    parser.add_argument('--buffer-size', type=int, default=20000, help='context_settings.buffer_size')
+    parser.add_argument('--tick-budget', type=float, default=0.2, help='overload.tick_budget（秒）')
+    parser.add_argument('--ticks', type=int, default=10, help='检查轮数')
+    args = parser.parse_args()
+    
+    print(f"📊 过载保护: 刷屏容器每轮 {args.flood_lines} 行, 正常容器 {args.containers} 个, "
+          f"buffer_size={args.buffer_size}")
+    print("=" * 96)
+    print(f"{'log_source':<12}{'overload':<10}{'每轮ms':>10}{'正常容器延迟ms':>12}{'异常检出':>12}{'洪泛告警':>10}"
+          f"{'丢弃行':>12}{'采样行':>10}{'截断':>6}")
+    for log_source in ('json_file', 'api'):
+        for overload in (False, True):
+            result = run(args, overload, log_source)
+            print(f"{log_source:<12}{'on' if overload else 'off':<10}{result['tick_ms']:>10.1f}"
+                  f"{result['latency_ms']:>12.1f}{result['detected']:>6}/{result['injected']:<5}{result['alerts']:>10}"
+                  f"{result['dropped']:>12}{result['sampled']:>10}{result['truncated']:>6}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""远程预过滤带宽对比
+
+用合成日志代替远程docker logs输出，在本机执行与远程完全相同的awk管道，
+对比预过滤前后需要经SSH传输的字节数，并确认候选错误行没有被过滤掉。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.remote_filter import RemoteLogFilter
+from synthetic import generate_logs
+
+
+def count_candidates(text: str, log_levels, keywords) -> int:
+    """按本地should_notify的级别/关键词规则统计候选行"""
+    count = 0
+    for line in text.splitlines():
+        if log_levels and not any(level.upper() in line.upper() for level in log_levels):
+            continue
+        if keywords and not any(keyword.lower() in line.lower() for keyword in keywords):
+            continue
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='远程预过滤带宽对比')
+    parser.add_argument('--lines', type=int, default=500, help='每次拉取的日志行数（对应docker logs --tail）')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='错误事件占比')
+    parser.add_argument('--log-levels', nargs='*', default=['ERROR', 'WARN'])
+    parser.add_argument('--keywords', nargs='*', default=[])
+    args = parser.parse_args()
+    
+    config = {
+        'log_levels': args.log_levels,
+        'keywords': args.keywords,
+        'context_settings': {'include_surrounding_lines': 5, 'max_context_lines': 25},
+    }
+    log_filter = RemoteLogFilter.from_config(config)
+    if not log_filter:
+        print("❌ log_levels和keywords均为空，无法构建预过滤器")
+        return 1
+    
+    raw = generate_logs(args.lines, args.error_rate)
+    with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False, encoding='utf-8') as f:
+        f.write(raw)
+        path = f.name
+    
+    try:
+        cmd = log_filter.wrap(f"cat {path}")
+        result = subprocess.run(['sh', '-c', cmd], capture_output=True)
+        filtered = result.stdout.decode('utf-8', errors='ignore')
+    finally:
+        os.unlink(path)
+    
+    raw_bytes = len(raw.encode('utf-8'))
+    filtered_bytes = len(filtered.encode('utf-8'))
+    raw_candidates = count_candidates(raw, args.log_levels, args.keywords)
+    filtered_candidates = count_candidates(filtered, args.log_levels, args.keywords)
+    
+    print("📊 远程预过滤带宽对比")
+    print("=" * 50)
+    print(f"远程命令: {cmd.replace(path, '<logs>')}")
+    print(f"原始输出:   {len(raw.splitlines()):>7} 行 {raw_bytes:>10} 字节")
+    print(f"预过滤输出: {len(filtered.splitlines()):>7} 行 {filtered_bytes:>10} 字节")
+    print(f"传输量减少: {1 - filtered_bytes / raw_bytes:.1%}")
+    print(f"候选错误行: 原始 {raw_candidates} / 预过滤后 {filtered_candidates}")
+    
+    if raw_candidates != filtered_candidates:
+        print("❌ 预过滤丢失了候选错误行")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
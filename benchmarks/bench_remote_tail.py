@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""远程按字节偏移读取的开销与日志文件大小的关系
+
+在本机用sh执行与远程相同的读取命令（不经过SSH），日志文件从小到大增长，每轮追加固定量的新日志，
+对比两种方式每轮的耗时：
+- offset: log_source=json_file使用的stat + tail -c命令，只读取新增的字节
+- scan: 从头读完整个文件的下限开销（docker logs --since需要从文件开头扫描时间戳，实际开销只会更高）
+
+    python benchmarks/bench_remote_tail.py --sizes 1 16 128 --append-kb 64
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.remote_tailer import RemoteLogCursor, consumed_bytes, parse_header, read_command
+
+
+def _record(i: int) -> bytes:
+    level = 'ERROR' if i % 100 == 0 else 'INFO'
+    message = f'{level} request {i} handled by worker-{i % 8} in {i % 97}ms'
+    return json.dumps({'log': message + '\n', 'stream': 'stdout', 'time': '2024-01-01T00:00:00.000000000Z'}).encode() + b'\n'
+
+
+def _fill(path: str, size: int, start: int = 0) -> int:
+    """追加记录直到文件达到size字节，返回下一条记录的序号"""
+    i = start
+    with open(path, 'ab') as f:
+        while f.tell() < size:
+            f.write(b''.join(_record(i + j) for j in range(1000)))
+            i += 1000
+    return i
+
+
+def _sh(cmd: str) -> subprocess.CompletedProcess:
+    return subprocess.run(['sh', '-c', cmd], capture_output=True)
+
+
+def run(sizes_mb, append_kb: int, rounds: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'container-json.log')
+        cursor = RemoteLogCursor(path)
+        sequence = 0
+        for size_mb in sizes_mb:
+            sequence = _fill(path, size_mb * 1024 * 1024, sequence)
+            # 接入到文件末尾
+            header = parse_header(_sh(read_command(path, None, 0, tail=0)).stderr.decode())
+            cursor.inode, cursor.offset = header
+            
+            offset_time = scan_time = 0.0
+            received = 0
+            for _ in range(rounds):
+                sequence = _fill(path, os.path.getsize(path) + append_kb * 1024, sequence)
+                
+                start = time.perf_counter()
+                result = _sh(read_command(path, cursor.inode, cursor.offset))
+                offset_time += time.perf_counter() - start
+                _, size = parse_header(result.stderr.decode())
+                cursor.offset += consumed_bytes(cursor, size)
+                received += len(result.stdout)
+                
+                start = time.perf_counter()
+                _sh(f'cat {path} > /dev/null')
+                scan_time += time.perf_counter() - start
+            
+            results.append({
+                'size_mb': os.path.getsize(path) / 1024 / 1024,
+                'offset_ms': offset_time / rounds * 1000,
+                'scan_ms': scan_time / rounds * 1000,
+                'received_kb': received / rounds / 1024,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='远程按字节偏移读取的开销与日志文件大小的关系')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 16, 128], help='日志文件大小(MB)')
+    parser.add_argument('--append-kb', type=int, default=64, help='每轮新增的日志量(KB)')
+    parser.add_argument('--rounds', type=int, default=10, help='每个文件大小测量的轮数')
+    args = parser.parse_args()
+    
+    print("📊 远程日志读取: 按字节偏移 vs 从头扫描")
+    print("=" * 60)
+    print(f"{'文件MB':>8}{'新增KB/轮':>12}{'offset ms':>12}{'scan ms':>12}{'倍数':>10}")
+    for result in run(args.sizes, args.append_kb, args.rounds):
+        print(f"{result['size_mb']:>8.0f}{result['received_kb']:>12.0f}{result['offset_ms']:>12.2f}"
+              f"{result['scan_ms']:>12.2f}{result['scan_ms'] / result['offset_ms']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""每条告警的通知格式化开销
+
+模拟同时启用Mattermost(markdown)、邮件(markdown HTML)、终端(text)三个提供者和两个批量出口时，
+格式化一条告警的总耗时，对比两种方式：
+- per_provider: 每个提供者各自调用MessageFormatter.format_message并按行切分上下文计算行数，
+  邮件再套一层HTML，每个批量出口各自编码NDJSON（改动前的做法）
+- rendered: 每条告警创建一个RenderedNotification，所有提供者共用字段、正文和NDJSON编码
+
+    python benchmarks/bench_rendering.py --context-kb 1 8 --alerts 2000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from notifications.email import _HTML_TEMPLATE
+from notifications.message_formatter import MessageFormatter
+from notifications.rendering import CompiledTemplate, RenderedNotification, encode_record
+
+# 与MattermostProvider的markdown模板相同，避免基准测试依赖mattermostdriver
+MATTERMOST_TEMPLATE = CompiledTemplate("## {title}\n\n{body}", base=MessageFormatter.body_template('markdown'))
+SINKS = 2
+
+FIELDS = {'container': 'api-1', 'timestamp': '2024-01-01 00:00:00 CST', 'count': 5, 'threshold': 3, 'server': 'node-1'}
+
+
+def make_context(kb: int) -> str:
+    lines = []
+    size = 0
+    i = 0
+    while size < kb * 1024:
+        line = f'    at com.example.service.Handler.process(Handler.java:{i}) ERROR request failed'
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    return '\n'.join(lines)
+
+
+def per_provider(title: str, message: str):
+    def body(format_type):
+        return MessageFormatter.format_message(
+            format_type, title=title, container=FIELDS['container'], count=FIELDS['count'],
+            threshold=FIELDS['threshold'], timestamp=FIELDS['timestamp'],
+            context_lines=len(message.split('\n')) if message else 0, context=message or "无上下文",
+        )
+    
+    mattermost = f"## {title}\n\n{body('markdown')}"
+    email = f"<html><body><h2>{title}</h2><pre>{body('markdown')}</pre></body></html>"
+    terminal = body('text')
+    records = [encode_record({'title': title, 'message': message, **FIELDS}) for _ in range(SINKS)]
+    return mattermost, email, terminal, records
+
+
+def rendered(title: str, message: str):
+    notification = RenderedNotification(title, message, **FIELDS)
+    mattermost = notification.render(MATTERMOST_TEMPLATE)
+    email = notification.render(_HTML_TEMPLATE)
+    terminal = notification.render(MessageFormatter.body_template('text'))
+    records = [notification.encoded() for _ in range(SINKS)]
+    return mattermost, email, terminal, records
+
+
+def run(func, message: str, alerts: int) -> float:
+    start = time.perf_counter()
+    for i in range(alerts):
+        func(f"🚨 Docker错误 - node-1:api-{i}", message)
+    return (time.perf_counter() - start) / alerts * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='每条告警的通知格式化开销')
+    parser.add_argument('--context-kb', type=int, nargs='+', default=[1, 8], help='错误上下文大小(KB)')
+    parser.add_argument('--alerts', type=int, default=2000, help='每种方式格式化的告警数')
+    args = parser.parse_args()
+    
+    print("📊 通知格式化: 各提供者分别格式化 vs 渲染一次共用")
+    print("=" * 56)
+    print(f"3个提供者 + {SINKS}个批量出口")
+    print(f"{'上下文KB':>10}{'per_provider µs':>18}{'rendered µs':>14}{'倍数':>10}")
+    for kb in args.context_kb:
+        message = make_context(kb)
+        legacy = run(per_provider, message, args.alerts)
+        shared = run(rendered, message, args.alerts)
+        print(f"{kb:>10}{legacy:>18.1f}{shared:>14.1f}{legacy / shared:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""配置快照的逐行开销对比
+
+对同一批合成日志分别运行：
+- legacy: 改造前的写法，每行通过config.get()查找嵌套字典、转换大小写、编译正则
+- settings: 使用Settings快照的DockerLogMonitor热路径（属性访问、预编译规则）
+并对比每次出错时读取阈值/冷却时间、以及点分隔键查找与属性访问的开销。
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.config import ConfigManager
+from core.monitor import DockerLogMonitor
+from core.settings import Settings
+from fakes import FakeDockerClient
+from synthetic import generate_scenario
+
+BENCH_CONFIG = {
+    'log_levels': ['ERROR', 'WARN', 'FATAL'],
+    'keywords': [],
+    'blacklist': {
+        'keywords': ['healthcheck', 'kube-probe', 'favicon.ico'],
+        'patterns': [r'GET /healthz', r'DEBUG.*connection pool', r'^\s*$'],
+        'containers': ['redis-cache'],
+    },
+    'error_threshold': 3,
+    'cooldown_minutes': 30,
+    'context_settings': {'buffer_size': 2000, 'max_log_length': 8000},
+}
+
+
+def legacy_should_notify(config, container_name: str, log_line: str) -> bool:
+    """改造前的should_notify实现"""
+    blacklist = config.get('blacklist', {})
+    blacklisted_containers = blacklist.get('containers', [])
+    if container_name in blacklisted_containers:
+        return False
+    blacklisted_keywords = blacklist.get('keywords', [])
+    log_line_lower = log_line.lower()
+    for keyword in blacklisted_keywords:
+        if keyword.lower() in log_line_lower:
+            return False
+    blacklisted_patterns = blacklist.get('patterns', [])
+    for pattern in blacklisted_patterns:
+        try:
+            if re.search(pattern, log_line, re.IGNORECASE):
+                return False
+        except re.error:
+            continue
+    log_levels = config.get('log_levels', [])
+    if log_levels:
+        log_line_upper = log_line.upper()
+        if not any(level.upper() in log_line_upper for level in log_levels):
+            return False
+    keywords = config.get('keywords', [])
+    if keywords:
+        log_line_lower = log_line.lower()
+        if not any(keyword.lower() in log_line_lower for keyword in keywords):
+            return False
+    return True
+
+
+def measure(func, repeat: int) -> float:
+    """返回最快一轮的耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='配置快照的逐行开销对比')
+    parser.add_argument('--lines', type=int, default=50000, help='日志行数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快一轮')
+    args = parser.parse_args()
+    
+    logs = generate_scenario('mixed', args.lines, 0.01)
+    monitor = DockerLogMonitor(BENCH_CONFIG, docker_client=FakeDockerClient())
+    settings = monitor.config
+    manager = ConfigManager.__new__(ConfigManager)
+    manager.config = BENCH_CONFIG
+    
+    legacy_results = [legacy_should_notify(BENCH_CONFIG, 'app', line) for line in logs]
+    if legacy_results != [monitor.should_notify('app', line) for line in logs]:
+        print("❌ 新旧should_notify结果不一致")
+        return 1
+    
+    should_notify = monitor.should_notify
+    lookups = range(args.lines)
+    cases = [
+        ('should_notify', 
+         lambda: [legacy_should_notify(BENCH_CONFIG, 'app', line) for line in logs],
+         lambda: [should_notify('app', line) for line in logs]),
+        ('阈值/冷却读取',
+         lambda: [(BENCH_CONFIG.get('cooldown_minutes', 30) * 60, BENCH_CONFIG.get('error_threshold', 3))
+                  for _ in lookups],
+         lambda: [(settings.cooldown_seconds, settings.error_threshold) for _ in lookups]),
+        ('点分隔键读取',
+         lambda: [manager.get('context_settings.buffer_size', 1000) for _ in lookups],
+         lambda: [settings.buffer_size for _ in lookups]),
+    ]
+    
+    print("📊 配置快照逐行开销对比")
+    print("=" * 64)
+    print(f"日志行数: {args.lines}, 重复 {args.repeat} 次取最快")
+    print(f"{'测试项':<16}{'legacy ns/次':>16}{'settings ns/次':>18}{'加速':>10}")
+    for name, legacy, current in cases:
+        legacy_time = measure(legacy, args.repeat)
+        current_time = measure(current, args.repeat)
+        print(f"{name:<16}{legacy_time / args.lines * 1e9:>16.1f}{current_time / args.lines * 1e9:>18.1f}"
+              f"{legacy_time / current_time:>9.2f}x")
+    
+    print(f"\nℹ️ buffer_size: 原始字典点分隔查找得到 {BENCH_CONFIG.get('context_settings.buffer_size', 1000)}，"
+          f"Settings得到 {Settings(BENCH_CONFIG).buffer_size}（配置值 2000）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
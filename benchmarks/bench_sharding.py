@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""分片模式吞吐基准测试
+
+每个工作进程用Docker替身构造本地监控器，容器持续输出合成日志（check_interval=0，不等待），
+统计不同进程数下从全部就绪到所有日志处理完的吞吐，以及相对第一个进程数的加速比：
+
+    python benchmarks/bench_sharding.py --workers 1 2 4 8 --containers 64 --lines 5000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.monitor import DockerLogMonitor
+from core.settings import Settings
+from core.sharding import ShardCoordinator
+from fakes import FakeDockerClient
+from synthetic import generate_scenario
+
+BENCH_CONFIG = {
+    'log_levels': ['ERROR', 'WARN'],
+    'keywords': [],
+    'blacklist': {'keywords': ['healthz'], 'patterns': [r'kube-probe'], 'containers': []},
+    'error_threshold': 3,
+    'cooldown_minutes': 1,
+    'check_interval': 0,
+    'context_settings': {'max_log_length': 8000, 'buffer_size': 1000},
+    'config_reload': {'enabled': False},
+}
+
+
+class _CyclingFeed:
+    """循环输出一批合成日志，直到达到总行数"""
+    
+    def __init__(self, lines, total: int):
+        self.lines = lines
+        self.remaining = total
+        self.position = 0
+    
+    def read(self, tail: int = 500):
+        count = min(tail, self.remaining)
+        batch = []
+        while len(batch) < count:
+            chunk = self.lines[self.position:self.position + count - len(batch)]
+            batch.extend(chunk)
+            self.position = (self.position + len(chunk)) % len(self.lines)
+        self.remaining -= count
+        return batch
+
+
+def bench_monitor(settings: Settings) -> DockerLogMonitor:
+    """工作进程中的本地监控器，容器数和行数从配置的bench段读取"""
+    client = FakeDockerClient()
+    pool = generate_scenario('mixed', 5000, settings.get('bench.error_rate', 0.01))
+    for i in range(settings.get('bench.containers', 64)):
+        client.add_container(f'app-{i}', _CyclingFeed(pool, settings.get('bench.lines', 5000)))
+    return DockerLogMonitor(settings, docker_client=client)
+
+
+def run(workers: int, containers: int, lines: int, error_rate: float) -> dict:
+    config = {
+        **BENCH_CONFIG,
+        'containers': [f'app-{i}' for i in range(containers)],
+        'bench': {'containers': containers, 'lines': lines, 'error_rate': error_rate},
+    }
+    coordinator = ShardCoordinator(Settings(config), workers, local_factory=bench_monitor)
+    try:
+        if not coordinator.wait_ready(timeout=120):
+            raise RuntimeError("工作进程启动超时")
+        total = containers * lines
+        events = 0
+        start = time.perf_counter()
+        while sum(coordinator.lines.values()) < total:
+            events += len(coordinator.collect())
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        events += len(coordinator.collect())
+    finally:
+        coordinator.stop()
+    
+    return {
+        'workers': workers,
+        'lines': total,
+        'seconds': elapsed,
+        'lines_per_sec': total / elapsed,
+        'events': events,
+        'per_shard': dict(coordinator.lines),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分片模式吞吐基准测试')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='要测试的进程数')
+    parser.add_argument('--containers', type=int, default=64, help='容器数')
+    parser.add_argument('--lines', type=int, default=5000, help='每个容器的日志行数')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='错误事件占比')
+    args = parser.parse_args()
+    
+    print("📊 分片模式吞吐")
+    print("=" * 64)
+    print(f"CPU核数: {os.cpu_count()}, 容器: {args.containers}, 每容器 {args.lines} 行")
+    print(f"{'进程数':<8}{'行/秒':>14}{'耗时s':>10}{'加速':>8}{'事件':>8}  各分片行数(最少/最多)")
+    
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, args.containers, args.lines, args.error_rate)
+        baseline = baseline or result['lines_per_sec']
+        shard_lines = result['per_shard'].values()
+        print(f"{workers:<8}{result['lines_per_sec']:>14.0f}{result['seconds']:>10.2f}"
+              f"{result['lines_per_sec'] / baseline:>7.2f}x{result['events']:>8}  "
+              f"{min(shard_lines)}/{max(shard_lines)}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""冷启动导入开销基准测试
+
+在子进程中用 python -X importtime 运行几种短任务，统计导入耗时（各模块自身耗时之和）、
+导入的模块数、进程总耗时（多次运行取最小值），并列出加载了哪些较重的可选依赖
+（docker、paramiko、mattermostdriver等）。--src可以指向另一份代码（例如git worktree）对比改动前后：
+
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --src /tmp/baseline/src
+"""
+import argparse
+import gzip
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import generate_scenario
+
+DEFAULT_SRC = Path(__file__).parent.parent / 'src'
+# 只在对应配置启用时才需要的依赖
+HEAVY_MODULES = ('docker', 'paramiko', 'mattermostdriver', 'requests', 'smtplib')
+
+
+def parse_importtime(stderr: str) -> dict:
+    """解析-X importtime输出：模块自身耗时之和（微秒）和导入的顶层包"""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        total_us += int(self_us)
+        modules.add(name.strip())
+    return {'import_us': total_us, 'modules': modules}
+
+
+def run_once(argv: list, cwd: str) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *argv], cwd=cwd,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} 失败:\n{result.stderr[-2000:]}")
+    stats = parse_importtime(result.stderr)
+    stats['wall'] = elapsed
+    return stats
+
+
+def build_cases(src: Path, workdir: str) -> dict:
+    main_py = str(src / 'main.py')
+    missing_config = os.path.join(workdir, 'missing.json')
+    archive = os.path.join(workdir, 'app.log.gz')
+    with gzip.open(archive, 'wt', encoding='utf-8') as f:
+        for line in generate_scenario('storm', 2000, seed=1):
+            f.write(line + '\n')
+    return {
+        'import main': ['-c', f'import sys; sys.path.insert(0, {str(src)!r}); import main'],
+        '--setup': [main_py, '--setup', '--config', os.path.join(workdir, 'config.json')],
+        '--replay': [main_py, '--replay', archive, '--quiet', '--config', missing_config],
+        '--help': [main_py, '--help'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='冷启动导入开销基准测试')
+    parser.add_argument('--src', type=Path, default=DEFAULT_SRC, help='被测代码的src目录')
+    parser.add_argument('--repeat', type=int, default=5, help='每种任务运行的次数，取最小值')
+    args = parser.parse_args()
+    
+    print(f"📊 冷启动导入开销: {args.src}")
+    print("=" * 78)
+    print(f"{'任务':<14}{'进程ms':>10}{'导入ms':>10}{'模块数':>10}  可选依赖")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, argv in build_cases(args.src.resolve(), workdir).items():
+            runs = [run_once(argv, workdir) for _ in range(args.repeat)]
+            best = min(runs, key=lambda stats: stats['wall'])
+            loaded = [module for module in HEAVY_MODULES if module in best['modules']]
+            print(f"{name:<14}{best['wall'] * 1000:>10.1f}{best['import_us'] / 1000:>10.1f}"
+                  f"{len(best['modules']):>10}  {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
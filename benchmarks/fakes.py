@@ -0,0 +1,95 @@
+"""基准测试用的Docker/SSH替身，不需要Docker守护进程或SSH服务器"""
+from typing import Dict, List, Optional
+
+
+class LogFeed:
+    """按批次投放日志行，模拟容器持续输出
+
+    每次读取返回自上次读取以来新投放的行，最多tail行，与docker logs --since --tail一致。
+    """
+    
+    def __init__(self):
+        self.pending: List[str] = []
+    
+    def push(self, lines: List[str]):
+        self.pending.extend(lines)
+    
+    def read(self, tail: int = 500) -> List[str]:
+        lines = self.pending[-tail:] if tail else self.pending
+        self.pending = []
+        return lines
+
+
+class FakeContainer:
+    """docker.models.containers.Container的最小替身"""
+    
+    def __init__(self, name: str, feed: LogFeed, log_path: Optional[str] = None):
+        self.name = name
+        self.status = 'running'
+        self.feed = feed
+        # docker inspect结果中日志文件读取用到的部分
+        self.attrs = {
+            'Id': name,
+            'LogPath': log_path or '',
+            'HostConfig': {'LogConfig': {'Type': 'json-file'}},
+        }
+    
+    def logs(self, timestamps=True, since=None, tail=500, stream=False) -> bytes:
+        lines = self.feed.read(tail)
+        return ('\n'.join(lines) + '\n').encode('utf-8') if lines else b''
+
+
+class _FakeContainers:
+    def __init__(self, containers: Dict[str, FakeContainer]):
+        self._containers = containers
+    
+    def get(self, name: str) -> FakeContainer:
+        return self._containers[name]
+    
+    def list(self) -> List[FakeContainer]:
+        return list(self._containers.values())
+
+
+class FakeDockerClient:
+    """docker.DockerClient的最小替身，可直接注入DockerLogMonitor"""
+    
+    def __init__(self):
+        self.feeds: Dict[str, LogFeed] = {}
+        self._containers: Dict[str, FakeContainer] = {}
+        self.containers = _FakeContainers(self._containers)
+    
+    def add_container(self, name: str, feed=None, log_path: Optional[str] = None) -> LogFeed:
+        """添加容器，feed可以是任何提供read(tail)的对象，log_path为json-file日志文件路径"""
+        feed = feed or LogFeed()
+        self.feeds[name] = feed
+        self._containers[name] = FakeContainer(name, feed, log_path)
+        return feed
+
+
+class FakeRemoteDockerManager:
+    """RemoteDockerManager的替身，按服务器名和容器名投放日志"""
+    
+    def __init__(self):
+        self.feeds: Dict[tuple, LogFeed] = {}
+    
+    def add_container(self, server_name: str, container_name: str) -> LogFeed:
+        feed = LogFeed()
+        self.feeds[(server_name, container_name)] = feed
+        return feed
+    
+    def get_container_logs(self, server_config: Dict, container_name: str,
+                           since: Optional[str] = None, tail: int = 500,
+                           log_filter=None) -> List[str]:
+        server_name = server_config.get('name', server_config['host'])
+        feed = self.feeds.get((server_name, container_name))
+        return feed.read(tail) if feed else []
+    
+    def uses_log_tail(self, server_config: Dict, container_name: Optional[str] = None) -> bool:
+        return True
+    
+    def get_running_containers(self, server_config: Dict) -> List[str]:
+        server_name = server_config.get('name', server_config['host'])
+        return [container for server, container in self.feeds if server == server_name]
+    
+    def check_docker_availability(self, server_config: Dict) -> bool:
+        return True
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""合成日志生成器，供基准测试使用"""
+import random
+from datetime import datetime, timedelta, timezone
+
+
+def generate_logs(lines: int, error_rate: float, seed: int = 42) -> str:
+    """生成以INFO访问日志为主、夹杂错误和堆栈的docker logs --timestamps输出"""
+    rng = random.Random(seed)
+    ts = datetime(2024, 9, 4, 15, 0, 0, tzinfo=timezone.utc)
+    out = []
+    while len(out) < lines:
+        ts += timedelta(milliseconds=rng.randint(1, 50))
+        stamp = ts.strftime('%Y-%m-%dT%H:%M:%S.%f000Z')
+        if rng.random() < error_rate:
+            out.append(f"{stamp} [ERROR] Database connection failed: Connection timeout after {rng.randint(1, 60)}s")
+            out.append(f"{stamp} Traceback (most recent call last):")
+            for depth in range(rng.randint(2, 6)):
+                out.append(f'{stamp}   File "/app/module_{depth}.py", line {rng.randint(1, 500)}, in handler')
+            out.append(f"{stamp} ConnectionError: Timeout connecting to database")
+        else:
+            out.append(
+                f'{stamp} [INFO] 10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)} - - '
+                f'"GET /api/v1/items/{rng.randint(1, 99999)} HTTP/1.1" 200 {rng.randint(100, 9000)} '
+                f'"-" "Mozilla/5.0 (X11; Linux x86_64)"'
+            )
+    return '\n'.join(out[:lines]) + '\n'
+
+_PATHS = ['/api/v1/items', '/api/v1/users', '/static/app.js', '/healthz', '/api/v1/orders', '/login']
+_AGENTS = ['Mozilla/5.0 (X11; Linux x86_64)', 'curl/8.4.0', 'kube-probe/1.28', 'python-requests/2.31.0']
+
+
+class LogGenerator:
+    """按场景生成带docker时间戳的日志行
+
+    每个场景由若干种事件混合而成，事件可以产生多行（例如堆栈）。
+    时间戳单调递增，便于监控器按since增量读取。
+    """
+    
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.ts = datetime(2024, 9, 4, 15, 0, 0, tzinfo=timezone.utc)
+    
+    def _stamp(self, max_gap_ms: int = 50) -> str:
+        self.ts += timedelta(milliseconds=self.rng.randint(1, max_gap_ms))
+        return self.ts.strftime('%Y-%m-%dT%H:%M:%S.%f000Z')
+    
+    def nginx_access(self) -> list:
+        """nginx访问日志噪声"""
+        rng = self.rng
+        status = rng.choices([200, 204, 301, 304, 404, 499], weights=[70, 5, 3, 10, 10, 2])[0]
+        return [
+            f'{self._stamp()} 10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)} - - '
+            f'[{self.ts.strftime("%d/%b/%Y:%H:%M:%S +0000")}] '
+            f'"GET {rng.choice(_PATHS)}/{rng.randint(1, 99999)} HTTP/1.1" {status} {rng.randint(100, 9000)} '
+            f'"-" "{rng.choice(_AGENTS)}"'
+        ]
+    
+    def app_info(self) -> list:
+        """应用普通INFO日志"""
+        rng = self.rng
+        return [
+            f"{self._stamp()} [INFO] worker.tasks: processed job {rng.randint(1, 10 ** 6)} "
+            f"in {rng.randint(1, 900)}ms (queue={rng.randint(0, 50)})"
+        ]
+    
+    def python_traceback(self) -> list:
+        """Python异常及堆栈"""
+        rng = self.rng
+        stamp = self._stamp()
+        lines = [
+            f"{stamp} [ERROR] Database connection failed: Connection timeout after {rng.randint(1, 60)}s",
+            f"{stamp} Traceback (most recent call last):",
+        ]
+        for depth in range(rng.randint(2, 8)):
+            lines.append(f'{stamp}   File "/app/module_{depth}.py", line {rng.randint(1, 500)}, in handler')
+            lines.append(f'{stamp}     result = session.execute(query_{depth})')
+        lines.append(f"{stamp} ConnectionError: Timeout connecting to database")
+        return lines
+    
+    def java_traceback(self) -> list:
+        """Java异常及Caused by链"""
+        rng = self.rng
+        stamp = self._stamp()
+        lines = [
+            f"{stamp} {self.ts.strftime('%H:%M:%S.%f')[:-3]} [http-nio-8080-exec-{rng.randint(1, 200)}] ERROR "
+            f"c.e.order.OrderService - Failed to process order {rng.randint(100000, 999999)}",
+            f"{stamp} java.lang.IllegalStateException: Order state is invalid",
+        ]
+        for depth in range(rng.randint(4, 12)):
+            lines.append(f"{stamp} \tat com.example.order.OrderService.step{depth}(OrderService.java:{rng.randint(10, 900)})")
+        lines.append(f"{stamp} Caused by: java.sql.SQLTransientConnectionException: HikariPool-1 - Connection is not available")
+        for depth in range(rng.randint(2, 5)):
+            lines.append(f"{stamp} \tat com.zaxxer.hikari.pool.HikariPool.getConnection(HikariPool.java:{rng.randint(100, 200)})")
+        lines.append(f"{stamp} \t... {rng.randint(10, 60)} more")
+        return lines
+    
+    def json_log(self, level: str = 'info') -> list:
+        """结构化JSON日志"""
+        rng = self.rng
+        message = 'request completed' if level == 'info' else 'payment gateway returned error'
+        return [
+            f'{self._stamp()} {{"time":"{self.ts.isoformat()}","level":"{level}","logger":"api",'
+            f'"msg":"{message}","request_id":"{rng.getrandbits(64):016x}",'
+            f'"duration_ms":{rng.randint(1, 2000)},"status":{200 if level == "info" else 502}}}'
+        ]
+    
+    def error_storm(self, size: int) -> list:
+        """短时间内大量重复的错误"""
+        lines = []
+        for _ in range(size):
+            stamp = self._stamp(max_gap_ms=2)
+            lines.append(f"{stamp} [ERROR] Upstream timed out (110: Connection timed out) while reading "
+                         f"response header from upstream, upstream: \"http://10.0.0.{self.rng.randint(1, 20)}:8080\"")
+        return lines
+
+
+def generate_scenario(name: str, lines: int, error_rate: float = 0.01, seed: int = 42) -> list:
+    """生成指定场景的日志行列表
+
+    场景:
+    - nginx:   访问日志噪声夹杂少量Python异常
+    - python:  Python应用日志与堆栈
+    - java:    Java应用日志与多层Caused by堆栈
+    - json:    结构化JSON日志
+    - storm:   平时安静，偶发成百上千行的错误风暴
+    - mixed:   以上全部混合
+    """
+    gen = LogGenerator(seed)
+    rng = gen.rng
+    out = []
+    while len(out) < lines:
+        is_error = rng.random() < error_rate
+        if name == 'nginx':
+            out.extend(gen.python_traceback() if is_error else gen.nginx_access())
+        elif name == 'python':
+            out.extend(gen.python_traceback() if is_error else gen.app_info())
+        elif name == 'java':
+            out.extend(gen.java_traceback() if is_error else gen.json_log())
+        elif name == 'json':
+            out.extend(gen.json_log('error' if is_error else 'info'))
+        elif name == 'storm':
+            out.extend(gen.error_storm(rng.randint(100, 1000)) if is_error else gen.nginx_access())
+        elif name == 'mixed':
+            if is_error:
+                out.extend(rng.choice([gen.python_traceback, gen.java_traceback,
+                                       lambda: gen.json_log('error'), lambda: gen.error_storm(200)])())
+            else:
+                out.extend(rng.choice([gen.nginx_access, gen.json_log])())
+        else:
+            raise ValueError(f"未知场景: {name}")
+    return out[:lines]
+
+
+SCENARIOS = ('nginx', 'python', 'java', 'json', 'storm', 'mixed')
\ No newline at end of file
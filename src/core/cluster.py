@@ -0,0 +1,306 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from .dedup import DedupTracker
+from .settings import Settings
+from .sharding import HashRing
+from utils.logger import setup_logger
+from utils.metrics import registry
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    instance_id TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    server TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dedup (
+    error_key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_notification REAL NOT NULL
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """打开共享数据库，WAL模式允许多个实例并发读"""
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class _SQLiteStore:
+    """串行化同一实例内多个线程对连接的使用，写操作使用BEGIN IMMEDIATE在实例之间互斥"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = _connect(path)
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+    
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseStore(_SQLiteStore):
+    """实例心跳与服务器租约表"""
+    
+    def sync(self, instance_id: str, servers: Iterable[str], now: float, ttl: float) -> FrozenSet[str]:
+        """在一个事务内完成心跳、计算分配、获取和释放租约，返回本实例持有的服务器
+
+        存活实例（心跳未超过ttl）组成一致性哈希环决定每台服务器的目标实例。
+        目标是本实例时，租约空闲、已过期或持有者已失联才会接手；目标是其他实例时主动释放，
+        新的持有者在下一次同步时接手，因此任意时刻每台服务器最多由一个实例监控。
+        """
+        servers = set(servers)
+        with self.transaction() as conn:
+            conn.execute(
+                'INSERT INTO instances (instance_id, heartbeat) VALUES (?, ?) '
+                'ON CONFLICT(instance_id) DO UPDATE SET heartbeat = excluded.heartbeat',
+                (instance_id, now)
+            )
+            live = {row[0] for row in conn.execute(
+                'SELECT instance_id FROM instances WHERE heartbeat >= ?', (now - ttl,)
+            )}
+            leases = {row[0]: (row[1], row[2]) for row in conn.execute('SELECT server, owner, expires FROM leases')}
+            ring = HashRing(sorted(live))
+            
+            owned = set()
+            for server in servers:
+                owner, expires = leases.get(server, (None, 0.0))
+                if ring.get_node(server) == instance_id:
+                    if owner is None or owner == instance_id or expires < now or owner not in live:
+                        conn.execute(
+                            'INSERT INTO leases (server, owner, expires) VALUES (?, ?, ?) '
+                            'ON CONFLICT(server) DO UPDATE SET owner = excluded.owner, expires = excluded.expires',
+                            (server, instance_id, now + ttl)
+                        )
+                        owned.add(server)
+                elif owner == instance_id:
+                    conn.execute('DELETE FROM leases WHERE server = ? AND owner = ?', (server, instance_id))
+            
+            # 配置中已移除的服务器
+            for server, (owner, _) in leases.items():
+                if owner == instance_id and server not in servers:
+                    conn.execute('DELETE FROM leases WHERE server = ? AND owner = ?', (server, instance_id))
+            
+            conn.execute('DELETE FROM instances WHERE heartbeat < ?', (now - ttl * 10,))
+        return frozenset(owned)
+    
+    def leave(self, instance_id: str):
+        """退出集群，释放全部租约"""
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM leases WHERE owner = ?', (instance_id,))
+            conn.execute('DELETE FROM instances WHERE instance_id = ?', (instance_id,))
+    
+    def live_instances(self, now: float, ttl: float) -> List[str]:
+        """当前存活的实例"""
+        return [row[0] for row in self.query(
+            'SELECT instance_id FROM instances WHERE heartbeat >= ? ORDER BY instance_id', (now - ttl,)
+        )]
+
+
+class SharedDedupTracker(DedupTracker):
+    """多个实例共享的去重状态
+
+    与DedupTracker的计数和冷却规则相同，状态保存在共享数据库中，每次记录在一个写事务内完成，
+    服务器在实例之间迁移后冷却时间和计数仍然有效。
+    """
+    
+    def __init__(self, settings: Settings, path: str):
+        self.settings = settings
+        self.store = _SQLiteStore(path)
+    
+    @property
+    def error_counts(self) -> Dict[str, int]:
+        return dict(self.store.query('SELECT error_key, count FROM dedup'))
+    
+    @property
+    def last_notification_time(self) -> Dict[str, float]:
+        return dict(self.store.query('SELECT error_key, last_notification FROM dedup'))
+    
+    def record(self, error_key: str, now: float, occurrences: int = 1) -> tuple:
+        """记录错误出现，返回(should_send, current_count)"""
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                'SELECT count, last_notification FROM dedup WHERE error_key = ?', (error_key,)
+            ).fetchone()
+            count, last_notification = row or (0, 0.0)
+            current_count = count + occurrences
+            
+            should_send = False
+            if now - last_notification >= self.settings.cooldown_seconds and \
+                    current_count >= self.settings.error_threshold:
+                should_send = True
+                last_notification = now
+            
+            conn.execute(
+                'INSERT INTO dedup (error_key, count, last_notification) VALUES (?, ?, ?) '
+                'ON CONFLICT(error_key) DO UPDATE SET count = excluded.count, '
+                'last_notification = excluded.last_notification',
+                (error_key, 0 if should_send else current_count, last_notification)
+            )
+        return should_send, current_count
+    
+    def mark_notified(self, error_key: str, now: float):
+        """记录已经通过紧急告警快速通道发出的通知，写入共享数据库"""
+        with self.store.transaction() as conn:
+            conn.execute(
+                'INSERT INTO dedup (error_key, count, last_notification) VALUES (?, 0, ?) '
+                'ON CONFLICT(error_key) DO UPDATE SET count = 0, last_notification = excluded.last_notification',
+                (error_key, now)
+            )
+    
+    def cleanup(self, now: float):
+        """清理过期条目并限制条目数"""
+        with self.store.transaction() as conn:
+            conn.execute(
+                'DELETE FROM dedup WHERE count = 0 AND last_notification < ?',
+                (now - self.settings.deduplication_window,)
+            )
+            conn.execute(
+                'DELETE FROM dedup WHERE error_key IN (SELECT error_key FROM dedup '
+                'ORDER BY last_notification LIMIT max(0, (SELECT COUNT(*) FROM dedup) - ?))',
+                (self.settings.max_memory_entries,)
+            )
+    
+    def __len__(self) -> int:
+        return self.store.query('SELECT COUNT(*) FROM dedup')[0][0]
+
+
+class ClusterMember:
+    """集群成员
+
+    多个实例通过共享的SQLite数据库（同一主机或共享文件系统）分摊remote_servers：
+    后台线程每heartbeat_interval秒同步一次租约，实例加入或退出时自动重新分配，
+    分配结果由主循环在两轮检查之间通过take_changes()取走并应用。
+    本地Docker监控不参与分配，各实例照常监控自己所在主机。
+    """
+    
+    def __init__(self, settings: Settings):
+        cluster_config = settings.get('cluster', {})
+        self.path = cluster_config.get('path', 'cluster.db')
+        self.instance_id = cluster_config.get('instance_id') or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl = cluster_config.get('lease_ttl', 30)
+        self.heartbeat_interval = cluster_config.get('heartbeat_interval', 10)
+        if self.lease_ttl <= self.heartbeat_interval * 2:
+            raise ValueError(f"cluster.lease_ttl({self.lease_ttl})必须大于heartbeat_interval的两倍")
+        
+        self.leases = LeaseStore(self.path)
+        self.dedup = SharedDedupTracker(settings, self.path)
+        self.settings = settings
+        self.owned: FrozenSet[str] = frozenset()
+        self._changed = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_cleanup = time.time()
+        self.logger = setup_logger()
+        registry.register_collector(self.collect_metrics)
+    
+    @staticmethod
+    def _server_names(settings: Settings) -> List[str]:
+        return [server.get('name', server['host']) for server in settings.remote_servers]
+    
+    def sync(self) -> FrozenSet[str]:
+        """同步一次租约，返回本实例负责的服务器"""
+        now = time.time()
+        with self._lock:
+            settings = self.settings
+        owned = self.leases.sync(self.instance_id, self._server_names(settings), now, self.lease_ttl)
+        
+        with self._lock:
+            if owned != self.owned:
+                gained = sorted(owned - self.owned)
+                lost = sorted(self.owned - owned)
+                self.owned = owned
+                self._changed = True
+                self.logger.info(f"🔀 集群重新分配: 接手 {gained or '无'}，移交 {lost or '无'}，"
+                                 f"当前负责 {len(owned)} 台服务器")
+        
+        if now - self._last_cleanup > settings.cleanup_interval:
+            self.dedup.cleanup(now)
+            self._last_cleanup = now
+        return owned
+    
+    def start(self):
+        """启动后台同步线程"""
+        self._thread = threading.Thread(target=self._run, name='cluster-lease', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stop_event.wait(self.heartbeat_interval):
+            try:
+                self.sync()
+            except sqlite3.Error as e:
+                self.logger.error(f"❌ 集群租约同步失败: {e}")
+    
+    def take_changes(self) -> Optional[FrozenSet[str]]:
+        """取走变化后的服务器分配，没有变化时返回None"""
+        with self._lock:
+            if not self._changed:
+                return None
+            self._changed = False
+            return self.owned
+    
+    def owned_settings(self, settings: Settings) -> Settings:
+        """只保留本实例负责的远程服务器"""
+        with self._lock:
+            owned = self.owned
+        servers = [server for server in settings.remote_servers if server.get('name', server['host']) in owned]
+        return Settings({**settings.raw, 'remote_servers': servers})
+    
+    def update_config(self, settings: Settings):
+        """服务器列表变化时立即同步"""
+        with self._lock:
+            self.settings = settings
+        self.dedup.update_config(settings)
+        self.sync()
+    
+    def collect_metrics(self) -> List:
+        """导出集群状态指标"""
+        instances = self.leases.live_instances(time.time(), self.lease_ttl)
+        return [
+            ('dlog_cluster_instances', 'gauge', '存活的集群实例数', [({}, len(instances))]),
+            ('dlog_cluster_owned_servers', 'gauge', '本实例负责的远程服务器数', [({}, len(self.owned))]),
+        ]
+    
+    def stop(self):
+        """退出集群，释放租约以便其他实例尽快接手"""
+        registry.unregister_collector(self.collect_metrics)
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        try:
+            self.leases.leave(self.instance_id)
+        except sqlite3.Error as e:
+            self.logger.error(f"❌ 退出集群失败: {e}")
+        self.leases.close()
+        self.dedup.store.close()
+        self.logger.info(f"👋 已退出集群: {self.instance_id}")
\ No newline at end of file
@@ -0,0 +1,91 @@
+import zlib
+from typing import List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_NONE = 'none'
+COMPRESSION_SSH = 'ssh'
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+
+COMPRESSION_MODES = (COMPRESSION_NONE, COMPRESSION_SSH, COMPRESSION_GZIP, COMPRESSION_ZSTD)
+
+# 远程端使用的压缩命令，优先压缩速度
+_REMOTE_COMMANDS = {
+    COMPRESSION_GZIP: 'gzip -c -1',
+    COMPRESSION_ZSTD: 'zstd -q -c -1',
+}
+
+
+def resolve_mode(mode: Optional[str]) -> str:
+    """规范化压缩模式，本地缺少zstandard时zstd降级为gzip"""
+    mode = (mode or COMPRESSION_NONE).lower()
+    if mode not in COMPRESSION_MODES:
+        raise ValueError(f"不支持的压缩模式: {mode}")
+    if mode == COMPRESSION_ZSTD and zstandard is None:
+        return COMPRESSION_GZIP
+    return mode
+
+
+def is_stream_mode(mode: str) -> bool:
+    """是否需要在远程管道中压缩输出"""
+    return mode in _REMOTE_COMMANDS
+
+
+def remote_command(mode: str) -> str:
+    """获取远程压缩命令"""
+    return _REMOTE_COMMANDS[mode]
+
+
+def get_decompressor(mode: str):
+    """创建流式解压器，返回对象提供decompress(bytes)和flush()"""
+    if mode == COMPRESSION_GZIP:
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if mode == COMPRESSION_ZSTD:
+        return _ZstdDecompressor()
+    raise ValueError(f"压缩模式 {mode} 不需要解压")
+
+
+class _ZstdDecompressor:
+    """为zstandard解压对象补齐flush()接口"""
+    
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+    
+    def decompress(self, data: bytes) -> bytes:
+        return self._obj.decompress(data)
+    
+    def flush(self) -> bytes:
+        return b''
+
+
+class LineSplitter:
+    """增量按行切分字节流，跨块的半行保留到下一块"""
+    
+    def __init__(self):
+        self._pending = b''
+        self.lines: List[str] = []
+        self.bytes_in = 0
+    
+    def feed(self, data: bytes):
+        """追加一块数据"""
+        if not data:
+            return
+        self.bytes_in += len(data)
+        data = self._pending + data
+        parts = data.split(b'\n')
+        self._pending = parts.pop()
+        for part in parts:
+            if part.strip():
+                self.lines.append(part.decode('utf-8', errors='ignore'))
+    
+    def close(self) -> List[str]:
+        """结束输入并返回全部行"""
+        if self._pending.strip():
+            self.lines.append(self._pending.decode('utf-8', errors='ignore'))
+        self._pending = b''
+        return self.lines
\ No newline at end of file
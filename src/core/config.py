@@ -1,6 +1,11 @@
+import copy
 import json
 import os
-from typing import Dict, Any
+import signal
+import threading
+from typing import Dict, Any, Optional
+from utils.logger import setup_logger
+from .settings import Settings
 
 
 class ConfigManager:
@@ -9,24 +14,38 @@ class ConfigManager:
     def __init__(self, config_file: str = 'config.json'):
         self.config_file = config_file
         self.config = self.load_config()
+        # 解析校验后的只读配置，供监控器和主循环使用
+        self.settings = Settings(self.config)
     
     def load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
         try:
             if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return self.read_config_file()
             return self.get_default_config()
         except Exception as e:
             print(f"❌ 加载配置文件失败: {e}")
             return self.get_default_config()
     
+    def read_config_file(self) -> Dict[str, Any]:
+        """读取并解析配置文件，失败时抛出异常"""
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def get_mtime(self) -> Optional[int]:
+        """配置文件修改时间，文件不存在时返回None"""
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+    
     def get_default_config(self) -> Dict[str, Any]:
         """获取默认配置"""
         return {
             "local_monitoring": {
                 "enabled": True,
-                "containers": []
+                "containers": [],
+                "log_source": "api"
             },
             "remote_servers": [],
             "log_levels": ["ERROR", "WARN"],
@@ -61,6 +80,21 @@ class ConfigManager:
                     "from_email": "",
                     "to_emails": [],
                     "ssl": True
+                },
+                "ndjson_file": {
+                    "enabled": False,
+                    "path": "events/events.ndjson",
+                    "max_bytes": 104857600,
+                    "backup_count": 5
+                },
+                "unix_socket": {
+                    "enabled": False,
+                    "path": "/run/dlog/events.sock"
+                },
+                "webhook": {
+                    "enabled": False,
+                    "url": "",
+                    "format": "ndjson"
                 }
             },
             "check_interval": 5,
@@ -80,7 +114,88 @@ class ConfigManager:
             "ssh_settings": {
                 "timeout": 10,
                 "max_connections": 5,
-                "connection_pool_size": 3
+                "max_sessions": 10,
+                "connection_pool_size": 3,
+                "checkout_timeout": 30,
+                "keepalive_interval": 30,
+                "idle_timeout": 300,
+                "health_check_interval": 60,
+                "startup_timeout": 15,
+                "startup_workers": 16,
+                "retry_interval": 30,
+                "retry_max_interval": 600,
+                "failure_threshold": 2,
+                "backoff_base": 10,
+                "backoff_max": 300,
+                "remote_filter": False,
+                "compression": "none",
+                "log_source": "api"
+            },
+            "metrics": {
+                "enabled": False,
+                "host": "127.0.0.1",
+                "port": 9108
+            },
+            "profiling": {
+                "enabled": False,
+                "mode": "cprofile",
+                "output_dir": "profiles",
+                "profile_ticks": 10,
+                "dump_interval": 0,
+                "sample_interval": 0.005
+            },
+            "config_reload": {
+                "enabled": True,
+                "poll_interval": 2
+            },
+            "fingerprint": {
+                "mode": "regex",
+                "depth": 4,
+                "similarity": 0.4,
+                "max_children": 100,
+                "max_clusters": 10000,
+                "state_file": "templates.json",
+                "save_interval": 300
+            },
+            "correlation": {
+                "enabled": False,
+                "window": 600,
+                "group_wait": 0,
+                "update_interval": 300,
+                "max_incidents": 10000,
+                "max_listed": 20
+            },
+            "overload": {
+                "enabled": False,
+                "tick_budget": 1.0,
+                "min_lines": 1000,
+                "sample_every": 100,
+                "recover_ticks": 3,
+                "alert_cooldown": 600
+            },
+            "priority": {
+                "enabled": False,
+                "keywords": ["OutOfMemoryError", "panic:", "segfault", "Segmentation fault"],
+                "cooldown": 60
+            },
+            "sharding": {
+                "workers": 0
+            },
+            "logging": {
+                "level": "INFO",
+                "dir": "logs",
+                "backup_count": 7,
+                "rate_limit": {
+                    "interval": 60,
+                    "burst": 5
+                }
+            },
+            "cluster": {
+                "enabled": False,
+                "path": "cluster.db",
+                "instance_id": "",
+                "lease_ttl": 30,
+                "heartbeat_interval": 10
             }
         }
     
@@ -109,13 +224,89 @@ class ConfigManager:
         return value
     
     def set(self, key: str, value: Any):
-        """设置配置值"""
+        """设置配置值并重新构建settings，新值校验失败时抛出ValueError，配置保持不变"""
         keys = key.split('.')
-        config = self.config
+        new_config = copy.deepcopy(self.config)
+        config = new_config
         
         for k in keys[:-1]:
             if k not in config:
                 config[k] = {}
             config = config[k]
         
-        config[keys[-1]] = value
\ No newline at end of file
+        config[keys[-1]] = value
+        self.settings = Settings(new_config)
+        self.config = new_config
+
+
+class ConfigWatcher:
+    """配置文件热加载
+    
+    后台线程按poll_interval轮询文件修改时间，收到SIGHUP时立即检查。
+    读取和解析在后台线程完成，新配置由主循环在两轮检查之间通过take_pending()取走并应用，
+    不会阻塞正在进行的检查。解析或校验失败时保留当前配置。
+    """
+    
+    def __init__(self, config_manager: ConfigManager, poll_interval: float = 2.0):
+        self.config_manager = config_manager
+        self.poll_interval = poll_interval
+        self._last_mtime = config_manager.get_mtime()
+        self._pending: Optional[Settings] = None
+        self._force = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.logger = setup_logger()
+    
+    def start(self):
+        """启动后台轮询线程"""
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+    
+    def install_signal_handler(self) -> bool:
+        """注册SIGHUP触发重新加载"""
+        if not hasattr(signal, 'SIGHUP'):
+            return False
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.request_reload())
+        return True
+    
+    def request_reload(self):
+        """请求立即重新加载（可在信号处理函数中调用）"""
+        self._force = True
+        self._wake.set()
+    
+    def take_pending(self) -> Optional[Settings]:
+        """取走待应用的新配置"""
+        with self._lock:
+            config, self._pending = self._pending, None
+            return config
+    
+    def stop(self):
+        """停止后台线程"""
+        self._stop_event.set()
+        self._wake.set()
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+            
+            mtime = self.config_manager.get_mtime()
+            if not self._force and mtime == self._last_mtime:
+                continue
+            self._force = False
+            self._last_mtime = mtime
+            if mtime is None:
+                continue
+            
+            try:
+                settings = Settings(self.config_manager.read_config_file())
+            except Exception as e:
+                self.logger.error(f"❌ 重新加载配置失败，继续使用当前配置: {e}")
+                continue
+            
+            with self._lock:
+                self._pending = settings
\ No newline at end of file
@@ -0,0 +1,182 @@
+import re
+from typing import List, Optional, Tuple
+
+from .settings import Settings
+
+
+# 异常链中总是保留的行：Caused by、Python的Traceback和链式异常说明、异常类型行
+_ANCHOR = re.compile(
+    r'^\s*(?:Caused by:|Suppressed:|Traceback \(most recent call last\):|'
+    r'During handling of the above exception|The above exception was the direct cause|'
+    r'Exception in thread |[\w$.]*(?:Error|Exception|Throwable|Exit|Interrupt)\b(?::|$))'
+)
+# 一个调用帧的起始行，其后的源码行、^^^标记等归入同一帧
+_FRAME = re.compile(r'^\s*(?:at\s+\S|File "[^"]*", line \d+)')
+# Java已经省略的公共帧，保留在所属异常的末尾
+_MORE = re.compile(r'^\s*\.\.\. \d+ (?:more|common frames omitted)')
+
+# 识别的递归循环最大长度（帧数）
+MAX_CYCLE = 8
+
+Line = Tuple[str, str]
+MARKER_PREFIX = "✂️  "
+
+
+class _Section:
+    """异常链中的一段：起始行（报错行或Caused by等）及其调用帧"""
+    
+    __slots__ = ('head', 'frames', 'tail')
+    
+    def __init__(self, head: Line):
+        self.head: List[Line] = [head]
+        self.frames: List[List[Line]] = []
+        self.tail: List[Line] = []
+
+
+class ContextCompressor:
+    """错误上下文压缩
+    
+    把报错行及其后的堆栈一次扫描切分为异常段（报错行、Caused by、Traceback等起始的段），
+    段内的行按调用帧归组，然后：
+    - 连续重复的帧或长度不超过MAX_CYCLE的帧循环（递归）只保留一轮，并注明重复次数
+    - 异常链的起始行、异常类型行和Java的"... N more"总是保留
+    - 每段最多保留stack_trace_lines行调用帧（保留开头和结尾，省略中间），
+      所有段合计不超过max_context_lines行，按段平均分配
+    - 报错行之前只保留最近的include_surrounding_lines行
+    各项行数为0表示不限制。被省略的内容以"✂️"开头的行注明。
+    """
+    
+    def __init__(self, max_context_lines: int = 25, stack_trace_lines: int = 15,
+                 include_surrounding_lines: int = 5):
+        self.max_context_lines = max_context_lines
+        self.stack_trace_lines = stack_trace_lines
+        self.include_surrounding_lines = include_surrounding_lines
+    
+    @classmethod
+    def from_settings(cls, settings: Settings) -> 'ContextCompressor':
+        return cls(
+            max_context_lines=settings.max_context_lines,
+            stack_trace_lines=settings.stack_trace_lines,
+            include_surrounding_lines=settings.include_surrounding_lines,
+        )
+    
+    def compress(self, lines: List[Line], error_offset: int) -> List[str]:
+        """压缩(前缀, 内容)形式的上下文行，error_offset为报错行的位置"""
+        output: List[str] = []
+        before = lines[:error_offset]
+        keep_before = self.include_surrounding_lines
+        if keep_before and len(before) > keep_before:
+            output.append(f"{MARKER_PREFIX}... 省略之前的{len(before) - keep_before}行")
+            before = before[-keep_before:]
+        output.extend(prefix + text for prefix, text in before)
+        if error_offset >= len(lines):
+            return output
+        
+        sections = self._split(lines[error_offset:])
+        for section in sections:
+            section.frames = self._collapse_cycles(section.frames)
+        
+        limits = self._frame_limits(sections, len(output))
+        for section, limit in zip(sections, limits):
+            output.extend(prefix + text for prefix, text in section.head)
+            self._emit_frames(section.frames, limit, output)
+            output.extend(prefix + text for prefix, text in section.tail)
+        return output
+    
+    def _split(self, lines: List[Line]) -> List[_Section]:
+        """一次扫描切分异常段并把行归入调用帧"""
+        sections = [_Section(lines[0])]
+        for line in lines[1:]:
+            text = line[1]
+            section = sections[-1]
+            if _FRAME.match(text):
+                section.frames.append([line])
+            elif _MORE.match(text):
+                section.tail.append(line)
+            elif _ANCHOR.match(text):
+                sections.append(_Section(line))
+            elif section.frames and not section.tail:
+                # 源码行、^^^标记、[Previous line repeated ...]等归入当前帧
+                section.frames[-1].append(line)
+            elif section.tail:
+                section.tail.append(line)
+            else:
+                section.head.append(line)
+        return sections
+    
+    @staticmethod
+    def _collapse_cycles(frames: List[List[Line]]) -> List[List[Line]]:
+        """合并连续重复的帧序列，每个位置最多比较MAX_CYCLE种循环长度，总开销与帧数成线性"""
+        keys = ['\n'.join(text for _, text in frame) for frame in frames]
+        count = len(keys)
+        result: List[List[Line]] = []
+        i = 0
+        while i < count:
+            for period in range(1, MAX_CYCLE + 1):
+                if i + 2 * period > count or keys[i + period] != keys[i] \
+                        or keys[i + period:i + 2 * period] != keys[i:i + period]:
+                    continue
+                end = i + 2 * period
+                while end + period <= count and keys[end:end + period] == keys[i:i + period]:
+                    end += period
+                result.extend(frames[i:i + period])
+                repeats = (end - i) // period - 1
+                label = "上一帧" if period == 1 else f"以上{period}帧"
+                result.append([(MARKER_PREFIX, f"... {label}又重复了{repeats}次")])
+                i = end
+                break
+            else:
+                result.append(frames[i])
+                i += 1
+        return result
+    
+    def _frame_limits(self, sections: List[_Section], used: int) -> List[Optional[int]]:
+        """每段可以输出的调用帧行数，None表示不限制"""
+        per_section = self.stack_trace_lines or None
+        needs = [sum(len(frame) for frame in section.frames) for section in sections]
+        if per_section is not None:
+            needs = [min(need, per_section) for need in needs]
+        if not self.max_context_lines:
+            return [per_section] * len(sections)
+        
+        fixed = used + sum(len(section.head) + len(section.tail) for section in sections)
+        remaining = max(0, self.max_context_lines - fixed)
+        # 需求少的段先分配，用不完的份额留给后面的段
+        limits: List[Optional[int]] = [0] * len(sections)
+        order = sorted((i for i, need in enumerate(needs) if need), key=needs.__getitem__)
+        for position, index in enumerate(order):
+            share = remaining // (len(order) - position)
+            limits[index] = min(needs[index], share)
+            remaining -= limits[index]
+        return limits
+    
+    @staticmethod
+    def _emit_frames(frames: List[List[Line]], limit: Optional[int], output: List[str]):
+        """输出调用帧，超过limit行时保留开头和结尾，省略中间"""
+        total = sum(len(frame) for frame in frames)
+        if limit is None or total <= limit:
+            for frame in frames:
+                output.extend(prefix + text for prefix, text in frame)
+            return
+        if limit <= 0:
+            if frames:
+                output.append(f"{MARKER_PREFIX}... 省略{len(frames)}帧")
+            return
+        
+        # 省略说明占一行，其余按行数分给开头和结尾
+        budget = limit - 1
+        head_budget = (budget + 1) // 2
+        head, used = 0, 0
+        while head < len(frames) and used + len(frames[head]) <= head_budget:
+            used += len(frames[head])
+            head += 1
+        tail, tail_used = len(frames), 0
+        while tail > head and used + tail_used + len(frames[tail - 1]) <= budget:
+            tail -= 1
+            tail_used += len(frames[tail])
+        
+        for frame in frames[:head]:
+            output.extend(prefix + text for prefix, text in frame)
+        output.append(f"{MARKER_PREFIX}... 省略{tail - head}帧")
+        for frame in frames[tail:]:
+            output.extend(prefix + text for prefix, text in frame)
\ No newline at end of file
@@ -0,0 +1,181 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .settings import Settings
+from utils.metrics import CORRELATED_EVENTS, OPEN_INCIDENTS
+
+
+LOCAL_SERVER = '本地'
+
+
+class Incident:
+    """同一指纹在一个时间窗口内的所有事件，按(服务器, 容器)记录受影响的成员"""
+    
+    __slots__ = ('incident_id', 'fingerprint', 'opened_at', 'last_seen', 'sample',
+                 'members', 'unannounced', 'pending_count', 'last_emitted', 'emitted')
+    
+    def __init__(self, incident_id: int, fingerprint: str, sample: Dict[str, Any], now: float):
+        self.incident_id = incident_id
+        self.fingerprint = fingerprint
+        self.opened_at = now
+        self.last_seen = now
+        # 第一条事件的上下文作为整个故障的示例
+        self.sample = sample
+        self.members: Dict[Tuple[str, str], int] = {}
+        self.unannounced: Dict[Tuple[str, str], None] = {}
+        self.pending_count = 0
+        self.last_emitted = 0.0
+        self.emitted = 0
+    
+    def add(self, event: Dict[str, Any], now: float):
+        member = (event.get('server', LOCAL_SERVER), event['container'])
+        if member not in self.members:
+            self.members[member] = 0
+            self.unannounced[member] = None
+        self.members[member] += event['count']
+        self.pending_count += event['count']
+        self.last_seen = now
+    
+    @property
+    def servers(self) -> List[str]:
+        return list(dict.fromkeys(server for server, _ in self.members))
+
+
+class IncidentCorrelator:
+    """跨容器、跨服务器的故障关联
+    
+    共享依赖（如数据库）故障时，同一错误会同时出现在多台服务器的多个副本中，每个副本的去重键不同，
+    各自发送一次通知。关联阶段位于去重之后、发送通知之前：按与容器和服务器无关的错误指纹，
+    把window秒内的事件合并为一个故障，只通知一次并列出受影响的服务器和容器。
+    事件带correlation_key时按它关联（模板指纹为模板文本，各进程的模板编号不同），否则按fingerprint。
+    
+    - 故障开启后等待group_wait秒再发送，收集同时出错的其他副本
+    - 之后新加入的容器不立即通知，距上次通知满update_interval秒后再发送一次更新
+    - 故障从开启起window秒后关闭，同一指纹再次出现时开启新的故障并重新通知
+    
+    指纹到故障的索引是按开启时间排序的OrderedDict，到期和超出max_incidents时从头部淘汰，
+    淘汰的故障与到期关闭一样先发送尚未通知的成员。每个事件的处理与当前故障数无关。
+    """
+    
+    def __init__(self, settings: Settings):
+        self.incidents: 'OrderedDict[str, Incident]' = OrderedDict()
+        # 有尚未通知的成员的故障，按加入顺序发送
+        self._pending: Dict[str, None] = {}
+        self.next_id = 1
+        self.update_config(settings)
+    
+    def update_config(self, settings: Settings):
+        """应用新配置，已开启的故障保留"""
+        correlation = settings.get('correlation', {})
+        self.window = correlation.get('window', 600)
+        self.group_wait = correlation.get('group_wait', 0)
+        self.update_interval = correlation.get('update_interval', 300)
+        self.max_incidents = correlation.get('max_incidents', 10000)
+        self.max_listed = correlation.get('max_listed', 20)
+    
+    def process(self, events: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """合并本轮事件，返回需要通知的事件；没有新事件时也应每轮调用，以发送等待中的故障"""
+        now = time.time() if now is None else now
+        output = self._expire(now)
+        for event in events:
+            fingerprint = event.get('correlation_key', event.get('fingerprint'))
+            if fingerprint is None:
+                output.append(event)
+                continue
+            
+            incident = self.incidents.get(fingerprint)
+            if incident is None:
+                incident = Incident(self.next_id, fingerprint, event, now)
+                self.next_id += 1
+                self.incidents[fingerprint] = incident
+            incident.add(event, now)
+            self._pending[fingerprint] = None
+        
+        for fingerprint in list(self._pending):
+            incident = self.incidents[fingerprint]
+            if incident.emitted:
+                due = incident.last_emitted + self.update_interval
+            else:
+                due = incident.opened_at + self.group_wait
+            if now >= due:
+                del self._pending[fingerprint]
+                output.append(self._emit(incident, now))
+        
+        output += self._evict(now)
+        CORRELATED_EVENTS.inc(len(events), ('received',))
+        CORRELATED_EVENTS.inc(len(output), ('notified',))
+        OPEN_INCIDENTS.set(len(self.incidents))
+        return output
+    
+    def _expire(self, now: float) -> List[Dict[str, Any]]:
+        """关闭已到期的故障，尚未通知的成员在关闭前发送"""
+        output = []
+        while self.incidents:
+            fingerprint, incident = next(iter(self.incidents.items()))
+            if now - incident.opened_at < self.window:
+                break
+            del self.incidents[fingerprint]
+            if fingerprint in self._pending:
+                del self._pending[fingerprint]
+                output.append(self._emit(incident, now))
+        return output
+    
+    def _evict(self, now: float) -> List[Dict[str, Any]]:
+        """故障数超过上限时淘汰最早开启的，与到期关闭一样先发送尚未通知的成员"""
+        output = []
+        evicted = 0
+        while len(self.incidents) > self.max_incidents:
+            fingerprint, incident = self.incidents.popitem(last=False)
+            evicted += 1
+            if fingerprint in self._pending:
+                del self._pending[fingerprint]
+                output.append(self._emit(incident, now))
+        if evicted:
+            CORRELATED_EVENTS.inc(evicted, ('evicted',))
+        return output
+    
+    def _emit(self, incident: Incident, now: float) -> Dict[str, Any]:
+        """生成故障通知事件，只有一个成员时原样返回第一条事件"""
+        update = incident.emitted > 0
+        new_members = list(incident.unannounced)
+        count, incident.pending_count = incident.pending_count, 0
+        incident.unannounced = {}
+        incident.last_emitted = now
+        incident.emitted += 1
+        
+        if len(incident.members) == 1 and not update:
+            return {**incident.sample, 'count': count}
+        
+        servers = incident.servers
+        containers = list(dict.fromkeys(container for _, container in incident.members))
+        event = dict(incident.sample)
+        event['count'] = count
+        event['container'] = containers[0] if len(containers) == 1 else f"{containers[0]} 等{len(incident.members)}个容器"
+        if len(servers) > 1:
+            event['server'] = f"{servers[0]} 等{len(servers)}台服务器"
+        event['context'] = self._format_context(incident, new_members, update)
+        event['incident'] = {
+            'id': incident.incident_id,
+            'fingerprint': incident.fingerprint,
+            'update': update,
+            'servers': servers,
+            'members': [{'server': server, 'container': container, 'count': member_count}
+                        for (server, container), member_count in incident.members.items()],
+        }
+        return event
+    
+    def _format_context(self, incident: Incident, new_members: List[Tuple[str, str]], update: bool) -> str:
+        new = set(new_members)
+        label = "故障更新" if update else "关联故障"
+        lines = [f"🔗 {label} #{incident.incident_id}: {len(incident.members)}个容器 / "
+                 f"{len(incident.servers)}台服务器受影响"]
+        members = sorted(incident.members.items(), key=lambda item: item[0] not in new)
+        for (server, container), count in members[:self.max_listed]:
+            marker = " (新增)" if update and (server, container) in new else ""
+            lines.append(f"- {server}:{container} ×{count}{marker}")
+        if len(members) > self.max_listed:
+            lines.append(f"- ... 另有{len(members) - self.max_listed}个容器")
+        lines.append("")
+        lines.append(incident.sample['context'])
+        return '\n'.join(lines)
\ No newline at end of file
@@ -0,0 +1,71 @@
+from typing import Dict
+
+from .settings import Settings
+
+
+class DedupTracker:
+    """错误去重与通知节流状态
+
+    按错误指纹累计出现次数：冷却期内只计数，达到阈值时允许发送一次通知并重新计数。
+    单进程模式下每个监控器各持有一个，分片模式下由协调进程统一持有。
+    """
+    
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.error_counts: Dict[str, int] = {}
+        self.last_notification_time: Dict[str, float] = {}
+    
+    def update_config(self, settings: Settings):
+        """应用新配置，保留计数"""
+        self.settings = settings
+    
+    def record(self, error_key: str, now: float, occurrences: int = 1) -> tuple:
+        """记录错误出现，返回(should_send, current_count)"""
+        current_count = self.error_counts.get(error_key, 0) + occurrences
+        
+        # 检查冷却时间
+        last_notification = self.last_notification_time.get(error_key, 0)
+        if now - last_notification < self.settings.cooldown_seconds:
+            self.error_counts[error_key] = current_count
+            return False, current_count
+        
+        if current_count >= self.settings.error_threshold:
+            self.last_notification_time[error_key] = now
+            self.error_counts[error_key] = 0
+            return True, current_count
+        
+        self.error_counts[error_key] = current_count
+        return False, current_count
+    
+    def mark_notified(self, error_key: str, now: float):
+        """记录已经通过其他途径（紧急告警快速通道）发出的通知，冷却期内不再重复通知"""
+        self.last_notification_time[error_key] = now
+        self.error_counts[error_key] = 0
+    
+    def cleanup(self, now: float):
+        """清理过期条目并限制内存占用"""
+        window = self.settings.deduplication_window
+        max_entries = self.settings.max_memory_entries
+        
+        # 清理过期错误
+        keys_to_remove = []
+        for key, count in self.error_counts.items():
+            last_time = self.last_notification_time.get(key, now)
+            if now - last_time > window and count == 0:
+                keys_to_remove.append(key)
+        
+        for key in keys_to_remove:
+            self.error_counts.pop(key, None)
+            self.last_notification_time.pop(key, None)
+        
+        # 内存限制清理
+        if len(self.error_counts) > max_entries:
+            sorted_keys = sorted(self.last_notification_time.keys(),
+                               key=lambda k: self.last_notification_time.get(k, 0))
+            keys_to_remove = sorted_keys[:len(self.error_counts) - max_entries]
+            for key in keys_to_remove:
+                self.error_counts.pop(key, None)
+                self.last_notification_time.pop(key, None)
+    
+    def __len__(self) -> int:
+        return len(self.error_counts)
\ No newline at end of file
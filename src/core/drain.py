@@ -0,0 +1,255 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .settings import Settings
+
+
+WILDCARD = '<*>'
+
+# 在分词前替换的变量，按从具体到一般的顺序合并为一个正则，一次扫描完成
+_MASK = re.compile('|'.join((
+    r'(?P<UUID>\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b)',
+    r'(?P<IP>\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b)',
+    r'(?P<HEX>\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b)',
+    r'(?P<NUM>(?<![\w.])[-+]?\d+(?:\.\d+)?(?!\w|\.\d))',
+)))
+_MASK_TOKENS = {name: f'<{name}>' for name in _MASK.groupindex}
+_DIGIT = re.compile(r'\d')
+
+
+def _mask_token(match) -> str:
+    return _MASK_TOKENS[match.lastgroup]
+
+
+def _has_digit(token: str) -> bool:
+    return _DIGIT.search(token) is not None
+
+
+class LogCluster:
+    """一个日志模板及其匹配次数"""
+    
+    __slots__ = ('cluster_id', 'template', 'size', 'leaf')
+    
+    def __init__(self, cluster_id: int, template: List[str], size: int = 1):
+        self.cluster_id = cluster_id
+        self.template = template
+        self.size = size
+        # 所在叶子节点的模板编号列表，淘汰时从中移除
+        self.leaf: Optional[List[int]] = None
+    
+    @property
+    def template_text(self) -> str:
+        return ' '.join(self.template)
+
+
+class _Node:
+    __slots__ = ('children', 'cluster_ids')
+    
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.cluster_ids: List[int] = []
+
+
+class DrainMiner:
+    """Drain风格的在线日志模板挖掘
+
+    固定深度的解析树：第一层按分词后的长度，之后depth-2层按前几个词（含数字的词和超过max_children后的新词
+    归入通配节点），叶子节点保存模板列表。一行日志沿树下降后只与同一叶子中的模板比较，
+    相同位置相同词的比例不低于similarity时归入该模板，不同的位置变为<*>，否则新建模板。
+    每行的开销与模板总数无关；模板编号一经分配不再变化，可以作为去重指纹。
+    模板数超过max_clusters时淘汰最久未匹配的模板。
+    """
+    
+    def __init__(self, depth: int = 4, similarity: float = 0.4, max_children: int = 100,
+                 max_clusters: int = 10000):
+        if depth < 3:
+            raise ValueError(f"fingerprint.depth不能小于3: {depth}")
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.root = _Node()
+        self.clusters: 'OrderedDict[int, LogCluster]' = OrderedDict()
+        self.next_id = 1
+        # 指纹前缀，多个模板树同时使用时（分片模式下每个进程一个）区分各自的模板编号
+        self.scope = ''
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_settings(cls, settings: Settings) -> 'DrainMiner':
+        fingerprint = settings.get('fingerprint', {})
+        return cls(
+            depth=fingerprint.get('depth', 4),
+            similarity=fingerprint.get('similarity', 0.4),
+            max_children=fingerprint.get('max_children', 100),
+            max_clusters=fingerprint.get('max_clusters', 10000),
+        )
+    
+    def params(self) -> Dict[str, Any]:
+        """决定树结构的参数，变化后已有模板不再适用"""
+        return {
+            'depth': self.depth,
+            'similarity': self.similarity,
+            'max_children': self.max_children,
+            'max_clusters': self.max_clusters,
+        }
+    
+    @staticmethod
+    def tokenize(message: str) -> List[str]:
+        """替换变量后按空白分词"""
+        tokens = message.split()
+        # 变量都含数字，只对含数字的词做替换
+        for i, token in enumerate(tokens):
+            if _DIGIT.search(token):
+                tokens[i] = _MASK.sub(_mask_token, token)
+        return tokens
+    
+    def add(self, message: str) -> LogCluster:
+        """把一行日志归入模板，返回所属模板"""
+        tokens = self.tokenize(message)
+        with self._lock:
+            leaf = self._descend(tokens, create=True)
+            cluster = self._best_match(leaf, tokens)
+            if cluster is not None:
+                cluster.size += 1
+                if cluster.template != tokens:
+                    cluster.template = [
+                        token if token == other else WILDCARD
+                        for token, other in zip(cluster.template, tokens)
+                    ]
+                self.clusters.move_to_end(cluster.cluster_id)
+                return cluster
+            
+            cluster = LogCluster(self.next_id, tokens)
+            self.next_id += 1
+            self._insert(leaf, cluster)
+            return cluster
+    
+    def match(self, message: str) -> Optional[LogCluster]:
+        """只查找匹配的模板，不修改树"""
+        tokens = self.tokenize(message)
+        with self._lock:
+            leaf = self._descend(tokens, create=False)
+            return self._best_match(leaf, tokens) if leaf is not None else None
+    
+    def _descend(self, tokens: List[str], create: bool) -> Optional[_Node]:
+        """按长度和前depth-2个词找到叶子节点"""
+        node = self.root.children.get(str(len(tokens)))
+        if node is None:
+            if not create:
+                return None
+            node = self.root.children[str(len(tokens))] = _Node()
+        
+        for token in tokens[:self.depth - 2]:
+            key = WILDCARD if _has_digit(token) else token
+            child = node.children.get(key)
+            if child is None:
+                if not create:
+                    child = node.children.get(WILDCARD)
+                    if child is None:
+                        return None
+                else:
+                    # 子节点已满时新出现的词都归入通配节点
+                    if len(node.children) >= self.max_children:
+                        key = WILDCARD
+                    child = node.children.setdefault(key, _Node())
+            node = child
+        return node
+    
+    def _best_match(self, leaf: _Node, tokens: List[str]) -> Optional[LogCluster]:
+        """叶子中相似度最高的模板，低于阈值时返回None"""
+        best, best_score, best_wildcards = None, -1.0, -1
+        for cluster_id in leaf.cluster_ids:
+            cluster = self.clusters[cluster_id]
+            same = wildcards = 0
+            for token, other in zip(cluster.template, tokens):
+                if token == WILDCARD:
+                    wildcards += 1
+                elif token == other:
+                    same += 1
+            score = same / len(tokens) if tokens else 1.0
+            if score > best_score or (score == best_score and wildcards > best_wildcards):
+                best, best_score, best_wildcards = cluster, score, wildcards
+        
+        if best is not None and (best_score >= self.similarity or not tokens):
+            return best
+        return None
+    
+    def _insert(self, leaf: _Node, cluster: LogCluster):
+        leaf.cluster_ids.append(cluster.cluster_id)
+        cluster.leaf = leaf.cluster_ids
+        self.clusters[cluster.cluster_id] = cluster
+        while len(self.clusters) > self.max_clusters:
+            _, evicted = self.clusters.popitem(last=False)
+            evicted.leaf.remove(evicted.cluster_id)
+    
+    def top(self, limit: int = 20) -> List[LogCluster]:
+        """匹配次数最多的模板"""
+        with self._lock:
+            return sorted(self.clusters.values(), key=lambda c: c.size, reverse=True)[:limit]
+    
+    def format_tree(self) -> str:
+        """以缩进文本展示解析树，用于排查模板划分"""
+        lines = []
+        
+        def walk(node: _Node, label: str, indent: int):
+            lines.append(f"{'  ' * indent}{label}")
+            for cluster_id in node.cluster_ids:
+                cluster = self.clusters[cluster_id]
+                lines.append(f"{'  ' * (indent + 1)}T{cluster.cluster_id} ({cluster.size}次) {cluster.template_text}")
+            for key in sorted(node.children):
+                walk(node.children[key], key, indent + 1)
+        
+        with self._lock:
+            for length in sorted(self.root.children, key=int):
+                walk(self.root.children[length], f"长度={length}", 0)
+        return '\n'.join(lines)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'version': 1,
+                'params': self.params(),
+                'next_id': self.next_id,
+                # 按最近匹配的先后顺序保存，恢复后淘汰顺序不变
+                'clusters': [
+                    {'id': c.cluster_id, 'template': c.template, 'size': c.size}
+                    for c in self.clusters.values()
+                ],
+            }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **overrides) -> 'DrainMiner':
+        miner = cls(**{**data.get('params', {}), **overrides})
+        for item in data.get('clusters', []):
+            cluster = LogCluster(item['id'], list(item['template']), item.get('size', 1))
+            miner._insert(miner._descend(cluster.template, create=True), cluster)
+        miner.next_id = max(data.get('next_id', 1), max(miner.clusters, default=0) + 1)
+        return miner
+    
+    def save(self, path: str):
+        """原子写入状态文件"""
+        data = self.to_dict()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.drain-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path: str, **overrides) -> 'DrainMiner':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f), **overrides)
+    
+    def __len__(self) -> int:
+        return len(self.clusters)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import time
+import threading
+from typing import Dict
+from utils.logger import setup_logger
+
+
+class CircuitState:
+    """熔断器状态"""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class ServerHealth:
+    """单台服务器的熔断器
+
+    连续失败达到failure_threshold次后熔断打开，在退避时间内拒绝所有请求；
+    退避结束后进入半开状态，只放行一个探测请求：成功则关闭熔断，失败则以
+    翻倍的退避时间重新打开（上限max_backoff）。探测没有记录结果（例如因非连接错误中断）时，
+    再过一个退避时间放行下一个探测，不会一直停留在半开状态。
+    """
+    
+    def __init__(self, failure_threshold: int = 2, base_backoff: float = 10,
+                 max_backoff: float = 300):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0
+        self.next_attempt = 0.0
+        self.backoff = 0.0
+        self._lock = threading.Lock()
+    
+    def is_available(self) -> bool:
+        """熔断是否处于关闭状态（不消耗探测名额）"""
+        return self.state == CircuitState.CLOSED
+    
+    def allow_request(self) -> bool:
+        """是否允许发起请求；退避结束时放行一个半开探测"""
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+            now = time.monotonic()
+            if now < self.next_attempt:
+                return False
+            # 打开状态退避结束，或半开探测超过一个退避时间仍没有结果
+            self.state = CircuitState.HALF_OPEN
+            self.next_attempt = now + self.backoff
+            return True
+    
+    def record_success(self) -> bool:
+        """记录成功，返回是否从熔断中恢复"""
+        with self._lock:
+            recovered = self.state != CircuitState.CLOSED
+            self.state = CircuitState.CLOSED
+            self.consecutive_failures = 0
+            self.open_count = 0
+            return recovered
+    
+    def record_failure(self) -> float:
+        """记录失败，熔断打开时返回退避秒数，否则返回0"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == CircuitState.OPEN:
+                return 0.0
+            if self.state == CircuitState.CLOSED and self.consecutive_failures < self.failure_threshold:
+                return 0.0
+            
+            backoff = min(self.base_backoff * (2 ** self.open_count), self.max_backoff)
+            self.open_count += 1
+            self.state = CircuitState.OPEN
+            self.backoff = backoff
+            self.next_attempt = time.monotonic() + backoff
+            return backoff
+
+
+class ServerHealthTracker:
+    """按服务器名称维护熔断器"""
+    
+    def __init__(self, failure_threshold: int = 2, base_backoff: float = 10,
+                 max_backoff: float = 300):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.servers: Dict[str, ServerHealth] = {}
+        self._lock = threading.Lock()
+        self.logger = setup_logger()
+    
+    def get(self, server_name: str) -> ServerHealth:
+        """获取（必要时创建）服务器的熔断器"""
+        with self._lock:
+            health = self.servers.get(server_name)
+            if health is None:
+                health = ServerHealth(self.failure_threshold, self.base_backoff, self.max_backoff)
+                self.servers[server_name] = health
+            return health
+    
+    def is_available(self, server_name: str) -> bool:
+        """服务器熔断是否关闭"""
+        return self.get(server_name).is_available()
+    
+    def allow_request(self, server_name: str) -> bool:
+        """是否允许向服务器发起请求"""
+        return self.get(server_name).allow_request()
+    
+    def record_success(self, server_name: str):
+        """记录请求成功"""
+        if self.get(server_name).record_success():
+            self.logger.info(f"✅ 服务器 {server_name} 已恢复，熔断关闭")
+    
+    def record_failure(self, server_name: str):
+        """记录请求失败"""
+        backoff = self.get(server_name).record_failure()
+        if backoff:
+            self.logger.warning(f"🔌 服务器 {server_name} 连续失败，熔断打开，{backoff:.0f}秒后探测")
+    
+    def get_states(self) -> Dict[str, str]:
+        """获取所有服务器的熔断状态"""
+        with self._lock:
+            return {name: health.state for name, health in self.servers.items()}
+    
+    def remove(self, server_name: str):
+        """移除服务器的熔断器"""
+        with self._lock:
+            self.servers.pop(server_name, None)
\ No newline at end of file
@@ -0,0 +1,237 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from utils.logger import setup_logger
+
+
+# 与Docker API读取方式一致，首次接入时只读取最后500行
+DEFAULT_TAIL = 500
+# 每个容器每轮最多读取的字节数
+DEFAULT_MAX_READ_BYTES = 8 * 1024 * 1024
+# 非json-file驱动或无权读取的容器改走Docker API，隔一段时间后再尝试直接读取
+FALLBACK_RECHECK_SECONDS = 60
+
+
+class JsonLogDecoder:
+    """把json-file日志记录解析为"时间戳 内容"格式的行，与docker logs --timestamps一致
+    
+    数据可以分多次送入：末尾不完整的一行保留到下一次；Docker把超过16KB的一行拆成多条记录，
+    未以换行结尾的记录拼接到下一条。
+    """
+    
+    __slots__ = ('remainder', 'partial')
+    
+    def __init__(self):
+        self.remainder = b''
+        self.partial = ''
+    
+    def reset(self):
+        self.remainder = b''
+        self.partial = ''
+    
+    def feed(self, data: bytes) -> List[str]:
+        if self.remainder:
+            data = self.remainder + data
+        end = data.rfind(b'\n')
+        if end < 0:
+            self.remainder = data
+            return []
+        self.remainder = data[end + 1:]
+        
+        lines = []
+        for raw in data[:end].split(b'\n'):
+            if not raw:
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+            log = record.get('log', '')
+            if not log.endswith('\n'):
+                self.partial += log
+                continue
+            if self.partial:
+                log = self.partial + log
+                self.partial = ''
+            lines.append(f"{record.get('time', '')} {log.rstrip()}")
+        return lines
+
+
+class _Cursor:
+    """单个容器日志文件的读取位置"""
+    
+    __slots__ = ('container_id', 'path', 'file', 'inode', 'offset', 'decoder')
+    
+    def __init__(self, container_id: str, path: str, file, offset: int):
+        self.container_id = container_id
+        self.path = path
+        self.file = file
+        self.inode = os.fstat(file.fileno()).st_ino
+        self.offset = offset
+        self.decoder = JsonLogDecoder()
+
+
+class JsonFileTailer:
+    """直接读取json-file日志驱动的日志文件，绕过Docker守护进程
+
+    通过inspect得到容器的LogPath后按字节偏移持续读取，每轮先用stat比较inode和大小，
+    没有新内容时不读文件。文件被轮转（改名为.log.1并新建）时先读完仍打开的旧文件，
+    再从头读取新文件；被截断时从头读取。read()返回与docker logs --timestamps相同格式的行，
+    无法直接读取时返回None，由调用方改走Docker API。
+    """
+    
+    def __init__(self, docker_client, tail: int = DEFAULT_TAIL, max_read_bytes: int = DEFAULT_MAX_READ_BYTES):
+        self.docker_client = docker_client
+        self.tail = tail
+        self.max_read_bytes = max_read_bytes
+        self.logger = setup_logger()
+        self._cursors: Dict[str, _Cursor] = {}
+        self._fallback: Dict[str, float] = {}
+    
+    def read(self, container_name: str) -> Optional[List[str]]:
+        """读取容器自上次以来的新日志行"""
+        cursor = self._cursors.get(container_name)
+        if cursor is None:
+            cursor = self._attach(container_name)
+            if cursor is None:
+                return None
+            return cursor.decoder.feed(self._read_tail(cursor))
+        
+        try:
+            stat = os.stat(cursor.path)
+        except FileNotFoundError:
+            # 容器被删除或重建，读完旧文件后重新inspect
+            data = self._drain(cursor)
+            self.forget(container_name)
+            return cursor.decoder.feed(data)
+        
+        if stat.st_ino == cursor.inode:
+            if stat.st_size == cursor.offset:
+                return []
+            if stat.st_size < cursor.offset:
+                self.logger.info(f"✂️ 容器 {container_name} 的日志文件被截断，从头读取")
+                cursor.offset = 0
+                cursor.decoder.reset()
+            return cursor.decoder.feed(self._read_chunk(cursor))
+        
+        return cursor.decoder.feed(self._rotate(container_name, cursor))
+    
+    def _attach(self, container_name: str) -> Optional[_Cursor]:
+        """inspect容器并打开日志文件，失败时记录回退"""
+        fallback_since = self._fallback.get(container_name)
+        if fallback_since is not None and time.monotonic() - fallback_since < FALLBACK_RECHECK_SECONDS:
+            return None
+        
+        try:
+            container = self.docker_client.containers.get(container_name)
+            attrs = container.attrs
+        except Exception as e:
+            self.logger.error(f"获取容器 {container_name} 信息失败: {e}")
+            return None
+        
+        driver = attrs.get('HostConfig', {}).get('LogConfig', {}).get('Type', 'json-file')
+        path = attrs.get('LogPath')
+        if driver != 'json-file' or not path:
+            self._fall_back(container_name, f"日志驱动为 {driver}")
+            return None
+        
+        try:
+            file = open(path, 'rb', buffering=0)
+        except OSError as e:
+            self._fall_back(container_name, f"无法读取 {path}: {e}")
+            return None
+        
+        self._fallback.pop(container_name, None)
+        cursor = _Cursor(attrs.get('Id', ''), path, file, 0)
+        self._cursors[container_name] = cursor
+        self.logger.info(f"📄 直接读取容器 {container_name} 的日志文件: {path}")
+        return cursor
+    
+    def _fall_back(self, container_name: str, reason: str):
+        if container_name not in self._fallback:
+            self.logger.warning(f"⚠️ 容器 {container_name} {reason}，改用Docker API读取日志")
+        self._fallback[container_name] = time.monotonic()
+    
+    def _read_tail(self, cursor: _Cursor) -> bytes:
+        """首次接入时从文件末尾向前读取最后tail行，之后从文件末尾继续"""
+        size = os.fstat(cursor.file.fileno()).st_size
+        if not self.tail:
+            cursor.offset = size
+            return b''
+        
+        start = size
+        data = b''
+        while start > 0 and data.count(b'\n') <= self.tail:
+            step = min(start, 64 * 1024)
+            start -= step
+            data = os.pread(cursor.file.fileno(), step, start) + data
+        
+        cursor.offset = size
+        if start > 0:
+            # 丢弃第一行（可能不完整）及超出tail的行
+            lines = data.split(b'\n')
+            data = b'\n'.join(lines[-self.tail - 1:])
+        return data
+    
+    def _read_chunk(self, cursor: _Cursor) -> bytes:
+        """从当前偏移一次读取至多max_read_bytes字节"""
+        data = os.pread(cursor.file.fileno(), self.max_read_bytes, cursor.offset)
+        cursor.offset += len(data)
+        return data
+    
+    def _drain(self, cursor: _Cursor) -> bytes:
+        """读完仍打开的文件并关闭"""
+        chunks = []
+        while True:
+            chunk = self._read_chunk(cursor)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        cursor.file.close()
+        return b''.join(chunks)
+    
+    def _rotate(self, container_name: str, cursor: _Cursor) -> bytes:
+        """文件已轮转：读完旧文件和期间产生的.log.1，再切换到新文件"""
+        data = self._drain(cursor)
+        old_inode = cursor.inode
+        
+        try:
+            file = open(cursor.path, 'rb', buffering=0)
+        except FileNotFoundError:
+            self.forget(container_name)
+            return data
+        new_inode = os.fstat(file.fileno()).st_ino
+        
+        # 两轮之间轮转了不止一次时，.log.1既不是旧文件也不是新文件
+        rotated = f"{cursor.path}.1"
+        try:
+            rotated_inode = os.stat(rotated).st_ino
+        except FileNotFoundError:
+            rotated_inode = None
+        if rotated_inode is not None and rotated_inode not in (old_inode, new_inode):
+            with open(rotated, 'rb') as skipped:
+                data += skipped.read()
+        
+        cursor.file = file
+        cursor.inode = new_inode
+        cursor.offset = 0
+        self.logger.info(f"🔁 容器 {container_name} 的日志文件已轮转")
+        return data + self._read_chunk(cursor)
+    
+    def forget(self, container_name: str):
+        """关闭并移除容器的读取位置"""
+        cursor = self._cursors.pop(container_name, None)
+        if cursor is not None and not cursor.file.closed:
+            cursor.file.close()
+    
+    def retain(self, container_names: Iterable[str]):
+        """只保留仍在监控的容器，关闭其余文件"""
+        keep = set(container_names)
+        for container_name in [name for name in self._cursors if name not in keep]:
+            self.forget(container_name)
+    
+    def close(self):
+        for container_name in list(self._cursors):
+            self.forget(container_name)
\ No newline at end of file
@@ -1,31 +1,148 @@
-import docker
 import re
 import time
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Optional
 from utils.logger import setup_logger
+from .context_compressor import ContextCompressor
+from .dedup import DedupTracker
+from .drain import DrainMiner
+from .log_tailer import JsonFileTailer
+from .overload import OverloadController
+from .priority import PriorityLane
+from .settings import Settings
+from utils.metrics import (
+    BYTES_FETCHED, DEDUP_ENTRIES, FILTER_CHECKED, FILTER_MATCHED, LINES_INGESTED, OVERLOAD_LINES, STAGE_DURATION
+)
+
+
+# 分片模式下保留的已分类行数，与find_error_boundaries向前查找的行数一致
+CONTEXT_CARRY_LINES = 10
+# 报错行之后查找堆栈的最大行数，启用智能截断时堆栈会被压缩，可以向后查找更多行
+TRACE_SCAN_LINES = 50
+SMART_TRACE_SCAN_LINES = 1000
+# 堆栈跟踪行的特征（小写，不区分大小写匹配）
+STACK_INDICATORS = (
+    'traceback (most recent call last):',
+    'file "',
+    'at ',
+    'caused by:',
+    'exception:',
+    'error:',
+    'error in',
+    'exception in',
+)
+# 日志洪泛告警的指纹，同时刷屏的多个容器可以关联为一个故障
+FLOOD_FINGERPRINT = 'log_flood'
+# 通过docker logs读取时每次最多读取的行数
+FETCH_TAIL = 500
 
 
 class DockerLogMonitor:
     """Docker日志监控核心类"""
     
-    def __init__(self, config):
-        self.config = config
-        self.docker_client = docker.from_env()
+    def __init__(self, config, docker_client=None, dedup: Optional[DedupTracker] = None,
+                 template_miner: Optional[DrainMiner] = None, priority: Optional[PriorityLane] = None):
+        # 解析后的只读配置，热路径直接读取属性
+        self.config = Settings.of(config)
+        # 允许注入客户端（例如基准测试中的替身），否则首次使用时才连接本地Docker
+        self._docker_client = docker_client
         self.logger = setup_logger()
+        # 指标中的服务器标签
+        self.server_label = 'local'
+        # 冷却和清理使用的时间来源，回放模式下替换为日志时间
+        self.clock = time.time
         
         # 状态管理
         self.last_log_timestamps = {}
-        self.error_counts = {}
-        self.last_notification_time = {}
-        self.last_cleanup_time = time.time()
+        # 集群模式下传入多个实例共享的去重状态
+        self.dedup = dedup if dedup is not None else DedupTracker(self.config)
+        self.last_cleanup_time = self.clock()
         self.cleanup_counter = 0
         self.error_contexts = {}
         self.log_buffer = {}
-        self.buffer_size = config.get('context_settings.buffer_size', 1000)
+        # 累计读取的日志行数，分片模式下上报给协调进程
+        self.lines_ingested = 0
+        # log_source为json_file时直接读取日志文件
+        self.log_tailer = self._build_log_tailer()
+        # fingerprint.mode为drain时按日志模板编号去重，可由调用方传入多个监控器共用的实例
+        self.template_miner = template_miner
+        self._update_template_miner()
+        self.context_compressor = ContextCompressor.from_settings(self.config)
+        # 单个容器日志量超过处理能力时降级采样，时间来源随self.clock替换
+        self.overload = OverloadController(self.config, lambda: self.clock())
+        # 紧急告警快速通道，由调用方传入时所有监控器共用冷却状态和发送出口
+        self.priority = priority if priority is not None else PriorityLane(self.config)
+        self.prefilter = self._build_prefilter()
+        # 本次读取达到FETCH_TAIL上限的容器，由buffer_new_logs取走
+        self._truncated_fetches = set()
+        # 首次读取时检查日志读取方式，远程监控器的服务器配置在基类初始化之后才设置
+        self._source_checked = False
+        # 没有发送出口时命中的紧急事件，按容器暂存到本轮返回
+        self._priority_events: Dict[str, List[Dict[str, Any]]] = {}
+    
+    @property
+    def error_counts(self) -> Dict[str, int]:
+        return self.dedup.error_counts
+    
+    @property
+    def last_notification_time(self) -> Dict[str, float]:
+        return self.dedup.last_notification_time
+    
+    def update_config(self, config):
+        """应用新配置，保留读取位置、缓冲区和去重状态"""
+        old_source = self.config.local_log_source
+        self.config = Settings.of(config)
+        self.dedup.update_config(self.config)
+        self._update_template_miner()
+        self.context_compressor = ContextCompressor.from_settings(self.config)
+        self.overload.update_config(self.config)
+        self.priority.update_config(self.config)
+        self.prefilter = self._build_prefilter()
+        if self.config.local_log_source != old_source:
+            if self.log_tailer:
+                self.log_tailer.close()
+            self.log_tailer = self._build_log_tailer()
+        self._source_checked = False
+    
+    def uses_log_tail(self) -> bool:
+        """是否通过docker logs --tail读取，每次最多FETCH_TAIL行"""
+        return self.config.local_log_source != 'json_file'
+    
+    def _check_overload_source(self):
+        """过载保护按行数降级需要读到全部新日志，docker logs读取时只能对截断计数和告警"""
+        self._source_checked = True
+        if self.overload.enabled and self.uses_log_tail():
+            self.logger.warning(f"⚠️ {self.server_label} 通过docker logs读取日志，每次最多 {FETCH_TAIL} 行，"
+                                f"过载保护无法降级采样，只对读取截断计数和告警；建议log_source使用json_file")
+    
+    def _update_template_miner(self):
+        """按配置启用或停用模板指纹"""
+        if self.config.fingerprint_mode != 'drain':
+            self.template_miner = None
+        elif self.template_miner is None:
+            self.template_miner = DrainMiner.from_settings(self.config)
+    
+    @property
+    def docker_client(self):
+        """本地Docker客户端，首次使用时才导入docker并连接，只监控远程服务器时不会创建"""
+        if self._docker_client is None:
+            import docker
+            self._docker_client = docker.from_env()
+        return self._docker_client
+    
+    def _build_log_tailer(self) -> Optional[JsonFileTailer]:
+        """根据配置构建日志文件读取器"""
+        if self.config.local_log_source == 'json_file':
+            return JsonFileTailer(self.docker_client)
+        return None
     
     def get_container_logs(self, container_name: str, since=None) -> List[str]:
         """获取容器日志"""
+        if self.log_tailer:
+            logs = self.log_tailer.read(container_name)
+            if logs is not None:
+                return logs
+        
         try:
             container = self.docker_client.containers.get(container_name)
             if container.status != 'running':
@@ -45,99 +162,118 @@ class DockerLogMonitor:
                 else:
                     since_param = since
             
-            logs = container.logs(
+            raw = container.logs(
                 timestamps=True,
                 since=since_param,
-                tail=500,
+                tail=FETCH_TAIL,
                 stream=False
-            ).decode('utf-8', errors='ignore').strip().split('\n')
+            )
             
-            return [line for line in logs if line.strip()]
+            logs = self.split_log_lines(container_name, raw)
+            # 首次读取只取最近的日志；之后读满上限说明两次检查之间的日志超过上限，更早的部分被跳过
+            if since_param is not None and len(logs) >= FETCH_TAIL:
+                self._truncated_fetches.add(container_name)
+            return logs
         except Exception as e:
             self.logger.error(f"获取容器 {container_name} 日志失败: {e}")
             return []
     
+    def split_log_lines(self, container_name: str, raw: bytes) -> List[str]:
+        """解码docker logs输出并按行切分"""
+        logs = raw.decode('utf-8', errors='ignore').strip().split('\n')
+        return [line for line in logs if line.strip()]
+    
     def should_notify(self, container_name: str, log_line: str) -> bool:
         """判断是否应该发送通知"""
-        # 检查黑名单
-        blacklist = self.config.get('blacklist', {})
-        
         # 检查容器黑名单
-        blacklisted_containers = blacklist.get('containers', [])
-        if container_name in blacklisted_containers:
+        config = self.config
+        if container_name in config.blacklisted_containers:
             return False
         
         # 检查关键词黑名单
-        blacklisted_keywords = blacklist.get('keywords', [])
         log_line_lower = log_line.lower()
-        for keyword in blacklisted_keywords:
-            if keyword.lower() in log_line_lower:
+        for keyword in config.blacklisted_keywords:
+            if keyword in log_line_lower:
                 return False
         
         # 检查正则表达式黑名单
-        blacklisted_patterns = blacklist.get('patterns', [])
-        for pattern in blacklisted_patterns:
-            try:
-                if re.search(pattern, log_line, re.IGNORECASE):
-                    return False
-            except re.error:
-                continue
+        for pattern in config.blacklisted_patterns:
+            if pattern.search(log_line):
+                return False
         
         # 检查日志级别
-        log_levels = self.config.get('log_levels', [])
-        if log_levels:
+        if config.log_levels_upper:
             log_line_upper = log_line.upper()
-            level_matched = any(level.upper() in log_line_upper for level in log_levels)
-            if not level_matched:
+            if not any(level in log_line_upper for level in config.log_levels_upper):
                 return False
         
         # 检查关键词
-        keywords = self.config.get('keywords', [])
-        if keywords:
-            log_line_lower = log_line.lower()
-            keyword_matched = any(keyword.lower() in log_line_lower for keyword in keywords)
-            if not keyword_matched:
+        if config.keywords_lower:
+            if not any(keyword in log_line_lower for keyword in config.keywords_lower):
                 return False
         
         return True
     
-    def get_error_key(self, container_name: str, log_line: str) -> str:
-        """生成错误唯一标识"""
+    def _build_prefilter(self):
+        """过载降级时的预过滤：含日志级别、关键词或堆栈特征的行和缩进的续行保留
+        
+        只做一次转小写和若干次子串查找，结果是should_notify命中行的超集。
+        未配置日志级别和关键词时所有行都可能触发通知，全部保留。紧急告警关键词命中的行同样保留。
+        """
+        config = self.config
+        if not config.log_levels_upper and not config.keywords_lower:
+            return lambda log_line: True
+        words = tuple(level.lower() for level in config.log_levels_upper) + config.keywords_lower
+        if self.priority.enabled:
+            words += self.priority.keywords_lower
+        # 已被更短的词覆盖的堆栈特征（例如日志级别error覆盖error:）不再重复查找
+        words += tuple(indicator for indicator in STACK_INDICATORS if not any(word in indicator for word in words))
+        
+        def prefilter(log_line: str) -> bool:
+            log_line_lower = log_line.lower()
+            for word in words:
+                if word in log_line_lower:
+                    return True
+            # 时间戳之后以空白开头的续行（Python堆栈的源码行等）
+            space = log_line.find(' ')
+            return space >= 0 and log_line[space + 1:space + 2] in (' ', '\t')
+        
+        return prefilter
+    
+    def get_fingerprint(self, log_line: str) -> str:
+        """生成与容器和服务器无关的错误指纹，用于跨容器关联"""
         parts = log_line.split(' ', 1)
         message = parts[1] if len(parts) > 1 else log_line
         
+        # 同一模板的日志（只在用户名、路径、引号内的值等处不同）共用一个指纹
+        if self.template_miner is not None:
+            return f"{self.template_miner.scope}T{self.template_miner.add(message).cluster_id}"
+        
         # 标准化消息用于去重
         message = re.sub(r'\d+', 'X', message)
         message = re.sub(r'[a-f0-9]{8,}', 'HASH', message)
         message = message.strip()
         
-        return f"{container_name}:{message[:100]}"
+        return message[:100]
+    
+    def get_correlation_key(self, fingerprint: str) -> str:
+        """故障关联使用的键：模板指纹换成模板文本，与各模板树（分片进程）各自分配的编号无关"""
+        miner = self.template_miner
+        if miner is None or not fingerprint.startswith(f"{miner.scope}T"):
+            return fingerprint
+        cluster_id = fingerprint[len(miner.scope) + 1:]
+        cluster = miner.clusters.get(int(cluster_id)) if cluster_id.isdigit() else None
+        return f"template:{cluster.template_text}" if cluster is not None else fingerprint
+    
+    def get_error_key(self, container_name: str, log_line: str, fingerprint: Optional[str] = None) -> str:
+        """生成错误唯一标识，已计算过指纹时直接传入"""
+        if fingerprint is None:
+            fingerprint = self.get_fingerprint(log_line)
+        return f"{container_name}:{fingerprint}"
     
     def can_send_notification(self, error_key: str) -> tuple:
         """检查是否可以发送通知，返回(should_send, current_count)"""
-        current_time = time.time()
-        
-        if error_key not in self.error_counts:
-            self.error_counts[error_key] = 0
-        
-        # 检查冷却时间
-        last_notification = self.last_notification_time.get(error_key, 0)
-        cooldown_seconds = self.config.get('cooldown_minutes', 30) * 60
-        
-        if current_time - last_notification < cooldown_seconds:
-            self.error_counts[error_key] += 1
-            return False, self.error_counts[error_key]
-        
-        self.error_counts[error_key] += 1
-        threshold = self.config.get('error_threshold', 3)
-        current_count = self.error_counts[error_key]
-        
-        if current_count >= threshold:
-            self.last_notification_time[error_key] = current_time
-            self.error_counts[error_key] = 0
-            return True, current_count
-        
-        return False, current_count
+        return self.dedup.record(error_key, self.clock())
     
     def find_error_boundaries(self, logs: List[str], error_index: int) -> tuple:
         """查找错误边界"""
@@ -150,11 +286,15 @@ class DockerLogMonitor:
                 break
         
         end_idx = error_index + 1
-        for i in range(error_index + 1, min(len(logs), error_index + 50)):
+        scan_lines = SMART_TRACE_SCAN_LINES if self.config.enable_smart_truncation else TRACE_SCAN_LINES
+        for i in range(error_index + 1, min(len(logs), error_index + scan_lines)):
             if self.is_stack_trace_line(logs[i]):
                 end_idx = i + 1
             else:
-                if not logs[i].startswith(' ') and not logs[i].startswith('\t'):
+                # 缩进判断只看时间戳之后的内容
+                parts = logs[i].split(' ', 1)
+                message = parts[1] if len(parts) > 1 else logs[i]
+                if not message.startswith(' ') and not message.startswith('\t'):
                     break
                 end_idx = i + 1
         
@@ -162,25 +302,15 @@ class DockerLogMonitor:
     
     def is_stack_trace_line(self, line: str) -> bool:
         """判断是否为堆栈跟踪行"""
-        stack_indicators = [
-            'Traceback (most recent call last):',
-            'File "',
-            'at ',
-            'Caused by:',
-            'Exception:',
-            'Error:',
-            '    at ',
-            '\tat ',
-            'Error in',
-            'Exception in'
-        ]
         line_lower = line.lower()
-        return any(indicator.lower() in line_lower for indicator in stack_indicators)
+        for indicator in STACK_INDICATORS:
+            if indicator in line_lower:
+                return True
+        return False
     
     def aggregate_error_context(self, container_name: str, logs: List[str], error_index: int) -> str:
         """聚合错误上下文"""
-        context_settings = self.config.get('context_settings', {})
-        max_length = context_settings.get('max_log_length', 8000)
+        max_length = self.config.max_log_length
         
         start_idx, end_idx = self.find_error_boundaries(logs, error_index)
         
@@ -201,9 +331,13 @@ class DockerLogMonitor:
                 else:
                     prefix = "⬇️  "
                 
-                context_lines.append(f"{prefix}{clean_line}")
+                context_lines.append((prefix, clean_line))
         
-        full_context = '\n'.join(context_lines)
+        # 合并重复帧、保留Caused by链并按行数限制压缩，最后仍按max_log_length截断
+        if self.config.enable_smart_truncation:
+            full_context = '\n'.join(self.context_compressor.compress(context_lines, error_index - start_idx))
+        else:
+            full_context = '\n'.join(prefix + line for prefix, line in context_lines)
         if len(full_context) > max_length:
             half_length = max_length // 2
             full_context = full_context[:half_length] + "\n... [上下文截断] ...\n" + full_context[-half_length:]
@@ -212,47 +346,26 @@ class DockerLogMonitor:
     
     def get_monitored_containers(self) -> List[str]:
         """获取需要监控的容器列表"""
-        containers = self.config.get('containers', [])
+        containers = list(self.config.containers)
         if not containers:
             containers = [c.name for c in self.docker_client.containers.list()]
         
         # 过滤黑名单容器
-        blacklist = self.config.get('blacklist', {})
-        blacklisted_containers = blacklist.get('containers', [])
+        blacklisted_containers = self.config.blacklisted_containers
         containers = [c for c in containers if c not in blacklisted_containers]
         
-        return containers
+        if self.log_tailer:
+            self.log_tailer.retain(containers)
+        return self.overload.schedule(containers)
     
     def cleanup_old_errors(self):
         """清理旧错误数据"""
-        current_time = time.time()
-        window = self.config.get('deduplication_window', 300)
-        max_entries = self.config.get('max_memory_entries', 1000)
-        
-        # 清理过期错误
-        keys_to_remove = []
-        for key, count in self.error_counts.items():
-            last_time = self.last_notification_time.get(key, current_time)
-            if current_time - last_time > window and count == 0:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            self.error_counts.pop(key, None)
-            self.last_notification_time.pop(key, None)
-        
-        # 内存限制清理
-        if len(self.error_counts) > max_entries:
-            sorted_keys = sorted(self.last_notification_time.keys(), 
-                               key=lambda k: self.last_notification_time.get(k, 0))
-            keys_to_remove = sorted_keys[:len(self.error_counts) - max_entries]
-            for key in keys_to_remove:
-                self.error_counts.pop(key, None)
-                self.last_notification_time.pop(key, None)
+        self.dedup.cleanup(self.clock())
     
     def should_cleanup(self) -> bool:
         """检查是否需要清理"""
-        current_time = time.time()
-        cleanup_interval = self.config.get('cleanup_interval', 3600)
+        current_time = self.clock()
+        cleanup_interval = self.config.cleanup_interval
         
         self.cleanup_counter += 1
         if (self.cleanup_counter >= 100 or 
@@ -266,7 +379,9 @@ class DockerLogMonitor:
         """获取容器自上次检查以来的日志"""
         last_timestamp = self.last_log_timestamps.get(container_name)
         
+        fetch_start = time.perf_counter()
         logs = self.get_container_logs(container_name, since=last_timestamp)
+        STAGE_DURATION.observe(time.perf_counter() - fetch_start, ('fetch',))
         
         # 更新最后检查时间 - 使用Unix时间戳
         if logs:
@@ -282,31 +397,127 @@ class DockerLogMonitor:
         
         return logs
     
-    def process_container_logs(self, container_name: str) -> List[Dict[str, Any]]:
-        """处理容器日志并返回错误信息"""
+    def build_error_event(self, container_name: str, context: str, count: int) -> Dict[str, Any]:
+        """构建待通知的错误事件"""
+        return {
+            'container': container_name,
+            'context': context,
+            'count': count,
+            'threshold': self.config.error_threshold,
+            'timestamp': datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%d %H:%M:%S CST')
+        }
+    
+    def buffer_new_logs(self, container_name: str) -> List[str]:
+        """读取新日志并追加到容器缓冲区，返回新读取的行"""
+        if not self._source_checked:
+            self._check_overload_source()
         logs = self.get_container_logs_since(container_name)
         if not logs:
             return []
         
+        parse_start = time.perf_counter()
+        self.lines_ingested += len(logs)
+        LINES_INGESTED.inc(len(logs), (self.server_label, container_name))
+        BYTES_FETCHED.inc(sum(map(len, logs)) + len(logs), (self.server_label, container_name))
+        if container_name in self._truncated_fetches:
+            self._truncated_fetches.discard(container_name)
+            self.overload.record_truncated(container_name, len(logs), self.server_label)
+        
+        # 超过本容器的处理份额时只保留预过滤命中的行和采样的噪声
+        if self.overload.enabled:
+            logs = self.overload.admit(container_name, logs, self.prefilter, self.server_label)
+        
         # 添加到缓冲区
         if container_name not in self.log_buffer:
             self.log_buffer[container_name] = []
         
         self.log_buffer[container_name].extend(logs)
         
-        # 限制缓冲区大小
-        if len(self.log_buffer[container_name]) > self.buffer_size:
-            self.log_buffer[container_name] = self.log_buffer[container_name][-self.buffer_size:]
+        # 限制缓冲区大小，一次读到的新行超过缓冲区时最早的新行来不及分类，计入指标
+        buffer_size = self.config.buffer_size
+        if len(self.log_buffer[container_name]) > buffer_size:
+            self.log_buffer[container_name] = self.log_buffer[container_name][-buffer_size:]
+            if len(logs) > buffer_size:
+                OVERLOAD_LINES.inc(len(logs) - buffer_size, (self.server_label, container_name, 'evicted'))
+                logs = logs[-buffer_size:]
+        
+        if self.priority.enabled:
+            self._scan_priority(container_name, logs)
+        
+        STAGE_DURATION.observe(time.perf_counter() - parse_start, ('parse',))
+        return logs
+    
+    def _scan_priority(self, container_name: str, logs: List[str]):
+        """读取阶段匹配紧急告警关键词，命中时不经过阈值累计，直接生成事件交给快速通道"""
+        lane = self.priority
+        buffer = self.log_buffer[container_name]
+        offset = len(buffer) - len(logs)
+        for i, keyword in lane.scan(logs):
+            log_line = logs[i]
+            now = self.clock()
+            if not lane.allow((self.server_label, container_name, keyword), now):
+                continue
+            
+            start_idx, _ = self.find_error_boundaries(buffer, offset + i)
+            context = self.aggregate_error_context(container_name, buffer, start_idx)
+            fingerprint = self.get_fingerprint(log_line)
+            error_key = self.get_error_key(container_name, log_line, fingerprint)
+            event = self.build_error_event(container_name, context, 1)
+            event['threshold'] = 1
+            event['fingerprint'] = fingerprint
+            event['priority'] = keyword
+            event['error_key'] = error_key
+            # 同一错误在冷却期内不再经普通流程重复通知
+            self.dedup.mark_notified(error_key, now)
+            if not lane.submit(event):
+                self._priority_events.setdefault(container_name, []).append(event)
+    
+    def take_priority_events(self, container_name: str) -> List[Dict[str, Any]]:
+        """取出没有发送出口时暂存的紧急事件"""
+        return self._priority_events.pop(container_name, [])
+    
+    def take_flood_events(self, container_name: str) -> List[Dict[str, Any]]:
+        """容器进入过载降级后的日志洪泛告警，不经过阈值累计"""
+        alert = self.overload.take_alert(container_name)
+        if alert is None:
+            return []
         
-        errors = []
+        if alert.get('truncated'):
+            context = (f"🌊 日志洪泛: 本轮读取达到上限 {alert['lines']} 行（docker logs --tail），"
+                       f"两次检查之间更早的日志没有读到\n"
+                       f"累计截断 {alert['truncated']} 次；log_source使用json_file时可以读到全部新日志并由过载保护降级采样")
+            event = self.build_error_event(container_name, context, alert['lines'])
+            event['fingerprint'] = FLOOD_FINGERPRINT
+            return [event]
+        
+        context = (f"🌊 日志洪泛: 本轮读取 {alert['lines']} 行，超过每轮处理份额 {alert['budget']} 行\n"
+                   f"已进入降级模式：命中过滤规则的行和堆栈行全部保留，其余每 {self.overload.sample_every} 行采样 1 行\n"
+                   f"累计丢弃 {alert['dropped']} 行，采样保留 {alert['sampled']} 行")
+        event = self.build_error_event(container_name, context, alert['lines'])
+        event['threshold'] = alert['budget']
+        event['fingerprint'] = FLOOD_FINGERPRINT
+        return [event]
+    
+    def process_container_logs(self, container_name: str) -> List[Dict[str, Any]]:
+        """处理容器日志并返回错误信息"""
+        new_logs = self.buffer_new_logs(container_name)
+        errors = self.take_priority_events(container_name) + self.take_flood_events(container_name)
+        if not new_logs:
+            return errors
+        
+        classify_start = time.perf_counter()
         processed_indices = set()
+        checked = matched = 0
         
         for i, log_line in enumerate(self.log_buffer[container_name]):
             if i in processed_indices:
                 continue
-                
+            
+            checked += 1
             if self.should_notify(container_name, log_line):
-                error_key = self.get_error_key(container_name, log_line)
+                matched += 1
+                fingerprint = self.get_fingerprint(log_line)
+                error_key = self.get_error_key(container_name, log_line, fingerprint)
                 
                 should_send, current_count = self.can_send_notification(error_key)
                 if should_send:
@@ -322,15 +533,10 @@ class DockerLogMonitor:
                     for idx in range(start_idx, min(end_idx, len(self.log_buffer[container_name]))):
                         processed_indices.add(idx)
                     
-                    threshold = self.config.get('error_threshold', 3)
-                    
-                    errors.append({
-                        'container': container_name,
-                        'context': error_context,
-                        'count': current_count,
-                        'threshold': threshold,
-                        'timestamp': datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%d %H:%M:%S CST')
-                    })
+                    event = self.build_error_event(container_name, error_context, current_count)
+                    event['fingerprint'] = fingerprint
+                    event['correlation_key'] = self.get_correlation_key(fingerprint)
+                    errors.append(event)
         
         # 清理已处理的日志
         self.log_buffer[container_name] = [
@@ -338,4 +544,60 @@ class DockerLogMonitor:
             if i not in processed_indices
         ]
         
-        return errors
\ No newline at end of file
+        FILTER_CHECKED.inc(checked, (self.server_label,))
+        FILTER_MATCHED.inc(matched, (self.server_label,))
+        DEDUP_ENTRIES.set(len(self.dedup), (self.server_label,))
+        classify_duration = time.perf_counter() - classify_start
+        STAGE_DURATION.observe(classify_duration, ('classify',))
+        self.overload.record_cost(checked, classify_duration)
+        
+        return errors
+    
+    def collect_candidates(self, container_name: str) -> List[Dict[str, Any]]:
+        """分片模式：只做过滤和指纹，去重交给协调进程
+        
+        新读取的每一行只分类一次，同一指纹在本批中的出现次数合并为一个候选事件，
+        只为第一次出现聚合上下文。返回的事件带error_key和fingerprint，count为本批出现次数。
+        """
+        logs = self.buffer_new_logs(container_name)
+        floods = self.take_flood_events(container_name)
+        for event in floods:
+            event['error_key'] = self.get_error_key(container_name, '', FLOOD_FINGERPRINT)
+        events = self.take_priority_events(container_name) + floods
+        if not logs:
+            return events
+        
+        classify_start = time.perf_counter()
+        buffer = self.log_buffer[container_name]
+        candidates: Dict[str, Dict[str, Any]] = {}
+        checked = matched = 0
+        
+        for i in range(max(0, len(buffer) - len(logs)), len(buffer)):
+            log_line = buffer[i]
+            checked += 1
+            if not self.should_notify(container_name, log_line):
+                continue
+            
+            matched += 1
+            fingerprint = self.get_fingerprint(log_line)
+            error_key = self.get_error_key(container_name, log_line, fingerprint)
+            candidate = candidates.get(error_key)
+            if candidate is None:
+                start_idx, _ = self.find_error_boundaries(buffer, i)
+                context = self.aggregate_error_context(container_name, buffer, start_idx)
+                candidate = candidates[error_key] = self.build_error_event(container_name, context, 0)
+                candidate['error_key'] = error_key
+                candidate['fingerprint'] = fingerprint
+                candidate['correlation_key'] = self.get_correlation_key(fingerprint)
+            candidate['count'] += 1
+        
+        # 已分类的行不再重复计数，只保留向前查找错误边界所需的行
+        self.log_buffer[container_name] = buffer[-CONTEXT_CARRY_LINES:]
+        
+        FILTER_CHECKED.inc(checked, (self.server_label,))
+        FILTER_MATCHED.inc(matched, (self.server_label,))
+        classify_duration = time.perf_counter() - classify_start
+        STAGE_DURATION.observe(classify_duration, ('classify',))
+        self.overload.record_cost(checked, classify_duration)
+        
+        return events + list(candidates.values())
\ No newline at end of file
@@ -0,0 +1,180 @@
+from typing import Callable, Dict, List, Optional
+
+from .settings import Settings
+from utils.logger import setup_logger
+from utils.metrics import DEGRADED_CONTAINERS, OVERLOAD_LINES, TRUNCATED_FETCHES
+
+
+# 尚未测得分类耗时时假定的每行耗时（秒）
+DEFAULT_LINE_COST = 2e-5
+# 每行分类耗时的指数平均权重
+COST_SMOOTHING = 0.2
+
+
+class _ContainerState:
+    """一个容器的过载状态和累计统计"""
+    
+    __slots__ = ('degraded', 'calm_ticks', 'noise_seen', 'last_alert', 'peak_lines',
+                 'dropped', 'sampled', 'truncated', 'pending_alert')
+    
+    def __init__(self):
+        self.degraded = False
+        self.calm_ticks = 0
+        # 降级期间见到的噪声行数，按顺序每sample_every行保留一行
+        self.noise_seen = 0
+        self.last_alert = 0.0
+        self.peak_lines = 0
+        self.dropped = 0
+        self.sampled = 0
+        # 读取达到tail上限的次数
+        self.truncated = 0
+        self.pending_alert: Optional[Dict[str, int]] = None
+
+
+class OverloadController:
+    """日志接入过载保护
+    
+    一个监控器内的所有容器共享每轮tick_budget秒的分类时间。按测得的每行分类耗时把它折算成行数，
+    平均分给本轮监控的容器（每个容器至少min_lines行）。某个容器一轮读到的行数超过自己的份额时进入降级模式：
+    通过预过滤（命中日志级别或关键词、堆栈行）的行全部保留，其余噪声每sample_every行保留一行，
+    并产生一条"日志洪泛"告警（同一容器alert_cooldown秒内最多一条）。
+    连续recover_ticks轮不超过份额后恢复正常。降级中的容器每轮排在最后处理，一个容器刷屏不会拖慢其他容器。
+    
+    按行数降级只在能读到全部新日志时（log_source为json_file）生效。通过docker logs读取时每次最多tail行，
+    超出的部分在读取时就丢失了，只能由record_truncated()计数并产生洪泛告警。
+    """
+    
+    def __init__(self, settings: Settings, clock: Callable[[], float]):
+        self.clock = clock
+        self.logger = setup_logger()
+        self._states: Dict[str, _ContainerState] = {}
+        self._active = 0
+        self.line_cost = DEFAULT_LINE_COST
+        self.update_config(settings)
+    
+    def update_config(self, settings: Settings):
+        """应用新配置，保留各容器的状态"""
+        overload = settings.get('overload', {})
+        self.enabled = overload.get('enabled', False)
+        self.tick_budget = overload.get('tick_budget', 1.0)
+        self.min_lines = overload.get('min_lines', 1000)
+        self.sample_every = max(1, overload.get('sample_every', 100))
+        self.recover_ticks = overload.get('recover_ticks', 3)
+        self.alert_cooldown = overload.get('alert_cooldown', 600)
+    
+    def schedule(self, containers: List[str]) -> List[str]:
+        """每轮开始时传入本轮监控的容器，返回处理顺序：降级中的容器排在最后，不耽误其他容器
+        
+        份额按容器数分配，已不再监控的容器丢弃状态。
+        """
+        self._active = len(containers)
+        monitored = set(containers)
+        for name in [name for name in self._states if name not in monitored]:
+            del self._states[name]
+        if not any(state.degraded for state in self._states.values()):
+            return containers
+        return sorted(containers, key=self.is_degraded)
+    
+    def budget(self) -> int:
+        """每个容器每轮的行数份额"""
+        containers = max(1, self._active or len(self._states))
+        return max(self.min_lines, int(self.tick_budget / self.line_cost / containers))
+    
+    def record_cost(self, lines: int, seconds: float):
+        """记录一次分类的行数和耗时，更新每行耗时的估计"""
+        if lines <= 0 or seconds <= 0:
+            return
+        self.line_cost += COST_SMOOTHING * (seconds / lines - self.line_cost)
+    
+    def admit(self, container_name: str, lines: List[str], prefilter: Callable[[str], bool],
+              server: str = 'local') -> List[str]:
+        """返回本轮读取的行中需要分类的行，超过份额时降级并采样"""
+        state = self._states.get(container_name)
+        if state is None:
+            state = self._states[container_name] = _ContainerState()
+        
+        count = len(lines)
+        budget = self.budget()
+        if count > budget:
+            state.calm_ticks = 0
+            state.peak_lines = max(state.peak_lines, count)
+            if not state.degraded:
+                state.degraded = True
+                self.logger.warning(f"🌊 容器 {container_name} 日志过载: 本轮 {count} 行，"
+                                    f"超过份额 {budget} 行，进入降级模式")
+                self._update_gauge(server)
+            now = self.clock()
+            if now - state.last_alert >= self.alert_cooldown:
+                state.last_alert = now
+                state.pending_alert = {'lines': count, 'budget': budget}
+        elif state.degraded:
+            state.calm_ticks += 1
+            if state.calm_ticks >= self.recover_ticks:
+                state.degraded = False
+                state.peak_lines = 0
+                self.logger.info(f"✅ 容器 {container_name} 日志量恢复正常，退出降级模式"
+                                 f"（累计丢弃 {state.dropped} 行）")
+                self._update_gauge(server)
+        
+        if not state.degraded:
+            return lines
+        
+        kept = []
+        sampled = 0
+        sample_every = self.sample_every
+        noise_seen = state.noise_seen
+        for line in lines:
+            if prefilter(line):
+                kept.append(line)
+            else:
+                if noise_seen % sample_every == 0:
+                    kept.append(line)
+                    sampled += 1
+                noise_seen += 1
+        state.noise_seen = noise_seen
+        
+        dropped = count - len(kept)
+        state.dropped += dropped
+        state.sampled += sampled
+        OVERLOAD_LINES.inc(dropped, (server, container_name, 'dropped'))
+        OVERLOAD_LINES.inc(sampled, (server, container_name, 'sampled'))
+        return kept
+    
+    def record_truncated(self, container_name: str, lines: int, server: str = 'local'):
+        """一次读取达到tail上限，两次检查之间更早的日志没有读到：计入指标，启用时产生洪泛告警"""
+        state = self._states.get(container_name)
+        if state is None:
+            state = self._states[container_name] = _ContainerState()
+        state.truncated += 1
+        TRUNCATED_FETCHES.inc(1, (server, container_name))
+        if not self.enabled:
+            return
+        
+        now = self.clock()
+        if now - state.last_alert >= self.alert_cooldown:
+            state.last_alert = now
+            state.pending_alert = {'lines': lines, 'budget': lines, 'truncated': state.truncated}
+    
+    def take_alert(self, container_name: str) -> Optional[Dict[str, int]]:
+        """取出容器待发送的洪泛告警：本轮行数、份额和累计丢弃、采样行数"""
+        state = self._states.get(container_name)
+        if state is None or state.pending_alert is None:
+            return None
+        alert, state.pending_alert = state.pending_alert, None
+        alert.update(dropped=state.dropped, sampled=state.sampled)
+        return alert
+    
+    def is_degraded(self, container_name: str) -> bool:
+        state = self._states.get(container_name)
+        return state is not None and state.degraded
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """各容器的降级状态和累计丢弃、采样行数"""
+        return {
+            name: {'degraded': state.degraded, 'peak_lines': state.peak_lines,
+                   'dropped': state.dropped, 'sampled': state.sampled, 'truncated': state.truncated}
+            for name, state in self._states.items()
+        }
+    
+    def _update_gauge(self, server: str):
+        DEGRADED_CONTAINERS.set(sum(state.degraded for state in self._states.values()), (server,))
\ No newline at end of file
@@ -0,0 +1,131 @@
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .settings import Settings
+from utils.logger import setup_logger
+from utils.metrics import PRIORITY_EVENTS
+
+
+DEFAULT_KEYWORDS = ['OutOfMemoryError', 'panic:', 'segfault', 'Segmentation fault']
+
+
+class PriorityLane:
+    """紧急告警快速通道
+    
+    命中priority.keywords（不区分大小写的子串）的日志在读取阶段就生成事件，不等待error_threshold次累计，
+    也不等本轮其他容器处理完：设置了sink时立即交给sink发送，否则随本轮事件返回并排在最前。
+    同一服务器、容器和关键词在cooldown秒内最多告警一次。一个应用内的所有监控器共用一个实例，
+    远程服务器在线程池中并行处理，冷却状态加锁保护。
+    """
+    
+    def __init__(self, settings: Settings, sink: Optional[Callable[[Dict], None]] = None):
+        self.sink = sink
+        # (服务器, 容器, 关键词) -> 上次告警时间
+        self._last_sent: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self.update_config(settings)
+    
+    def update_config(self, settings: Settings):
+        """应用新配置，保留冷却状态"""
+        priority = settings.get('priority', {})
+        self.enabled = priority.get('enabled', False)
+        self.keywords = tuple(priority.get('keywords', DEFAULT_KEYWORDS))
+        self.keywords_lower = tuple(keyword.lower() for keyword in self.keywords)
+        self.cooldown = priority.get('cooldown', 60)
+        self.max_entries = priority.get('max_entries', 10000)
+    
+    def scan(self, lines: List[str]) -> List[Tuple[int, str]]:
+        """返回一批日志中命中关键词的(行号, 关键词)，按行号排列
+        
+        整批拼接、转小写一次后按关键词查找，命中位置之前的换行数即行号，不逐行匹配。
+        """
+        text = '\n'.join(lines).lower()
+        hits: Dict[int, str] = {}
+        for keyword, needle in zip(self.keywords, self.keywords_lower):
+            position = text.find(needle)
+            line_start = line_index = 0
+            while position >= 0:
+                line_index += text.count('\n', line_start, position)
+                # 一行命中多个关键词时取配置中靠前的
+                hits.setdefault(line_index, keyword)
+                line_start = text.find('\n', position)
+                if line_start < 0:
+                    break
+                position = text.find(needle, line_start)
+        return sorted(hits.items())
+    
+    def allow(self, key: tuple, now: float) -> bool:
+        """检查冷却时间，允许告警时记录本次时间"""
+        with self._lock:
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.cooldown:
+                PRIORITY_EVENTS.inc(1, ('suppressed',))
+                return False
+            self._last_sent.pop(key, None)
+            self._last_sent[key] = now
+            # 按告警时间排列，超过上限时丢弃最早的条目
+            while len(self._last_sent) > self.max_entries:
+                del self._last_sent[next(iter(self._last_sent))]
+        return True
+    
+    def submit(self, event: Dict) -> bool:
+        """交给sink立即发送，返回False表示没有sink，由调用方随本轮事件返回"""
+        PRIORITY_EVENTS.inc(1, ('sent',))
+        if self.sink is None:
+            return False
+        self.sink(event)
+        return True
+
+
+class PrioritySender:
+    """紧急告警的发送线程
+    
+    作为PriorityLane的sink，监控线程只把事件放入队列，由后台线程调用send发送，
+    通知渠道的网络延迟不会阻塞日志读取和分类。积压的多条事件一次取出、按到达顺序发送。
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, send: Callable[[List[Dict]], None]):
+        self.send = send
+        self._queue = queue.Queue()
+        self._thread = None
+        self.logger = setup_logger()
+    
+    def start(self):
+        """启动发送线程"""
+        self._thread = threading.Thread(target=self._run, name='priority-sender', daemon=True)
+        self._thread.start()
+    
+    def submit(self, event: Dict):
+        """放入发送队列，立即返回"""
+        self._queue.put(event)
+    
+    def stop(self, timeout: float = 10.0):
+        """发送完队列中的事件后停止线程"""
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.logger.warning(f"⚠️ 紧急告警发送线程 {timeout}秒内未退出，放弃队列中剩余的事件")
+        self._thread = None
+    
+    def _run(self):
+        while True:
+            events = [self._queue.get()]
+            while True:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = self._STOP in events
+            events = [event for event in events if event is not self._STOP]
+            if events:
+                try:
+                    self.send(events)
+                except Exception as e:
+                    self.logger.error(f"❌ 发送紧急告警失败: {e}")
+            if stopping:
+                return
\ No newline at end of file
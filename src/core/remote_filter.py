@@ -0,0 +1,85 @@
+import shlex
+from typing import List, Optional
+
+from .monitor import STACK_INDICATORS, SMART_TRACE_SCAN_LINES, TRACE_SCAN_LINES
+
+
+# 与本地find_error_boundaries一致：命中行之后的堆栈行（含堆栈特征或消息缩进）全部保留，
+# 堆栈结束后再保留after行上下文。行的第一个空格之前是docker时间戳（json-file原始记录中为{"log":"），
+# 之后的内容以空白开头即为缩进的续行
+_AWK_PROGRAM = '''
+{
+    l = tolower($0); hit = 0
+    for (i = 1; i <= np; i++) if (index(l, p[i])) { hit = 1; break }
+    if (!hit && trace > 0) {
+        m = $0; sub(/^[^ ]* /, "", m)
+        if (m ~ /^[ \\t]/) hit = 2
+        else for (i = 1; i <= ns; i++) if (index(l, s[i])) { hit = 2; break }
+        if (!hit) trace = 0
+    }
+    if (hit) {
+        for (k = 1; k <= nb; k++) print buf[k]
+        nb = 0; print; tail = A
+        if (hit == 1) trace = S; else trace--
+        next
+    }
+    if (tail > 0) { print; tail--; next }
+    if (B > 0) {
+        if (nb == B) { for (k = 1; k < B; k++) buf[k] = buf[k + 1]; nb-- }
+        buf[++nb] = $0
+    }
+}'''
+
+
+def _awk_string(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class RemoteLogFilter:
+    """远程预过滤器
+
+    把log_levels/keywords编译成awk命令拼接在远程docker logs之后，只把候选错误行
+    及其前后上下文传回本地。过滤条件是本地should_notify的超集：本地要求同时命中
+    日志级别和关键词，远程只按其中一组做不区分大小写的子串匹配，因此不会漏掉
+    本地会通知的行，黑名单等其余规则仍在本地执行。
+
+    命中行之后与本地一致地沿堆栈向后查找（最多trace_lines行），较长的Java/Python堆栈
+    末尾的Caused by:和最终异常行也会传回，堆栈之后再保留after行。
+    """
+    
+    def __init__(self, patterns: List[str], before: int = 5, after: int = 25,
+                 trace_lines: int = SMART_TRACE_SCAN_LINES):
+        self.patterns = [p for p in patterns if p]
+        self.before = max(0, before)
+        self.after = max(0, after)
+        self.trace_lines = max(0, trace_lines)
+    
+    @classmethod
+    def from_config(cls, config) -> Optional['RemoteLogFilter']:
+        """根据监控配置构建过滤器，没有可用的匹配条件时返回None"""
+        # 关键词通常比日志级别更有区分度，优先使用
+        patterns = config.get('keywords', []) or config.get('log_levels', [])
+        if not patterns:
+            return None
+        
+        context_settings = config.get('context_settings', {})
+        smart = context_settings.get('enable_smart_truncation', True)
+        return cls(
+            patterns,
+            before=context_settings.get('include_surrounding_lines', 5),
+            after=context_settings.get('max_context_lines', 25),
+            trace_lines=SMART_TRACE_SCAN_LINES if smart else TRACE_SCAN_LINES
+        )
+    
+    def build_command(self) -> str:
+        """生成远程awk命令"""
+        begin = [f'np = {len(self.patterns)}', f'ns = {len(STACK_INDICATORS)}']
+        begin += [f'p[{i}] = {_awk_string(p.lower())}' for i, p in enumerate(self.patterns, 1)]
+        begin += [f's[{i}] = {_awk_string(s)}' for i, s in enumerate(STACK_INDICATORS, 1)]
+        program = f"BEGIN {{ {'; '.join(begin)} }}{_AWK_PROGRAM}"
+        return (f'awk -v B={self.before} -v A={self.after} -v S={self.trace_lines} '
+                f'{shlex.quote(program)}')
+    
+    def wrap(self, cmd: str) -> str:
+        """把远程命令的全部输出（含stderr）接入awk"""
+        return f"{cmd} 2>&1 | {self.build_command()}"
\ No newline at end of file
@@ -1,28 +1,68 @@
 import time
 import threading
-from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
-from .monitor import DockerLogMonitor
+from .dedup import DedupTracker
+from .drain import DrainMiner
+from .monitor import FETCH_TAIL, DockerLogMonitor
+from .priority import PriorityLane
 from .ssh_manager import RemoteDockerManager, SSHConnectionPool
+from .health import CircuitState, ServerHealthTracker
+from .remote_filter import RemoteLogFilter
+from .settings import Settings
 from utils.logger import setup_logger
+from utils.metrics import registry
 
 
 class RemoteDockerLogMonitor(DockerLogMonitor):
     """远程Docker日志监控器"""
     
-    def __init__(self, config, server_config: Dict[str, Any]):
-        super().__init__(config)
+    def __init__(self, config, server_config: Dict[str, Any], docker_client=None,
+                 dedup: Optional[DedupTracker] = None, template_miner: Optional[DrainMiner] = None,
+                 priority: Optional[PriorityLane] = None):
+        super().__init__(config, docker_client, dedup, template_miner, priority)
         self.server_config = server_config
         self.server_name = server_config.get('name', server_config['host'])
+        self.server_label = self.server_name
         self.remote_manager = None
+        self.remote_filter = self._build_remote_filter()
         self.logger = setup_logger()
     
+    def _build_remote_filter(self) -> Optional[RemoteLogFilter]:
+        """根据配置构建远程预过滤器"""
+        ssh_settings = self.config.get('ssh_settings', {})
+        if self.server_config.get('remote_filter', ssh_settings.get('remote_filter', False)):
+            return RemoteLogFilter.from_config(self.config)
+        return None
+    
+    def update_config(self, config, server_config: Optional[Dict[str, Any]] = None):
+        """应用新配置，服务器配置变化时一并更新"""
+        if server_config is not None:
+            self.server_config = server_config
+        super().update_config(config)
+        self.remote_filter = self._build_remote_filter()
+    
+    def _build_log_tailer(self):
+        """远程容器日志通过SSH读取"""
+        return None
+    
     def set_remote_manager(self, remote_manager: RemoteDockerManager):
         """设置远程管理器"""
         self.remote_manager = remote_manager
     
+    def get_container_logs_since(self, container_name: str) -> List[str]:
+        """获取自上次检查以来的日志；预过滤时读取位置推进到本次读取的时间
+        
+        预过滤只传回命中的行，最后一行的时间戳可能远早于本次读取，没有命中时更是没有时间戳，
+        按传回的日志推进会使--since窗口和远程扫描量不断增大。
+        """
+        fetch_time = time.time()
+        logs = super().get_container_logs_since(container_name)
+        if self.remote_filter:
+            self.last_log_timestamps[container_name] = fetch_time
+        return logs
+    
     def get_container_logs(self, container_name: str, since=None) -> List[str]:
         """获取远程容器日志"""
         if not self.remote_manager:
@@ -38,11 +78,22 @@ class RemoteDockerLogMonitor(DockerLogMonitor):
             elif isinstance(since, str):
                 since_str = since
         
-        return self.remote_manager.get_container_logs(
+        logs = self.remote_manager.get_container_logs(
             self.server_config, 
             container_name, 
-            since=since_str
+            since=since_str,
+            tail=FETCH_TAIL,
+            log_filter=self.remote_filter
         )
+        # 远程预过滤在--tail之后执行，传回的行数不能说明是否截断
+        if (since_str and not self.remote_filter and len(logs) >= FETCH_TAIL
+                and self.remote_manager.uses_log_tail(self.server_config, container_name)):
+            self._truncated_fetches.add(container_name)
+        return logs
+    
+    def uses_log_tail(self) -> bool:
+        """服务器的log_source不是json_file时通过docker logs --tail读取"""
+        return self.remote_manager is not None and self.remote_manager.uses_log_tail(self.server_config)
     
     def get_monitored_containers(self) -> List[str]:
         """获取需要监控的容器列表"""
@@ -53,133 +104,358 @@ class RemoteDockerLogMonitor(DockerLogMonitor):
             containers = self.remote_manager.get_running_containers(self.server_config)
         
         # 过滤黑名单容器
-        blacklist = self.config.get('blacklist', {})
-        blacklisted_containers = blacklist.get('containers', [])
+        blacklisted_containers = self.config.blacklisted_containers
         containers = [c for c in containers if c not in blacklisted_containers]
         
-        return containers
+        return self.overload.schedule(containers)
     
-    def process_container_logs(self, container_name: str) -> List[Dict[str, Any]]:
-        """处理容器日志并返回错误信息"""
-        logs = self.get_container_logs_since(container_name)
-        if not logs:
-            return []
-        
-        # 添加到缓冲区
-        if container_name not in self.log_buffer:
-            self.log_buffer[container_name] = []
-        
-        self.log_buffer[container_name].extend(logs)
-        
-        # 限制缓冲区大小
-        if len(self.log_buffer[container_name]) > self.buffer_size:
-            self.log_buffer[container_name] = self.log_buffer[container_name][-self.buffer_size:]
-        
-        errors = []
-        processed_indices = set()
-        
-        for i, log_line in enumerate(self.log_buffer[container_name]):
-            if i in processed_indices:
-                continue
-                
-            if self.should_notify(container_name, log_line):
-                error_key = f"{self.server_name}:{self.get_error_key(container_name, log_line)}"
-                
-                should_send, current_count = self.can_send_notification(error_key)
-                if should_send:
-                    start_idx, end_idx = self.find_error_boundaries(
-                        self.log_buffer[container_name], i
-                    )
-                    
-                    error_context = self.aggregate_error_context(
-                        container_name, self.log_buffer[container_name], start_idx
-                    )
-                    
-                    # 标记已处理
-                    for idx in range(start_idx, min(end_idx, len(self.log_buffer[container_name]))):
-                        processed_indices.add(idx)
-                    
-                    threshold = self.config.get('error_threshold', 3)
-                    
-                    errors.append({
-                        'server': self.server_name,
-                        'container': container_name,
-                        'context': error_context,
-                        'count': current_count,
-                        'threshold': threshold,
-                        'timestamp': datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%d %H:%M:%S CST')
-                    })
-        
-        # 清理已处理的日志
-        self.log_buffer[container_name] = [
-            log for i, log in enumerate(self.log_buffer[container_name]) 
-            if i not in processed_indices
-        ]
-        
-        return errors
+    def get_error_key(self, container_name: str, log_line: str, fingerprint: Optional[str] = None) -> str:
+        """生成错误唯一标识，带上服务器名称"""
+        return f"{self.server_name}:{super().get_error_key(container_name, log_line, fingerprint)}"
+    
+    def build_error_event(self, container_name: str, context: str, count: int) -> Dict[str, Any]:
+        """构建待通知的错误事件，带上服务器名称"""
+        event = super().build_error_event(container_name, context, count)
+        event['server'] = self.server_name
+        return event
+
+
+def _connection_identity(server_config: Dict[str, Any]) -> tuple:
+    """决定SSH连接的配置项，前三项对应连接池的主机键"""
+    return (
+        server_config['host'],
+        server_config.get('username'),
+        server_config.get('port', 22),
+        server_config.get('password'),
+        server_config.get('key_file'),
+    )
+
+
+_CIRCUIT_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
 
 
 class MultiServerMonitor:
     """多服务器监控器"""
     
-    def __init__(self, config):
-        self.config = config
+    def __init__(self, config, dedup: Optional[DedupTracker] = None,
+                 template_miner: Optional[DrainMiner] = None, priority: Optional[PriorityLane] = None):
+        self.config = Settings.of(config)
+        # 传入时所有服务器共用该去重状态（集群模式），否则每台服务器各自去重
+        self.dedup = dedup
+        # 所有服务器共用一个模板树，同一模板编号在各服务器上含义相同
+        if template_miner is None and self.config.fingerprint_mode == 'drain':
+            template_miner = DrainMiner.from_settings(self.config)
+        self.template_miner = template_miner
+        # 所有服务器共用紧急告警的冷却状态和发送出口
+        self.priority = priority if priority is not None else PriorityLane(self.config)
+        ssh_settings = self.config.get('ssh_settings', {})
         self.ssh_pool = SSHConnectionPool(
-            max_connections=config.get('ssh_settings.max_connections', 5),
-            pool_size=config.get('ssh_settings.connection_pool_size', 3)
+            max_connections=ssh_settings.get('max_connections', 5),
+            pool_size=ssh_settings.get('connection_pool_size', 3),
+            checkout_timeout=ssh_settings.get('checkout_timeout', 30),
+            keepalive_interval=ssh_settings.get('keepalive_interval', 30),
+            idle_timeout=ssh_settings.get('idle_timeout', 300),
+            health_check_interval=ssh_settings.get('health_check_interval', 60),
+            max_sessions=ssh_settings.get('max_sessions', 10)
+        )
+        self.health_tracker = ServerHealthTracker(
+            failure_threshold=ssh_settings.get('failure_threshold', 2),
+            base_backoff=ssh_settings.get('backoff_base', 10),
+            max_backoff=ssh_settings.get('backoff_max', 300)
+        )
+        self.remote_manager = RemoteDockerManager(
+            self.ssh_pool, self.health_tracker,
+            default_compression=ssh_settings.get('compression', 'none'),
+            default_log_source=ssh_settings.get('log_source', 'api')
         )
-        self.remote_manager = RemoteDockerManager(self.ssh_pool)
         self.monitors: Dict[str, RemoteDockerLogMonitor] = {}
+        # 启动时不可用的服务器：name -> {'config', 'attempts', 'next_retry', 'probing'}
+        self.degraded_servers: Dict[str, Dict[str, Any]] = {}
+        self.startup_timeout = ssh_settings.get('startup_timeout', 15)
+        self.retry_interval = ssh_settings.get('retry_interval', 30)
+        self.retry_max_interval = ssh_settings.get('retry_max_interval', 600)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._retry_thread = None
+        self._probe_executor = ThreadPoolExecutor(
+            max_workers=ssh_settings.get('startup_workers', 16),
+            thread_name_prefix='ssh-probe'
+        )
         self.logger = setup_logger()
+        registry.register_collector(self.collect_metrics)
         self._setup_monitors()
     
     def _setup_monitors(self):
-        """设置远程监控器"""
-        remote_servers = self.config.get('remote_servers', [])
+        """设置远程监控器
         
+        并发探测所有服务器的Docker可用性，最多等待startup_timeout秒。
+        在截止时间内未就绪的服务器进入降级状态，由后台线程按退避间隔重试，
+        恢复后自动加入监控。
+        """
+        remote_servers = self.config.remote_servers
+        if not remote_servers:
+            return
+        
+        future_to_server = {}
         for server_config in remote_servers:
-            server_name = server_config.get('name', server_config['host'])
-            
-            # 检查Docker可用性
-            if self.remote_manager.check_docker_availability(server_config):
-                monitor = RemoteDockerLogMonitor(self.config, server_config)
-                monitor.set_remote_manager(self.remote_manager)
-                self.monitors[server_name] = monitor
-                self.logger.info(f"✅ 已添加远程服务器监控: {server_name}")
+            future = self._submit_probe(server_config)
+            future_to_server[future] = server_config.get('name', server_config['host'])
+        
+        done, not_done = wait(future_to_server, timeout=self.startup_timeout)
+        
+        for future in done:
+            self._on_probe_done(future_to_server[future], future)
+        
+        for future in not_done:
+            server_name = future_to_server[future]
+            self.logger.warning(f"⚠️ 服务器 {server_name} 启动探测超时({self.startup_timeout}s)，以降级状态启动")
+            future.add_done_callback(lambda f, name=server_name: self._on_probe_done(name, f))
+        
+        self._start_retry_thread()
+    
+    def set_template_miner(self, template_miner: Optional[DrainMiner]):
+        """更换所有服务器共用的模板树"""
+        self.template_miner = template_miner
+        with self._lock:
+            monitors = list(self.monitors.values())
+        for monitor in monitors:
+            monitor.template_miner = template_miner
+    
+    def _submit_probe(self, server_config: Dict[str, Any]):
+        """登记为降级服务器并提交首次可用性探测"""
+        server_name = server_config.get('name', server_config['host'])
+        with self._lock:
+            self.degraded_servers[server_name] = {
+                'config': server_config,
+                'attempts': 0,
+                'next_retry': 0.0,
+                'probing': True,
+            }
+        return self._probe_executor.submit(
+            self.remote_manager.check_docker_availability, server_config
+        )
+    
+    def _add_monitor(self, server_config: Dict[str, Any]):
+        """将服务器加入监控集合"""
+        server_name = server_config.get('name', server_config['host'])
+        monitor = RemoteDockerLogMonitor(self.config, server_config, dedup=self.dedup,
+                                         template_miner=self.template_miner, priority=self.priority)
+        monitor.set_remote_manager(self.remote_manager)
+        with self._lock:
+            self.monitors[server_name] = monitor
+            self.degraded_servers.pop(server_name, None)
+    
+    def _on_probe_done(self, server_name: str, future):
+        """处理一次可用性探测的结果"""
+        try:
+            available = future.result()
+        except Exception as e:
+            self.logger.error(f"探测服务器 {server_name} 失败: {e}")
+            available = False
+        
+        with self._lock:
+            state = self.degraded_servers.get(server_name)
+            if state is None:
+                return
+            state['probing'] = False
+            if not available:
+                delay = min(self.retry_interval * (2 ** state['attempts']), self.retry_max_interval)
+                state['attempts'] += 1
+                state['next_retry'] = time.monotonic() + delay
+        
+        if available:
+            self._add_monitor(state['config'])
+            if state['attempts']:
+                self.logger.info(f"✅ 服务器已恢复，加入远程监控: {server_name}")
             else:
-                self.logger.warning(f"⚠️ 跳过不可用服务器: {server_name}")
+                self.logger.info(f"✅ 已添加远程服务器监控: {server_name}")
+        else:
+            self.logger.warning(f"⚠️ 服务器 {server_name} 不可用，{delay:.0f}秒后重试")
+    
+    def _start_retry_thread(self):
+        """启动降级服务器的后台重试线程"""
+        if self._retry_thread is not None:
+            return
+        self._retry_thread = threading.Thread(
+            target=self._retry_loop, name='ssh-bootstrap-retry', daemon=True
+        )
+        self._retry_thread.start()
+    
+    def _retry_loop(self):
+        """按退避间隔重新探测降级服务器"""
+        while not self._stop_event.wait(1.0):
+            now = time.monotonic()
+            with self._lock:
+                due = []
+                for server_name, state in self.degraded_servers.items():
+                    if not state['probing'] and now >= state['next_retry']:
+                        state['probing'] = True
+                        due.append((server_name, state['config']))
+            
+            for server_name, server_config in due:
+                try:
+                    future = self._probe_executor.submit(
+                        self.remote_manager.check_docker_availability, server_config
+                    )
+                except RuntimeError:
+                    # 执行器已关闭
+                    return
+                future.add_done_callback(lambda f, name=server_name: self._on_probe_done(name, f))
+    
+    def update_config(self, config) -> Dict[str, List[str]]:
+        """增量应用新配置
+        
+        新增的服务器在后台探测后加入；移除的服务器连同熔断状态和连接池一起清理；
+        连接参数变化的服务器按移除再新增处理；其余服务器原地更新配置，
+        读取位置、缓冲区和去重状态保持不变。
+        """
+        config = self.config = Settings.of(config)
+        ssh_settings = config.get('ssh_settings', {})
+        self.remote_manager.default_compression = ssh_settings.get('compression', 'none')
+        self.remote_manager.default_log_source = ssh_settings.get('log_source', 'api')
+        new_servers = {s.get('name', s['host']): s for s in config.remote_servers}
+        
+        with self._lock:
+            current = {name: monitor.server_config for name, monitor in self.monitors.items()}
+            current.update({name: state['config'] for name, state in self.degraded_servers.items()})
+        
+        removed = [name for name in current if name not in new_servers]
+        added = [name for name in new_servers if name not in current]
+        reconnected = [name for name in current if name in new_servers
+                       and _connection_identity(current[name]) != _connection_identity(new_servers[name])]
+        
+        for server_name in removed + reconnected:
+            self._remove_server(server_name, current[server_name], new_servers.values())
+        for server_name in added + reconnected:
+            future = self._submit_probe(new_servers[server_name])
+            future.add_done_callback(lambda f, name=server_name: self._on_probe_done(name, f))
+        
+        with self._lock:
+            monitors = [(name, monitor) for name, monitor in self.monitors.items() if name in new_servers]
+            for server_name, state in self.degraded_servers.items():
+                state['config'] = new_servers.get(server_name, state['config'])
+        for server_name, monitor in monitors:
+            self.remote_manager.forget_server(server_name)
+            monitor.update_config(config, new_servers[server_name])
+        
+        self._start_retry_thread()
+        return {'added': added, 'removed': removed, 'reconnected': reconnected}
+    
+    def _remove_server(self, server_name: str, server_config: Dict[str, Any], remaining):
+        """移除服务器，没有其他服务器共用该主机时关闭其SSH连接"""
+        with self._lock:
+            self.monitors.pop(server_name, None)
+            self.degraded_servers.pop(server_name, None)
+        self.health_tracker.remove(server_name)
+        self.remote_manager.forget_server(server_name)
+        self.remote_manager.forget_log_cursors(server_name)
+        
+        host_key = _connection_identity(server_config)[:3]
+        if not any(_connection_identity(other)[:3] == host_key for other in remaining):
+            self._probe_executor.submit(self.ssh_pool.close_host, *host_key)
+        self.logger.info(f"🗑️ 已移除远程服务器监控: {server_name}")
     
-    def process_all_servers(self) -> List[Dict[str, Any]]:
-        """处理所有服务器的日志"""
+    def get_monitors(self) -> List[RemoteDockerLogMonitor]:
+        """获取当前已接入的监控器"""
+        with self._lock:
+            return list(self.monitors.values())
+    
+    def get_degraded_servers(self) -> List[str]:
+        """获取当前处于降级状态的服务器"""
+        with self._lock:
+            return list(self.degraded_servers.keys())
+    
+    def process_all_servers(self, collect_candidates: bool = False) -> List[Dict[str, Any]]:
+        """处理所有服务器的日志，collect_candidates为True时返回未去重的候选事件（分片模式）"""
         all_errors = []
         
-        if not self.monitors:
+        with self._lock:
+            monitors = list(self.monitors.items())
+        
+        if not monitors:
             return all_errors
         
         # 使用线程池并行处理多个服务器
-        max_workers = min(len(self.monitors), 5)
+        max_workers = min(len(monitors), 5)
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_server = {}
             
-            for server_name, monitor in self.monitors.items():
+            for server_name, monitor in monitors:
+                health = self.health_tracker.get(server_name)
+                
+                if not health.is_available():
+                    # 熔断打开时直接跳过；退避结束后每个周期只发一个探测请求
+                    if health.allow_request():
+                        future = executor.submit(
+                            self.remote_manager.check_docker_availability, monitor.server_config
+                        )
+                        future_to_server[future] = (server_name, None)
+                    continue
+                
                 containers = monitor.get_monitored_containers()
                 
                 for container_name in containers:
-                    future = executor.submit(monitor.process_container_logs, container_name)
+                    future = executor.submit(self._process_container, server_name, monitor, container_name,
+                                             collect_candidates)
                     future_to_server[future] = (server_name, container_name)
             
             for future in as_completed(future_to_server):
                 server_name, container_name = future_to_server[future]
                 try:
                     errors = future.result()
-                    all_errors.extend(errors)
+                    if container_name is not None:
+                        all_errors.extend(errors)
                 except Exception as e:
                     self.logger.error(f"处理服务器 {server_name} 容器 {container_name} 日志失败: {e}")
         
         return all_errors
     
+    def _process_container(self, server_name: str, monitor: RemoteDockerLogMonitor,
+                           container_name: str, collect_candidates: bool = False) -> List[Dict[str, Any]]:
+        """处理单个容器，服务器在本轮中已熔断时快速失败"""
+        if not self.health_tracker.is_available(server_name):
+            return []
+        if collect_candidates:
+            return monitor.collect_candidates(container_name)
+        return monitor.process_container_logs(container_name)
+    
+    def get_health_states(self) -> Dict[str, str]:
+        """获取各服务器的熔断状态"""
+        return self.health_tracker.get_states()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取SSH连接池统计信息"""
+        return self.ssh_pool.get_stats()
+    
+    def collect_metrics(self) -> List:
+        """导出连接池与熔断状态指标"""
+        stats = self.ssh_pool.get_stats()
+        hosts = stats['hosts']
+        states = self.health_tracker.get_states()
+        return [
+            ('dlog_ssh_checkouts_total', 'counter', 'SSH会话借出次数', [({}, stats['checkouts'])]),
+            ('dlog_ssh_pool_hits_total', 'counter', '复用已有连接的借出次数', [({}, stats['hits'])]),
+            ('dlog_ssh_checkout_timeouts_total', 'counter', '等待会话超时次数', [({}, stats['timeouts'])]),
+            ('dlog_ssh_checkout_wait_seconds_total', 'counter', '等待会话的累计耗时', [({}, stats['wait_time_total'])]),
+            ('dlog_ssh_connections', 'gauge', '每个主机的SSH连接数',
+             [({'pool': key}, host['connections']) for key, host in hosts.items()]),
+            ('dlog_ssh_sessions', 'gauge', '每个主机正在使用的会话数',
+             [({'pool': key}, host['sessions']) for key, host in hosts.items()]),
+            ('dlog_server_circuit_state', 'gauge', '服务器熔断状态（0=closed, 1=half_open, 2=open）',
+             [({'server': name}, _CIRCUIT_STATE_VALUES.get(state, 0)) for name, state in states.items()]),
+            ('dlog_degraded_servers', 'gauge', '尚未接入的降级服务器数', [({}, len(self.degraded_servers))]),
+        ]
+    
     def cleanup(self):
         """清理资源"""
+        registry.unregister_collector(self.collect_metrics)
+        self._stop_event.set()
+        self._probe_executor.shutdown(wait=False)
+        stats = self.ssh_pool.get_stats()
+        self.logger.info(
+            f"📊 SSH连接池统计: 借出 {stats['checkouts']}次, 命中率 {stats['hit_rate']:.1%}, "
+            f"平均等待 {stats['wait_time_avg'] * 1000:.1f}ms, 超时 {stats['timeouts']}次"
+        )
         self.ssh_pool.close_all_connections()
         self.logger.info("🧹 已清理所有SSH连接")
\ No newline at end of file
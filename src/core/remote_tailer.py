@@ -0,0 +1,72 @@
+import re
+import shlex
+from typing import Optional, Tuple
+
+from .log_tailer import DEFAULT_MAX_READ_BYTES, DEFAULT_TAIL, JsonLogDecoder
+
+
+LOG_SOURCE_API = 'api'
+LOG_SOURCE_JSON_FILE = 'json_file'
+LOG_SOURCES = (LOG_SOURCE_API, LOG_SOURCE_JSON_FILE)
+# 无法直接读取日志文件的容器改用docker logs，隔一段时间后再尝试
+LOG_FALLBACK_RECHECK_SECONDS = 300
+
+# 读取命令在stderr第一行输出"inode 大小"
+_HEADER = re.compile(r'^(\d+) (\d+)$')
+
+
+class RemoteLogCursor:
+    """远程容器json-file日志文件的读取位置，inode为None表示尚未读取过"""
+    
+    __slots__ = ('path', 'inode', 'offset', 'decoder')
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self.decoder = JsonLogDecoder()
+
+
+def inspect_command(container_name: str) -> str:
+    """查询容器日志驱动和日志文件路径"""
+    return f"docker inspect --format '{{{{.HostConfig.LogConfig.Type}}}} {{{{.LogPath}}}}' {shlex.quote(container_name)}"
+
+
+def read_command(path: str, inode: Optional[int], offset: int,
+                 max_bytes: Optional[int] = DEFAULT_MAX_READ_BYTES, tail: int = DEFAULT_TAIL) -> str:
+    """生成按字节偏移读取日志文件的shell片段
+
+    先把文件的inode和大小写到stderr，inode与游标一致且文件变大时才从offset处读取，
+    读取量以stat得到的大小为上限，因此本地可以据此精确推进偏移，输出也可以再经过预过滤或压缩。
+    inode为None时（首次接入）读取最后tail行，与docker logs --tail一致：tail -c +K直接定位到
+    stat大小之前最多max_bytes字节处，只读取这一段，开销与文件总大小无关；
+    从文件中间开始时第一行可能不完整，先丢弃。本地把偏移设为stat得到的大小。
+    """
+    quoted = shlex.quote(path)
+    header = f'P={quoted}; S=$(stat -L -c "%i %s" "$P") || exit 0; echo "$S" >&2; set -- $S'
+    if inode is None:
+        window = max_bytes or DEFAULT_MAX_READ_BYTES
+        return (f'{header}; B=$(($2 > {window} ? $2 - {window} : 0)); '
+                f'tail -c +$((B + 1)) "$P" | head -c $(($2 - B)) | '
+                f'{{ if [ "$B" -gt 0 ]; then tail -n +2; else cat; fi; }} | tail -n {tail}')
+    
+    limit = f'N=$(($2 - {offset}))'
+    if max_bytes:
+        limit += f'; [ "$N" -gt {max_bytes} ] && N={max_bytes}'
+    return (f'{header}; if [ "$1" = {inode} ] && [ "$2" -gt {offset} ]; then '
+            f'{limit}; tail -c +{offset + 1} "$P" | head -c "$N"; fi')
+
+
+def parse_header(stderr: str) -> Optional[Tuple[int, int]]:
+    """解析读取命令输出的(inode, 大小)，文件不存在或无权读取时返回None"""
+    first_line = stderr.split('\n', 1)[0].strip()
+    match = _HEADER.match(first_line)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def consumed_bytes(cursor: RemoteLogCursor, size: int, max_bytes: Optional[int] = DEFAULT_MAX_READ_BYTES) -> int:
+    """与read_command一致，计算本次从offset起读取的字节数"""
+    available = max(0, size - cursor.offset)
+    return min(available, max_bytes) if max_bytes else available
\ No newline at end of file
@@ -0,0 +1,188 @@
+import gzip
+import json
+import mmap
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .monitor import DockerLogMonitor
+from utils.logger import setup_logger
+
+
+def _iter_raw_lines(path: str, use_mmap: bool = False) -> Iterator[bytes]:
+    """按行读取文件，自动识别gzip；未压缩文件可选内存映射"""
+    with open(path, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+        f.seek(0)
+        
+        if is_gzip:
+            with gzip.GzipFile(fileobj=f) as gz:
+                yield from gz
+            return
+        
+        if use_mmap:
+            if f.seek(0, 2) == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                size = len(mm)
+                while start < size:
+                    end = mm.find(b'\n', start)
+                    if end == -1:
+                        end = size
+                    yield mm[start:end]
+                    start = end + 1
+            return
+        
+        yield from f
+
+
+def _from_json_file(line: str) -> str:
+    """把docker json-file驱动的原始行转换为docker logs --timestamps格式"""
+    try:
+        record = json.loads(line)
+        message = record.get('log', '').rstrip('\n')
+        return f"{record.get('time', '')} {message}"
+    except (ValueError, AttributeError):
+        return line
+
+
+def iter_log_lines(path: str, use_mmap: bool = False) -> Iterator[str]:
+    """读取归档日志，支持纯文本、gzip以及docker json-file格式"""
+    for raw in _iter_raw_lines(path, use_mmap):
+        line = raw.decode('utf-8', errors='ignore').rstrip('\r\n')
+        if line.startswith('{"log":'):
+            line = _from_json_file(line)
+        if line.strip():
+            yield line
+
+
+def parse_log_timestamp(line: str) -> Optional[float]:
+    """解析行首的docker时间戳，纳秒精度截断到微秒"""
+    stamp = line.split(' ', 1)[0]
+    if 'T' not in stamp:
+        return None
+    stamp = stamp.replace('Z', '+00:00')
+    if '.' in stamp:
+        head, tail = stamp.split('.', 1)
+        digits = len(tail) - len(tail.lstrip('0123456789'))
+        stamp = f"{head}.{tail[:min(digits, 6)].ljust(6, '0')}{tail[digits:]}"
+    try:
+        return datetime.fromisoformat(stamp).timestamp()
+    except ValueError:
+        return None
+
+
+class _ReplayDockerClient:
+    """回放模式不连接Docker守护进程"""
+    containers = None
+
+
+class ReplayLogMonitor(DockerLogMonitor):
+    """回放归档日志的监控器
+
+    复用DockerLogMonitor的检测流程，日志来源换成文件，每次读取一批行模拟一次检查。
+    冷却和清理按日志时间计算，因此一天的日志可以在几秒内回放完并得到与线上一致的去重结果。
+    """
+    
+    def __init__(self, config, batch_size: int = 500):
+        super().__init__(config, docker_client=_ReplayDockerClient())
+        self.batch_size = batch_size
+        self.sources: Dict[str, Iterator[str]] = {}
+        self.log_time = 0.0
+        self.clock = lambda: self.log_time
+        self.lines_read = 0
+        self.bytes_read = 0
+        self.logger = setup_logger()
+    
+    def add_source(self, container_name: str, lines: Iterator[str]):
+        """添加一个容器的日志来源"""
+        self.sources[container_name] = lines
+    
+    def get_container_logs(self, container_name: str, since=None) -> List[str]:
+        """从日志来源读取下一批行"""
+        source = self.sources.get(container_name)
+        if source is None:
+            return []
+        
+        batch = []
+        for line in source:
+            batch.append(line)
+            if len(batch) >= self.batch_size:
+                break
+        if not batch:
+            self.sources.pop(container_name, None)
+            return []
+        
+        self.lines_read += len(batch)
+        self.bytes_read += sum(map(len, batch)) + len(batch)
+        log_time = parse_log_timestamp(batch[-1])
+        if log_time is not None:
+            self.log_time = max(self.log_time, log_time)
+        return batch
+    
+    def get_monitored_containers(self) -> List[str]:
+        """获取仍有日志未回放的容器"""
+        return list(self.sources.keys())
+    
+    def build_error_event(self, container_name: str, context: str, count: int) -> Dict[str, Any]:
+        """事件时间使用日志时间"""
+        event = super().build_error_event(container_name, context, count)
+        if self.log_time:
+            event['timestamp'] = datetime.fromtimestamp(
+                self.log_time, timezone(timedelta(hours=8))
+            ).strftime('%Y-%m-%d %H:%M:%S CST')
+        return event
+    
+    def replay(self, on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """尽快回放全部日志，返回统计信息"""
+        tick_times = []
+        events = 0
+        start = time.perf_counter()
+        
+        while self.sources:
+            for container_name in self.get_monitored_containers():
+                tick_start = time.perf_counter()
+                errors = self.process_container_logs(container_name)
+                tick_times.append(time.perf_counter() - tick_start)
+                events += len(errors)
+                if on_event:
+                    for error in errors:
+                        on_event(error)
+            
+            if self.should_cleanup():
+                self.cleanup_old_errors()
+        
+        elapsed = time.perf_counter() - start
+        tick_times.sort()
+        
+        def percentile(pct: float) -> float:
+            if not tick_times:
+                return 0.0
+            return tick_times[min(len(tick_times) - 1, int(len(tick_times) * pct / 100))]
+        
+        return {
+            'lines': self.lines_read,
+            'bytes': self.bytes_read,
+            'ticks': len(tick_times),
+            'events': events,
+            'elapsed': elapsed,
+            'lines_per_sec': self.lines_read / elapsed if elapsed else 0.0,
+            'mb_per_sec': self.bytes_read / 1024 / 1024 / elapsed if elapsed else 0.0,
+            'tick_p50': percentile(50),
+            'tick_p99': percentile(99),
+            'tick_max': tick_times[-1] if tick_times else 0.0,
+            'dedup_entries': len(self.error_counts),
+        }
+
+
+def container_name_for(path: str) -> str:
+    """由文件名推断容器名，去掉.log/.gz等后缀和docker json-file的-json后缀"""
+    name = Path(path).name
+    for suffix in ('.gz', '.log', '.txt', '.json'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    if name.endswith('-json'):
+        name = name[:-len('-json')]
+    return name or 'replay'
\ No newline at end of file
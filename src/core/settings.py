@@ -0,0 +1,162 @@
+import re
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+
+def _freeze(value):
+    """递归复制为只读结构：字典转为MappingProxyType，列表转为元组"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """把只读结构还原为可修改、可序列化的dict和list"""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _lookup(raw: Mapping[str, Any], key: str, default=None):
+    """按点分隔的键读取嵌套配置"""
+    value = raw
+    for part in key.split('.'):
+        if isinstance(value, Mapping) and part in value:
+            value = value[part]
+        else:
+            return default
+    return value
+
+
+def _number(raw: Mapping[str, Any], key: str, default, minimum=0, cast=float):
+    """读取数值配置并校验下限"""
+    value = _lookup(raw, key, default)
+    if isinstance(value, bool):
+        raise ValueError(f"配置项 {key} 必须是数字: {value!r}")
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"配置项 {key} 必须是数字: {value!r}")
+    if value < minimum:
+        raise ValueError(f"配置项 {key} 不能小于 {minimum}: {value!r}")
+    return value
+
+
+def _strings(raw: Mapping[str, Any], key: str) -> tuple:
+    """读取字符串列表配置"""
+    value = _lookup(raw, key, [])
+    if value is None:
+        return ()
+    if isinstance(value, str) or not isinstance(value, (list, tuple)):
+        raise ValueError(f"配置项 {key} 必须是列表: {value!r}")
+    return tuple(str(item) for item in value if item != '')
+
+
+class Settings:
+    """解析后的只读配置快照
+
+    每次加载配置时构建一次：校验取值、预先转换大小写并编译黑名单正则，
+    监控热路径直接读取属性，不再逐行查找嵌套字典。get()保留按点分隔键读取原始配置的能力，
+    供SSH、通知等非热路径代码使用。
+    raw是构建时深拷贝的只读结构（字典为MappingProxyType，列表为元组），修改传入的字典或
+    读出的配置都不会让raw与解析后的属性不一致；需要可修改或可序列化的配置时使用to_dict()。
+    """
+    
+    __slots__ = (
+        'raw',
+        'log_levels', 'keywords', 'log_levels_upper', 'keywords_lower',
+        'blacklisted_containers', 'blacklisted_keywords', 'blacklisted_patterns', 'invalid_patterns',
+        'containers', 'local_monitoring_enabled', 'local_log_source', 'remote_servers',
+        'error_threshold', 'cooldown_seconds', 'deduplication_window', 'max_memory_entries',
+        'cleanup_interval', 'check_interval', 'shard_workers', 'fingerprint_mode',
+        'max_context_lines', 'stack_trace_lines', 'include_surrounding_lines',
+        'max_log_length', 'buffer_size', 'enable_smart_truncation',
+    )
+    
+    def __init__(self, raw: Optional[Mapping[str, Any]] = None):
+        raw = raw or {}
+        if not isinstance(raw, Mapping):
+            raise ValueError(f"配置必须是JSON对象: {type(raw).__name__}")
+        raw = _freeze(raw)
+        values = {'raw': raw}
+        
+        # 过滤规则
+        values['log_levels'] = _strings(raw, 'log_levels')
+        values['keywords'] = _strings(raw, 'keywords')
+        values['log_levels_upper'] = tuple(level.upper() for level in values['log_levels'])
+        values['keywords_lower'] = tuple(keyword.lower() for keyword in values['keywords'])
+        values['blacklisted_containers'] = frozenset(_strings(raw, 'blacklist.containers'))
+        values['blacklisted_keywords'] = tuple(k.lower() for k in _strings(raw, 'blacklist.keywords'))
+        patterns, invalid = [], []
+        for pattern in _strings(raw, 'blacklist.patterns'):
+            try:
+                patterns.append(re.compile(pattern, re.IGNORECASE))
+            except re.error:
+                invalid.append(pattern)
+        values['blacklisted_patterns'] = tuple(patterns)
+        values['invalid_patterns'] = tuple(invalid)
+        
+        # 监控对象
+        values['containers'] = _strings(raw, 'containers')
+        values['local_monitoring_enabled'] = bool(_lookup(raw, 'local_monitoring.enabled', True))
+        values['local_log_source'] = _lookup(raw, 'local_monitoring.log_source', 'api')
+        if values['local_log_source'] not in ('api', 'json_file'):
+            raise ValueError(f"配置项 local_monitoring.log_source 必须是 api 或 json_file: {values['local_log_source']!r}")
+        remote_servers = _lookup(raw, 'remote_servers', []) or []
+        for server in remote_servers:
+            if not isinstance(server, Mapping) or not server.get('host') or not server.get('username'):
+                raise ValueError(f"远程服务器配置缺少host或username: {server!r}")
+        values['remote_servers'] = tuple(remote_servers)
+        
+        # 阈值与时间
+        values['error_threshold'] = _number(raw, 'error_threshold', 3, 1, int)
+        values['cooldown_seconds'] = _number(raw, 'cooldown_minutes', 30) * 60
+        values['deduplication_window'] = _number(raw, 'deduplication_window', 300)
+        values['max_memory_entries'] = _number(raw, 'max_memory_entries', 1000, 1, int)
+        values['cleanup_interval'] = _number(raw, 'cleanup_interval', 3600)
+        values['check_interval'] = _number(raw, 'check_interval', 5)
+        values['shard_workers'] = _number(raw, 'sharding.workers', 0, 0, int)
+        values['fingerprint_mode'] = _lookup(raw, 'fingerprint.mode', 'regex')
+        if values['fingerprint_mode'] not in ('regex', 'drain'):
+            raise ValueError(f"配置项 fingerprint.mode 必须是 regex 或 drain: {values['fingerprint_mode']!r}")
+        
+        # 上下文
+        values['max_context_lines'] = _number(raw, 'context_settings.max_context_lines', 25, 0, int)
+        values['stack_trace_lines'] = _number(raw, 'context_settings.stack_trace_lines', 15, 0, int)
+        values['include_surrounding_lines'] = _number(raw, 'context_settings.include_surrounding_lines', 5, 0, int)
+        values['max_log_length'] = _number(raw, 'context_settings.max_log_length', 8000, 1, int)
+        values['buffer_size'] = _number(raw, 'context_settings.buffer_size', 1000, 1, int)
+        values['enable_smart_truncation'] = bool(_lookup(raw, 'context_settings.enable_smart_truncation', True))
+        
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Settings是只读的，无法设置 {name}")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"Settings是只读的，无法删除 {name}")
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Settings) and self.raw == other.raw
+    
+    __hash__ = None
+    
+    def get(self, key: str, default=None):
+        """按点分隔的键读取原始配置"""
+        return _lookup(self.raw, key, default)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """原始配置的可修改副本，用于保存、修改或传给工作进程"""
+        return _thaw(self.raw)
+    
+    @classmethod
+    def of(cls, config) -> 'Settings':
+        """把原始配置字典转换为Settings，已经是Settings时原样返回"""
+        if isinstance(config, cls):
+            return config
+        return cls(config)
\ No newline at end of file
@@ -0,0 +1,410 @@
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .dedup import DedupTracker
+from .drain import DrainMiner
+from .monitor import DockerLogMonitor
+from .priority import PriorityLane
+from .remote_monitor import MultiServerMonitor
+from .settings import Settings
+from utils.logger import configure_logging, setup_logger
+from utils.metrics import DEDUP_ENTRIES, registry
+
+
+# 等待紧急告警时检查事件队列的间隔（秒）
+PRIORITY_POLL_INTERVAL = 0.05
+
+
+class HashRing:
+    """一致性哈希环
+
+    每个节点在环上放置replicas个虚拟节点，键落在顺时针方向的第一个虚拟节点上。
+    使用md5而不是hash()，保证各进程得到相同的结果。
+    """
+    
+    def __init__(self, nodes: Iterable = (), replicas: int = 100):
+        self.replicas = replicas
+        self._hashes: List[int] = []
+        self._nodes: List[Any] = []
+        for node in nodes:
+            self.add_node(node)
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+    
+    def add_node(self, node):
+        """添加节点"""
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            index = bisect.bisect(self._hashes, point)
+            self._hashes.insert(index, point)
+            self._nodes.insert(index, node)
+    
+    def remove_node(self, node):
+        """移除节点，原属于该节点的键分散到其余节点"""
+        keep = [(point, owner) for point, owner in zip(self._hashes, self._nodes) if owner != node]
+        self._hashes = [point for point, _ in keep]
+        self._nodes = [owner for _, owner in keep]
+    
+    def get_node(self, key: str):
+        """获取键所属的节点"""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+def _server_name(server_config: Dict[str, Any]) -> str:
+    return server_config.get('name', server_config['host'])
+
+
+class ShardWorker:
+    """分片工作进程
+
+    本地容器按容器名、远程服务器按服务器名哈希到各分片，每个进程只处理属于自己的部分。
+    远程按服务器分片，保证每台服务器的SSH连接池只存在于一个进程中。
+    每轮只做读取、过滤和指纹，合并后的候选事件交给协调进程去重。
+    紧急告警在读取到时就单独上报，不等本轮结束。
+    fingerprint.mode为drain时本进程的本地和远程监控共用一个模板树，指纹带分片编号（S<分片>:T<编号>），
+    模板保存在state_file加.shard<分片>后缀的文件中。
+    """
+    
+    def __init__(self, shard_id: int, shard_count: int, raw_config: Dict[str, Any],
+                 local_factory: Optional[Callable[[Settings], DockerLogMonitor]] = None):
+        self.shard_id = shard_id
+        self.ring = HashRing(range(shard_count))
+        self.local_factory = local_factory or DockerLogMonitor
+        self.local_monitor: Optional[DockerLogMonitor] = None
+        self.remote_monitor: Optional[MultiServerMonitor] = None
+        self.settings: Optional[Settings] = None
+        # 本进程所有监控器共用，发送出口在run()中指向事件队列
+        self.priority = PriorityLane(Settings(raw_config))
+        self.template_miner: Optional[DrainMiner] = None
+        self._fingerprint_config = None
+        self._template_path = ''
+        self._last_template_save = time.monotonic()
+        self.logger = setup_logger()
+        self.apply_config(raw_config)
+    
+    def owns(self, key: str) -> bool:
+        """键是否属于本分片"""
+        return self.ring.get_node(key) == self.shard_id
+    
+    def apply_config(self, raw_config: Dict[str, Any]):
+        """应用配置，只保留属于本分片的远程服务器"""
+        owned_servers = [server for server in raw_config.get('remote_servers') or []
+                         if self.owns(f"remote:{_server_name(server)}")]
+        settings = self.settings = Settings({**raw_config, 'remote_servers': owned_servers})
+        self.priority.update_config(settings)
+        self._update_template_miner(settings)
+        
+        if settings.local_monitoring_enabled:
+            if self.local_monitor:
+                self.local_monitor.update_config(settings)
+            else:
+                try:
+                    self.local_monitor = self.local_factory(settings)
+                    self.local_monitor.priority = self.priority
+                except Exception as e:
+                    self.logger.error(f"❌ 分片 {self.shard_id} 启用本地Docker监控失败: {e}")
+            if self.local_monitor:
+                self.local_monitor.template_miner = self.template_miner
+        else:
+            self.local_monitor = None
+        
+        if settings.remote_servers:
+            if self.remote_monitor:
+                self.remote_monitor.set_template_miner(self.template_miner)
+                self.remote_monitor.update_config(settings)
+            else:
+                self.remote_monitor = MultiServerMonitor(settings, template_miner=self.template_miner,
+                                                         priority=self.priority)
+        elif self.remote_monitor:
+            self.remote_monitor.cleanup()
+            self.remote_monitor = None
+    
+    def _update_template_miner(self, settings: Settings):
+        """指纹配置变化时重建本进程的模板树，并从本分片的状态文件恢复已有模板"""
+        fingerprint = settings.get('fingerprint', {})
+        if fingerprint == self._fingerprint_config:
+            return
+        self._save_templates()
+        self._fingerprint_config = fingerprint
+        self.template_miner = None
+        state_file = fingerprint.get('state_file', '')
+        self._template_path = f"{state_file}.shard{self.shard_id}" if state_file else ''
+        if settings.fingerprint_mode != 'drain':
+            return
+        
+        miner = DrainMiner.from_settings(settings)
+        if self._template_path and os.path.exists(self._template_path):
+            try:
+                miner = DrainMiner.load(self._template_path, **miner.params())
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.logger.warning(f"⚠️ 分片 {self.shard_id} 读取日志模板状态失败，重新建立模板: {e}")
+        miner.scope = f"S{self.shard_id}:"
+        self.template_miner = miner
+    
+    def _save_templates(self):
+        """保存本分片的日志模板，重启后模板编号保持不变"""
+        self._last_template_save = time.monotonic()
+        if not self.template_miner or not self._template_path:
+            return
+        try:
+            self.template_miner.save(self._template_path)
+        except OSError as e:
+            self.logger.error(f"❌ 分片 {self.shard_id} 保存日志模板失败: {e}")
+    
+    def tick(self) -> tuple:
+        """处理一轮，返回(候选事件, 读取行数)"""
+        candidates = []
+        monitors = []
+        
+        if self.local_monitor:
+            monitors.append(self.local_monitor)
+            for container_name in self.local_monitor.get_monitored_containers():
+                if self.owns(f"local:{container_name}"):
+                    candidates.extend(self.local_monitor.collect_candidates(container_name))
+        
+        if self.remote_monitor:
+            candidates.extend(self.remote_monitor.process_all_servers(collect_candidates=True))
+            monitors.extend(self.remote_monitor.get_monitors())
+        
+        lines = 0
+        for monitor in monitors:
+            lines += monitor.lines_ingested
+            monitor.lines_ingested = 0
+        return candidates, lines
+    
+    def run(self, events, control):
+        """工作循环：按检查间隔处理并上报，等待期间响应控制消息"""
+        events.put(('ready', self.shard_id, [], 0))
+        self.priority.sink = lambda event: events.put(('priority', self.shard_id, [event], 0))
+        
+        while True:
+            tick_start = time.monotonic()
+            try:
+                candidates, lines = self.tick()
+            except Exception as e:
+                self.logger.error(f"❌ 分片 {self.shard_id} 处理异常: {e}")
+                candidates, lines = [], 0
+            events.put(('tick', self.shard_id, candidates, lines))
+            
+            save_interval = self.settings.get('fingerprint.save_interval', 300)
+            if self.template_miner and time.monotonic() - self._last_template_save >= save_interval:
+                self._save_templates()
+            
+            deadline = tick_start + self.settings.check_interval
+            while True:
+                try:
+                    kind, payload = control.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if kind == 'stop':
+                    self.close()
+                    return
+                if kind == 'config':
+                    try:
+                        self.apply_config(payload)
+                    except Exception as e:
+                        self.logger.error(f"❌ 分片 {self.shard_id} 应用配置失败: {e}")
+    
+    def close(self):
+        """释放资源"""
+        self._save_templates()
+        if self.remote_monitor:
+            self.remote_monitor.cleanup()
+            self.remote_monitor = None
+
+
+def _worker_main(shard_id: int, shard_count: int, raw_config: Dict[str, Any], events, control,
+                 local_factory=None):
+    """工作进程入口，Ctrl+C由协调进程统一处理"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # 日志文件由协调进程按天切换，工作进程只追加写入
+    configure_logging(raw_config, rotate=False)
+    worker = ShardWorker(shard_id, shard_count, raw_config, local_factory)
+    worker.run(events, control)
+
+
+class ShardCoordinator:
+    """分片模式的协调进程
+
+    启动workers个工作进程（spawn方式，避免继承SSH连接和线程），收集它们上报的候选事件，
+    统一去重后返回需要通知的事件，通知仍由主进程发送。工作进程意外退出时自动重启，
+    重启后的进程从最近的日志重新开始读取。紧急告警由take_priority()单独取走，不等工作进程的本轮结束。
+
+    local_factory用于构造工作进程中的本地监控器，必须是模块级函数以便传给子进程。
+    """
+    
+    def __init__(self, settings: Settings, workers: int,
+                 local_factory: Optional[Callable[[Settings], DockerLogMonitor]] = None):
+        if workers < 1:
+            raise ValueError(f"分片进程数必须大于0: {workers}")
+        self.settings = settings
+        self.workers = workers
+        self.local_factory = local_factory
+        self.dedup = DedupTracker(settings)
+        self.logger = setup_logger()
+        
+        self._context = multiprocessing.get_context('spawn')
+        self.processes: Dict[int, Any] = {}
+        # 每个进程各用一对队列：进程被强制结束时可能持有队列的写锁，不能影响其他进程
+        self.events: Dict[int, Any] = {}
+        self.controls: Dict[int, Any] = {}
+        self.ready = set()
+        self.lines = {shard_id: 0 for shard_id in range(workers)}
+        self.candidates = {shard_id: 0 for shard_id in range(workers)}
+        self.restarts = {shard_id: 0 for shard_id in range(workers)}
+        self._pending: List[Dict[str, Any]] = []
+        self._priority: List[Dict[str, Any]] = []
+        self._last_cleanup = time.time()
+        self._stopping = False
+        
+        for shard_id in range(workers):
+            self._start_worker(shard_id)
+        registry.register_collector(self.collect_metrics)
+    
+    def _start_worker(self, shard_id: int):
+        events = self._context.Queue()
+        control = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(shard_id, self.workers, self.settings.to_dict(), events, control, self.local_factory),
+            name=f'shard-{shard_id}',
+            daemon=True
+        )
+        process.start()
+        self.processes[shard_id] = process
+        self.events[shard_id] = events
+        self.controls[shard_id] = control
+    
+    def _check_workers(self):
+        """重启意外退出的工作进程"""
+        for shard_id, process in list(self.processes.items()):
+            if process.is_alive() or self._stopping:
+                continue
+            self.logger.error(f"❌ 分片进程 {shard_id} 已退出 (exitcode={process.exitcode})，正在重启")
+            self.ready.discard(shard_id)
+            self.restarts[shard_id] += 1
+            self.events[shard_id].close()
+            self.controls[shard_id].close()
+            self._start_worker(shard_id)
+    
+    def _handle(self, message: tuple, now: float):
+        kind, shard_id, candidates, lines = message
+        if kind == 'ready':
+            self.ready.add(shard_id)
+            return
+        if kind == 'priority':
+            # 工作进程已按紧急告警的冷却时间筛选，这里只记录到去重状态，普通流程不再重复通知
+            for event in candidates:
+                self.dedup.mark_notified(event.pop('error_key'), now)
+                self._priority.append(event)
+            return
+        
+        self.lines[shard_id] += lines
+        self.candidates[shard_id] += len(candidates)
+        for candidate in candidates:
+            error_key = candidate.pop('error_key')
+            should_send, current_count = self.dedup.record(error_key, now, candidate['count'])
+            if should_send:
+                candidate['count'] = current_count
+                self._pending.append(candidate)
+    
+    def _drain(self, handle: bool = True):
+        """读取所有进程已上报的消息"""
+        now = time.time()
+        for events in self.events.values():
+            while True:
+                try:
+                    message = events.get_nowait()
+                except queue.Empty:
+                    break
+                if handle:
+                    self._handle(message, now)
+    
+    def wait_ready(self, timeout: float = 30.0) -> bool:
+        """等待所有工作进程完成初始化"""
+        deadline = time.monotonic() + timeout
+        while len(self.ready) < self.workers:
+            if time.monotonic() >= deadline:
+                return False
+            self._check_workers()
+            self._drain()
+            time.sleep(0.01)
+        return True
+    
+    def collect(self) -> List[Dict[str, Any]]:
+        """取走工作进程上报的候选事件并去重，返回需要通知的事件"""
+        self._check_workers()
+        self._drain()
+        now = time.time()
+        
+        if now - self._last_cleanup > self.settings.cleanup_interval:
+            self.dedup.cleanup(now)
+            self._last_cleanup = now
+        DEDUP_ENTRIES.set(len(self.dedup), ('coordinator',))
+        
+        errors, self._pending = self._pending, []
+        return errors
+    
+    def take_priority(self, timeout: float = 0.0) -> List[Dict[str, Any]]:
+        """取走工作进程上报的紧急事件，暂时没有时最多等待timeout秒"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._drain()
+            remaining = deadline - time.monotonic()
+            if self._priority or remaining <= 0:
+                break
+            time.sleep(min(PRIORITY_POLL_INTERVAL, remaining))
+        
+        events, self._priority = self._priority, []
+        return events
+    
+    def update_config(self, settings: Settings):
+        """把新配置下发到所有工作进程，进程数变化需要重启才能生效"""
+        if settings.shard_workers != self.settings.shard_workers:
+            self.logger.warning(f"⚠️ 分片进程数变更为 {settings.shard_workers}，需要重启后生效")
+        self.settings = settings
+        self.dedup.update_config(settings)
+        for control in self.controls.values():
+            control.put(('config', settings.to_dict()))
+    
+    def collect_metrics(self) -> List:
+        """导出工作进程状态指标"""
+        alive = sum(1 for process in self.processes.values() if process.is_alive())
+        return [
+            ('dlog_shard_workers_alive', 'gauge', '存活的分片工作进程数', [({}, alive)]),
+            ('dlog_shard_lines_total', 'counter', '各分片读取的日志行数',
+             [({'shard': str(shard_id)}, count) for shard_id, count in self.lines.items()]),
+            ('dlog_shard_candidates_total', 'counter', '各分片上报的候选事件数',
+             [({'shard': str(shard_id)}, count) for shard_id, count in self.candidates.items()]),
+            ('dlog_shard_restarts_total', 'counter', '各分片进程的重启次数',
+             [({'shard': str(shard_id)}, count) for shard_id, count in self.restarts.items()]),
+        ]
+    
+    def stop(self, timeout: float = 5.0):
+        """通知工作进程退出，超时后强制结束"""
+        self._stopping = True
+        registry.unregister_collector(self.collect_metrics)
+        for control in self.controls.values():
+            control.put(('stop', None))
+        # 子进程退出前要把队列中的数据写完，等待期间持续读取避免互相等待
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(p.is_alive() for p in self.processes.values()):
+            self._drain(handle=False)
+            time.sleep(0.05)
+        for shard_id, process in self.processes.items():
+            if process.is_alive():
+                self.logger.warning(f"⚠️ 分片进程 {shard_id} 未在 {timeout}秒内退出，强制结束")
+                process.terminate()
+                process.join()
+        self.logger.info(f"🧹 已停止 {len(self.processes)} 个分片进程")
\ No newline at end of file
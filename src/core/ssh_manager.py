@@ -1,127 +1,593 @@
-import paramiko
 import time
 import threading
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any
 from contextlib import contextmanager
 from utils.logger import setup_logger
+from utils.metrics import SSH_BYTES_RECEIVED
+from .remote_filter import RemoteLogFilter
+from .remote_tailer import (
+    LOG_FALLBACK_RECHECK_SECONDS, LOG_SOURCE_API, LOG_SOURCE_JSON_FILE, LOG_SOURCES, RemoteLogCursor,
+    consumed_bytes, inspect_command, parse_header, read_command
+)
+from .compression import (
+    COMPRESSION_NONE, COMPRESSION_SSH, COMPRESSION_ZSTD, LineSplitter,
+    get_decompressor, is_stream_mode, remote_command, resolve_mode
+)
+
+# paramiko在第一次建立SSH连接时才导入，只监控本地容器或只创建配置时不加载
+if TYPE_CHECKING:
+    import paramiko
+
+
+class SSHPoolTimeoutError(Exception):
+    """等待SSH连接池可用会话超时"""
+    pass
+
+
+class SSHConnectionError(Exception):
+    """主机建连失败，排队等待的请求直接失败"""
+    pass
+
+
+class _PooledConnection:
+    """池中的一条已认证SSH连接及其会话计数"""
+    
+    def __init__(self, ssh: 'paramiko.SSHClient', max_sessions: int):
+        self.ssh = ssh
+        self.max_sessions = max_sessions
+        self.sessions = 0
+        self.last_used = time.monotonic()
+    
+    def is_alive(self) -> bool:
+        """检查传输层是否存活"""
+        transport = self.ssh.get_transport()
+        return bool(transport and transport.is_active())
+    
+    def has_capacity(self) -> bool:
+        """是否还能在该连接上打开新会话"""
+        return self.sessions < self.max_sessions
+
+
+class _HostPool:
+    """单个主机的连接池状态"""
+    
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.connections: List[_PooledConnection] = []
+        self.connecting = 0
+        # 建连失败次数及最近一次错误，用于让排队等待的请求快速失败
+        self.connect_failures = 0
+        self.last_connect_error: Optional[Exception] = None
+        # 连接池已从SSHConnectionPool中移除
+        self.closed = False
 
 
 class SSHConnectionPool:
-    """SSH连接池管理"""
+    """SSH连接池管理
+
+    每个主机最多保持max_connections条已认证的Transport，每条Transport上
+    最多同时打开max_sessions个会话通道（对应服务端的MaxSessions）。
+    每次执行命令只占用一个轻量的会话通道，只有当现有连接的会话全部占满时
+    才会建立新连接；连接和会话都用满时在checkout_timeout内等待。
+    后台线程定期探测空闲连接的存活状态并淘汰空闲超过idle_timeout的连接。
+    """
     
-    def __init__(self, max_connections: int = 5, pool_size: int = 3):
-        self.max_connections = max_connections
-        self.pool_size = pool_size
-        self.pools: Dict[str, List[paramiko.SSHClient]] = {}
-        self.locks: Dict[str, threading.Lock] = {}
+    def __init__(self, max_connections: int = 5, pool_size: int = 3,
+                 checkout_timeout: float = 30, keepalive_interval: int = 30,
+                 idle_timeout: float = 300, health_check_interval: float = 60,
+                 max_sessions: int = 10):
+        self.max_connections = max(1, max_connections)
+        self.pool_size = min(pool_size, self.max_connections)
+        self.checkout_timeout = checkout_timeout
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.max_sessions = max(1, max_sessions)
+        self.pools: Dict[str, _HostPool] = {}
+        self._pools_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'hits': 0,
+            'misses': 0,
+            'timeouts': 0,
+            'created': 0,
+            'evicted_idle': 0,
+            'evicted_dead': 0,
+            'channel_rejections': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+        self._stop_event = threading.Event()
+        self._health_thread = None
         self.logger = setup_logger()
     
-    def _create_connection(self, host: str, username: str, password: str = None, 
-                          key_file: str = None, port: int = 22, timeout: int = 10) -> paramiko.SSHClient:
+    def _create_connection(self, host: str, username: str, password: str = None,
+                          key_file: str = None, port: int = 22, timeout: int = 10,
+                          compress: bool = False) -> 'paramiko.SSHClient':
         """创建新的SSH连接"""
+        import paramiko
+        
         ssh = paramiko.SSHClient()
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         
         try:
             if key_file:
-                ssh.connect(hostname=host, username=username, key_filename=key_file, 
-                           port=port, timeout=timeout)
+                ssh.connect(hostname=host, username=username, key_filename=key_file,
+                           port=port, timeout=timeout, compress=compress)
             else:
-                ssh.connect(hostname=host, username=username, password=password, 
-                           port=port, timeout=timeout)
+                ssh.connect(hostname=host, username=username, password=password,
+                           port=port, timeout=timeout, compress=compress)
             
+            transport = ssh.get_transport()
+            if transport and self.keepalive_interval:
+                transport.set_keepalive(self.keepalive_interval)
+            
+            self._incr('created')
             return ssh
         except Exception as e:
             self.logger.error(f"SSH连接失败 {host}: {e}")
             ssh.close()
             raise
     
-    def _get_pool_key(self, host: str, username: str, port: int = 22) -> str:
-        """获取连接池键"""
-        return f"{username}@{host}:{port}"
+    def _get_pool_key(self, host: str, username: str, port: int = 22, compress: bool = False) -> str:
+        """获取连接池键，开启传输层压缩的连接单独成池"""
+        return f"{username}@{host}:{port}" + ('+zlib' if compress else '')
+    
+    def _get_host_pool(self, pool_key: str) -> _HostPool:
+        """获取（必要时创建）主机连接池"""
+        with self._pools_lock:
+            host_pool = self.pools.get(pool_key)
+            if host_pool is None:
+                host_pool = _HostPool()
+                self.pools[pool_key] = host_pool
+                self._ensure_health_thread()
+            return host_pool
+    
+    @staticmethod
+    def _close_quietly(ssh: 'paramiko.SSHClient'):
+        """关闭连接并忽略异常"""
+        try:
+            ssh.close()
+        except Exception:
+            pass
+    
+    def _incr(self, name: str, value=1):
+        """更新统计计数"""
+        with self._stats_lock:
+            self._stats[name] += value
+    
+    def _prune_dead(self, host_pool: _HostPool) -> List[_PooledConnection]:
+        """移除已断开的连接（调用方需持有host_pool.cond）"""
+        dead = [conn for conn in host_pool.connections if not conn.is_alive()]
+        for conn in dead:
+            host_pool.connections.remove(conn)
+        return dead
+    
+    def _checkout(self, pool_key: str, host_pool: _HostPool,
+                  connect_args: Dict[str, Any]) -> _PooledConnection:
+        """占用一个会话名额，必要时建立新连接"""
+        wait_start = time.monotonic()
+        deadline = wait_start + self.checkout_timeout
+        create = False
+        dead = []
+        
+        with host_pool.cond:
+            failures_seen = host_pool.connect_failures
+            while True:
+                if host_pool.closed:
+                    raise SSHConnectionError(f"SSH连接池已关闭 {pool_key}")
+                dead.extend(self._prune_dead(host_pool))
+                candidates = [conn for conn in host_pool.connections if conn.has_capacity()]
+                if candidates:
+                    # 优先使用会话最少的连接，让并发均匀分布在已有Transport上
+                    conn = min(candidates, key=lambda c: c.sessions)
+                    conn.sessions += 1
+                    break
+                if (host_pool.connect_failures != failures_seen and not host_pool.connections
+                        and not host_pool.connecting):
+                    # 等待期间建连失败且没有可用连接，主机大概率不可达，不再重复建连
+                    raise SSHConnectionError(f"SSH连接不可用 {pool_key}: {host_pool.last_connect_error}")
+                if len(host_pool.connections) + host_pool.connecting < self.max_connections:
+                    host_pool.connecting += 1
+                    create = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._incr('timeouts')
+                    raise SSHPoolTimeoutError(
+                        f"等待SSH会话超时 {pool_key} ({self.checkout_timeout}s, "
+                        f"连接上限 {self.max_connections}, 会话上限 {self.max_sessions})"
+                    )
+                host_pool.cond.wait(remaining)
+        
+        for conn in dead:
+            self._close_quietly(conn.ssh)
+        if dead:
+            self._incr('evicted_dead', len(dead))
+        
+        wait_time = time.monotonic() - wait_start
+        with self._stats_lock:
+            self._stats['checkouts'] += 1
+            self._stats['misses' if create else 'hits'] += 1
+            self._stats['wait_time_total'] += wait_time
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+        
+        if not create:
+            return conn
+        
+        try:
+            ssh = self._create_connection(**connect_args)
+        except Exception as e:
+            with host_pool.cond:
+                host_pool.connecting -= 1
+                host_pool.connect_failures += 1
+                host_pool.last_connect_error = e
+                host_pool.cond.notify_all()
+            raise
+        
+        conn = _PooledConnection(ssh, self.max_sessions)
+        conn.sessions = 1
+        with host_pool.cond:
+            host_pool.connecting -= 1
+            host_pool.connections.append(conn)
+            # 新连接还有空余会话，唤醒其他等待者
+            host_pool.cond.notify_all()
+        return conn
+    
+    def _release(self, host_pool: _HostPool, conn: _PooledConnection):
+        """释放会话名额，多余的空闲连接直接关闭"""
+        to_close = None
+        with host_pool.cond:
+            conn.sessions -= 1
+            conn.last_used = time.monotonic()
+            if conn in host_pool.connections:
+                idle = [c for c in host_pool.connections if c.sessions == 0]
+                if conn.sessions == 0 and (self._stop_event.is_set() or host_pool.closed
+                                           or not conn.is_alive() or len(idle) > self.pool_size):
+                    host_pool.connections.remove(conn)
+                    to_close = conn
+            elif conn.sessions == 0:
+                to_close = conn
+            host_pool.cond.notify()
+        
+        if to_close:
+            self._close_quietly(to_close.ssh)
     
     @contextmanager
-    def get_connection(self, host: str, username: str, password: str = None, 
-                      key_file: str = None, port: int = 22, timeout: int = 10):
-        """获取SSH连接（上下文管理器）"""
-        pool_key = self._get_pool_key(host, username, port)
+    def get_connection(self, host: str, username: str, password: str = None,
+                      key_file: str = None, port: int = 22, timeout: int = 10,
+                      compress: bool = False):
+        """获取SSH连接（上下文管理器）
+
+        返回的SSHClient会与其他线程共享，期间占用一个会话名额。
+        调用方只能在其上执行命令，不能关闭它。
+        """
+        pool_key = self._get_pool_key(host, username, port, compress)
+        host_pool = self._get_host_pool(pool_key)
+        conn = self._checkout(pool_key, host_pool, dict(
+            host=host, username=username, password=password, key_file=key_file,
+            port=port, timeout=timeout, compress=compress
+        ))
         
-        if pool_key not in self.locks:
-            self.locks[pool_key] = threading.Lock()
+        try:
+            yield conn.ssh
+        finally:
+            self._release(host_pool, conn)
+    
+    @contextmanager
+    def open_session(self, host: str, username: str, password: str = None,
+                     key_file: str = None, port: int = 22, timeout: int = 10,
+                     compress: bool = False):
+        """在共享连接上打开一个会话通道（上下文管理器）
+
+        服务端拒绝打开通道时（通常是达到MaxSessions），会把该连接的会话上限
+        降到当前已打开的会话数并重新分配，每条连接最多校准一次。
+        """
+        import paramiko
         
-        with self.locks[pool_key]:
-            if pool_key not in self.pools:
-                self.pools[pool_key] = []
-            
-            # 从池中获取可用连接
-            ssh = None
-            for conn in self.pools[pool_key]:
-                if conn.get_transport() and conn.get_transport().is_active():
-                    ssh = conn
-                    self.pools[pool_key].remove(conn)
-                    break
-                else:
-                    conn.close()
-                    self.pools[pool_key].remove(conn)
-            
-            # 如果没有可用连接，创建新连接
-            if not ssh:
-                ssh = self._create_connection(host, username, password, key_file, port, timeout)
+        pool_key = self._get_pool_key(host, username, port, compress)
+        host_pool = self._get_host_pool(pool_key)
+        connect_args = dict(
+            host=host, username=username, password=password, key_file=key_file,
+            port=port, timeout=timeout, compress=compress
+        )
+        attempts = self.max_connections + 1
+        
+        for attempt in range(attempts):
+            conn = self._checkout(pool_key, host_pool, connect_args)
+            try:
+                channel = conn.ssh.get_transport().open_session(timeout=timeout)
+            except paramiko.ChannelException as e:
+                self._incr('channel_rejections')
+                with host_pool.cond:
+                    conn.max_sessions = max(1, conn.sessions - 1)
+                self._release(host_pool, conn)
+                if attempt == attempts - 1:
+                    raise
+                self.logger.warning(f"SSH会话被拒绝 {pool_key}，会话上限调整为 {conn.max_sessions}: {e}")
+                continue
+            except Exception:
+                self._release(host_pool, conn)
+                raise
+            break
         
         try:
-            yield ssh
+            channel.settimeout(timeout)
+            yield channel
         finally:
-            # 归还连接到池中
-            with self.locks[pool_key]:
-                if len(self.pools[pool_key]) < self.pool_size:
-                    self.pools[pool_key].append(ssh)
-                else:
-                    ssh.close()
+            try:
+                channel.close()
+            finally:
+                self._release(host_pool, conn)
+    
+    def _ensure_health_thread(self):
+        """启动后台健康检查线程"""
+        if self._health_thread is not None or not self.health_check_interval:
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_check_loop, name='ssh-pool-health', daemon=True
+        )
+        self._health_thread.start()
+    
+    def _health_check_loop(self):
+        """后台定期探测空闲连接"""
+        while not self._stop_event.wait(self.health_check_interval):
+            try:
+                self.check_idle_connections()
+            except Exception as e:
+                self.logger.error(f"SSH连接池健康检查失败: {e}")
+    
+    def check_idle_connections(self):
+        """淘汰空闲超时的连接，并探测其余空闲连接是否存活"""
+        with self._pools_lock:
+            host_pools = list(self.pools.values())
+        
+        now = time.monotonic()
+        for host_pool in host_pools:
+            with host_pool.cond:
+                idle = [conn for conn in host_pool.connections if conn.sessions == 0]
+            
+            expired, dead = [], []
+            for conn in idle:
+                if now - conn.last_used > self.idle_timeout:
+                    expired.append(conn)
+                    continue
+                try:
+                    # 发送SSH_MSG_IGNORE探测包，连接已断开时会抛出异常
+                    conn.ssh.get_transport().send_ignore()
+                except Exception:
+                    dead.append(conn)
+                    continue
+                if not conn.is_alive():
+                    dead.append(conn)
+            
+            if not expired and not dead:
+                continue
+            
+            with host_pool.cond:
+                removed = [conn for conn in expired + dead
+                           if conn in host_pool.connections and conn.sessions == 0]
+                for conn in removed:
+                    host_pool.connections.remove(conn)
+                host_pool.cond.notify_all()
+            
+            for conn in removed:
+                self._close_quietly(conn.ssh)
+            self._incr('evicted_idle', len([c for c in removed if c in expired]))
+            self._incr('evicted_dead', len([c for c in removed if c in dead]))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        
+        checkouts = stats['checkouts']
+        stats['hit_rate'] = stats['hits'] / checkouts if checkouts else 0.0
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+        
+        with self._pools_lock:
+            host_pools = list(self.pools.items())
+        stats['hosts'] = {}
+        for pool_key, host_pool in host_pools:
+            with host_pool.cond:
+                stats['hosts'][pool_key] = {
+                    'connections': len(host_pool.connections),
+                    'idle': len([c for c in host_pool.connections if c.sessions == 0]),
+                    'sessions': sum(c.sessions for c in host_pool.connections),
+                    'max_sessions': [c.max_sessions for c in host_pool.connections],
+                }
+        return stats
+    
+    def _close_host_pool(self, host_pool: _HostPool):
+        """关闭已移除的主机连接池，正在使用的连接在会话释放时关闭"""
+        with host_pool.cond:
+            host_pool.closed = True
+            idle = [conn for conn in host_pool.connections if conn.sessions == 0]
+            host_pool.connections = [c for c in host_pool.connections if c.sessions > 0]
+            host_pool.cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn.ssh)
+    
+    def close_host(self, host: str, username: str, port: int = 22):
+        """关闭某个主机的全部连接（包括传输层压缩的连接池）"""
+        pool_keys = [self._get_pool_key(host, username, port, compress) for compress in (False, True)]
+        with self._pools_lock:
+            host_pools = [self.pools.pop(key) for key in pool_keys if key in self.pools]
+        
+        for host_pool in host_pools:
+            self._close_host_pool(host_pool)
     
     def close_all_connections(self):
         """关闭所有连接"""
-        for pool_key, connections in self.pools.items():
-            for conn in connections:
-                try:
-                    conn.close()
-                except:
-                    pass
-        self.pools.clear()
+        self._stop_event.set()
+        
+        with self._pools_lock:
+            host_pools = list(self.pools.values())
+            self.pools.clear()
+        
+        for host_pool in host_pools:
+            self._close_host_pool(host_pool)
 
 
 class RemoteDockerManager:
     """远程Docker管理器"""
     
-    def __init__(self, ssh_pool: SSHConnectionPool):
+    def __init__(self, ssh_pool: SSHConnectionPool, health_tracker=None,
+                 default_compression: str = COMPRESSION_NONE, default_log_source: str = LOG_SOURCE_API):
         self.ssh_pool = ssh_pool
+        self.health_tracker = health_tracker
+        self.default_compression = default_compression
+        self.default_log_source = default_log_source
+        # 服务器名称 -> 实际使用的压缩模式
+        self._compression_modes: Dict[str, str] = {}
+        # (服务器名称, 容器名称) -> 日志文件读取位置
+        self._log_cursors: Dict[Tuple[str, str], RemoteLogCursor] = {}
+        # (服务器名称, 容器名称) -> 改用docker logs的时间
+        self._log_fallback: Dict[Tuple[str, str], float] = {}
+        self._cursor_lock = threading.Lock()
         self.logger = setup_logger()
     
-    def get_container_logs(self, server_config: Dict, container_name: str, 
-                          since: Optional[str] = None, tail: int = 500) -> List[str]:
-        """获取远程容器日志"""
+    def _get_compression(self, server_config: Dict) -> str:
+        """获取服务器实际使用的压缩模式"""
+        server_name = server_config.get('name', server_config['host'])
+        mode = self._compression_modes.get(server_name)
+        if mode is not None:
+            return mode
+        
+        requested = server_config.get('compression', self.default_compression)
+        try:
+            mode = resolve_mode(requested)
+        except ValueError as e:
+            self.logger.warning(f"⚠️ {server_name} {e}，不压缩传输")
+            mode = COMPRESSION_NONE
+        if requested == COMPRESSION_ZSTD and mode != COMPRESSION_ZSTD:
+            self.logger.warning(f"⚠️ 未安装zstandard，{server_name} 改用gzip压缩")
+        self._compression_modes[server_name] = mode
+        return mode
+    
+    def forget_server(self, server_name: str):
+        """清除服务器的缓存状态（配置变化或移除服务器时调用）"""
+        self._compression_modes.pop(server_name, None)
+        with self._cursor_lock:
+            self._log_fallback = {key: value for key, value in self._log_fallback.items() if key[0] != server_name}
+    
+    def forget_log_cursors(self, server_name: str):
+        """丢弃服务器上所有容器的日志文件读取位置（移除服务器或连接目标变化时调用）"""
+        with self._cursor_lock:
+            self._log_cursors = {key: value for key, value in self._log_cursors.items() if key[0] != server_name}
+    
+    def _connection_args(self, server_config: Dict) -> Dict[str, Any]:
+        """从服务器配置中提取连接参数"""
+        return {
+            'host': server_config['host'],
+            'username': server_config['username'],
+            'password': server_config.get('password'),
+            'key_file': server_config.get('key_file'),
+            'port': server_config.get('port', 22),
+            'timeout': server_config.get('timeout', 10),
+            'compress': self._get_compression(server_config) == COMPRESSION_SSH,
+        }
+    
+    @contextmanager
+    def _session(self, server_config: Dict):
+        """打开会话通道并把结果记录到服务器健康状态
+        
+        只有建连、会话和执行命令中的SSH、网络和超时错误计为服务器故障，
+        解压、解析等本地错误原样抛出，不影响健康状态。
+        """
+        import paramiko
+        
+        server_name = server_config.get('name', server_config['host'])
+        try:
+            with self.ssh_pool.open_session(**self._connection_args(server_config)) as channel:
+                yield channel
+        except (paramiko.SSHException, OSError, SSHConnectionError, SSHPoolTimeoutError):
+            # OSError包括socket.error和socket.timeout
+            if self.health_tracker:
+                self.health_tracker.record_failure(server_name)
+            raise
+        
+        if self.health_tracker:
+            self.health_tracker.record_success(server_name)
+    
+    def _run_command(self, server_config: Dict, cmd: str) -> Tuple[str, str]:
+        """在远程服务器上执行命令，返回(stdout, stderr)"""
+        with self._session(server_config) as channel:
+            channel.exec_command(cmd)
+            stdout = channel.makefile('rb').read()
+            stderr = channel.makefile_stderr('rb').read()
+        
+        SSH_BYTES_RECEIVED.inc(len(stdout) + len(stderr), (server_config.get('name', server_config['host']),))
+        return (stdout.decode('utf-8', errors='ignore').strip(),
+                stderr.decode('utf-8', errors='ignore').strip())
+    
+    def _run_compressed(self, server_config: Dict, cmd: str, mode: str) -> Tuple[List[str], str]:
+        """执行输出经过压缩的远程命令，边接收边解压切分，返回(行列表, stderr)"""
+        decompressor = get_decompressor(mode)
+        splitter = LineSplitter()
+        received = 0
+        
+        with self._session(server_config) as channel:
+            channel.exec_command(cmd)
+            while True:
+                chunk = channel.recv(65536)
+                if not chunk:
+                    break
+                received += len(chunk)
+                splitter.feed(decompressor.decompress(chunk))
+            splitter.feed(decompressor.flush())
+            stderr = channel.makefile_stderr('rb').read()
+        
+        SSH_BYTES_RECEIVED.inc(received + len(stderr), (server_config.get('name', server_config['host']),))
+        return splitter.close(), stderr.decode('utf-8', errors='ignore').strip()
+    
+    def get_container_logs(self, server_config: Dict, container_name: str,
+                          since: Optional[str] = None, tail: int = 500,
+                          log_filter: Optional[RemoteLogFilter] = None) -> List[str]:
+        """获取远程容器日志
+        
+        传入log_filter时在远程主机上预过滤，只传回候选错误行及其上下文；
+        服务器配置compression为gzip/zstd时远程输出先压缩再传输。
+        """
         host = server_config['host']
-        username = server_config['username']
-        password = server_config.get('password')
-        key_file = server_config.get('key_file')
-        port = server_config.get('port', 22)
-        timeout = server_config.get('timeout', 10)
+        mode = self._get_compression(server_config)
+        
+        if self._get_log_source(server_config) == LOG_SOURCE_JSON_FILE:
+            try:
+                lines = self._tail_log_file(server_config, container_name, log_filter)
+            except Exception as e:
+                self.logger.error(f"读取远程容器日志文件失败 {host}:{container_name} - {e}")
+                return []
+            if lines is not None:
+                return lines
         
         try:
-            with self.ssh_pool.get_connection(host, username, password, key_file, port, timeout) as ssh:
-                # 构建docker logs命令
-                cmd_parts = ['docker logs', f'--tail {tail}']
-                
-                if since:
-                    cmd_parts.append(f'--since {since}')
-                
-                cmd_parts.append(container_name)
-                cmd = ' '.join(cmd_parts)
-                
-                stdin, stdout, stderr = ssh.exec_command(cmd, timeout=timeout)
-                
+            # 构建docker logs命令
+            cmd_parts = ['docker logs', f'--tail {tail}']
+            
+            if since:
+                cmd_parts.append(f'--since {since}')
+            
+            cmd_parts.append(container_name)
+            cmd = ' '.join(cmd_parts)
+            if log_filter:
+                cmd = log_filter.wrap(cmd)
+            
+            if is_stream_mode(mode):
+                if not log_filter:
+                    cmd = f"{cmd} 2>&1"
+                cmd = f"{cmd} | {remote_command(mode)}"
+                lines, error_output = self._run_compressed(server_config, cmd, mode)
+                if error_output and not lines:
+                    # 远程主机缺少压缩命令等情况，回退为不压缩
+                    server_name = server_config.get('name', host)
+                    self.logger.warning(f"⚠️ {server_name} 远程{mode}压缩失败，改为不压缩传输: {error_output}")
+                    self._compression_modes[server_name] = COMPRESSION_NONE
+                    return self.get_container_logs(server_config, container_name, since, tail, log_filter)
+            else:
                 # 读取标准输出和错误输出
-                output = stdout.read().decode('utf-8', errors='ignore').strip()
-                error_output = stderr.read().decode('utf-8', errors='ignore').strip()
+                output, error_output = self._run_command(server_config, cmd)
                 
                 # 检查容器是否存在
                 if error_output and 'No such container' in error_output:
@@ -141,31 +607,160 @@ class RemoteDockerManager:
                 
                 # 保留原始Docker日志格式（包含时间戳）
                 lines = combined_output.split('\n')
-                return [line for line in lines if line.strip()]
+            
+            # 预过滤或压缩模式下stderr合并到了输出中，docker自身的错误信息位于第一行
+            if lines and lines[0].startswith('Error') and 'No such container' in lines[0]:
+                self.logger.warning(f"容器 {container_name} 在 {host} 上不存在")
+                return []
+            
+            return [line for line in lines if line.strip()]
         
         except Exception as e:
             self.logger.error(f"获取远程容器日志失败 {host}:{container_name} - {e}")
             return []
     
+    def uses_log_tail(self, server_config: Dict, container_name: Optional[str] = None) -> bool:
+        """是否通过docker logs --tail读取，传入容器名时还考虑该容器是否已改用docker logs"""
+        if self._get_log_source(server_config) != LOG_SOURCE_JSON_FILE:
+            return True
+        if container_name is None:
+            return False
+        key = (server_config.get('name', server_config['host']), container_name)
+        with self._cursor_lock:
+            return key not in self._log_cursors
+    
+    def _get_log_source(self, server_config: Dict) -> str:
+        """服务器配置的日志读取方式"""
+        log_source = server_config.get('log_source', self.default_log_source)
+        return log_source if log_source in LOG_SOURCES else LOG_SOURCE_API
+    
+    def _tail_log_file(self, server_config: Dict, container_name: str,
+                       log_filter: Optional[RemoteLogFilter] = None) -> Optional[List[str]]:
+        """按字节偏移读取容器的json-file日志文件，只传输上次读取之后新增的内容
+        
+        第一次读取时通过docker inspect得到日志文件路径，之后每轮只执行stat和tail -c，
+        远程开销与新增日志量成正比，与文件总大小无关。inode变化说明文件已轮转，
+        先读完.1中的剩余内容再从头读新文件；大小变小说明被截断，从头读取。
+        日志驱动不是json-file或无权读取文件时返回None，由调用方改用docker logs。
+        """
+        server_name = server_config.get('name', server_config['host'])
+        key = (server_name, container_name)
+        with self._cursor_lock:
+            cursor = self._log_cursors.get(key)
+            fallback_since = self._log_fallback.get(key)
+        
+        if cursor is None:
+            if fallback_since is not None and time.monotonic() - fallback_since < LOG_FALLBACK_RECHECK_SECONDS:
+                return None
+            cursor = self._resolve_log_file(server_config, container_name)
+            if cursor is None:
+                return None
+        
+        data, header = self._run_tail(server_config, read_command(cursor.path, cursor.inode, cursor.offset),
+                                      log_filter)
+        if header is None:
+            with self._cursor_lock:
+                self._log_cursors.pop(key, None)
+            if cursor.inode is None:
+                self._log_fallback_to_api(key, f"无法读取日志文件 {cursor.path}")
+                return None
+            # 容器被删除或重建，下一轮重新查询日志文件路径
+            return []
+        
+        inode, size = header
+        if cursor.inode is None:
+            cursor.inode = inode
+            cursor.offset = size
+            with self._cursor_lock:
+                self._log_cursors[key] = cursor
+            return cursor.decoder.feed(data)
+        
+        if inode == cursor.inode:
+            if size < cursor.offset:
+                self.logger.info(f"✂️ {server_name}:{container_name} 的日志文件被截断，从头读取")
+                cursor.offset = 0
+                cursor.decoder.reset()
+                return self._tail_log_file(server_config, container_name, log_filter)
+            cursor.offset += consumed_bytes(cursor, size)
+            return cursor.decoder.feed(data)
+        
+        # 文件已轮转：旧文件此时应为.1，读完其中剩余的部分
+        rotated, rotated_header = self._run_tail(
+            server_config, read_command(f"{cursor.path}.1", cursor.inode, cursor.offset, max_bytes=None), log_filter
+        )
+        if rotated_header is None or rotated_header[0] != cursor.inode:
+            self.logger.warning(f"⚠️ {server_name}:{container_name} 的日志文件已轮转，未找到旧文件剩余内容")
+        lines = cursor.decoder.feed(rotated)
+        
+        cursor.inode = inode
+        cursor.offset = 0
+        cursor.decoder.remainder = b''
+        self.logger.info(f"🔁 {server_name}:{container_name} 的日志文件已轮转")
+        return lines + self._tail_log_file(server_config, container_name, log_filter)
+    
+    def _resolve_log_file(self, server_config: Dict, container_name: str) -> Optional[RemoteLogCursor]:
+        """查询容器的日志驱动和日志文件路径"""
+        server_name = server_config.get('name', server_config['host'])
+        output, error_output = self._run_command(server_config, inspect_command(container_name))
+        if not output:
+            # 容器不存在等情况交给docker logs报告
+            self.logger.debug(f"查询 {server_name}:{container_name} 日志文件失败: {error_output}")
+            return None
+        
+        driver, _, path = output.partition(' ')
+        if driver != 'json-file' or not path:
+            self._log_fallback_to_api((server_name, container_name), f"日志驱动为 {driver}")
+            return None
+        return RemoteLogCursor(path)
+    
+    def _log_fallback_to_api(self, key: Tuple[str, str], reason: str):
+        with self._cursor_lock:
+            first_time = key not in self._log_fallback
+            self._log_fallback[key] = time.monotonic()
+        if first_time:
+            self.logger.warning(f"⚠️ {key[0]}:{key[1]} {reason}，改用docker logs读取")
+    
+    def _run_tail(self, server_config: Dict, script: str,
+                  log_filter: Optional[RemoteLogFilter] = None) -> Tuple[bytes, Optional[Tuple[int, int]]]:
+        """执行日志文件读取命令，返回(输出字节, (inode, 大小))
+        
+        stdout只包含文件内容，可以再经过远程预过滤和压缩；文件信息通过stderr返回。
+        """
+        mode = self._get_compression(server_config)
+        cmd = f"{{ {script}; }}"
+        if log_filter:
+            cmd = f"{cmd} | {log_filter.build_command()}"
+        if is_stream_mode(mode):
+            cmd = f"{cmd} | {remote_command(mode)}"
+        
+        with self._session(server_config) as channel:
+            channel.exec_command(cmd)
+            stdout = channel.makefile('rb').read()
+            stderr = channel.makefile_stderr('rb').read().decode('utf-8', errors='ignore')
+        SSH_BYTES_RECEIVED.inc(len(stdout) + len(stderr), (server_config.get('name', server_config['host']),))
+        
+        if is_stream_mode(mode):
+            if not stdout:
+                # 远程主机缺少压缩命令，回退为不压缩后重新读取
+                server_name = server_config.get('name', server_config['host'])
+                self.logger.warning(f"⚠️ {server_name} 远程{mode}压缩失败，改为不压缩传输: {stderr.strip()}")
+                self._compression_modes[server_name] = COMPRESSION_NONE
+                return self._run_tail(server_config, script, log_filter)
+            decompressor = get_decompressor(mode)
+            stdout = decompressor.decompress(stdout) + decompressor.flush()
+        return stdout, parse_header(stderr)
+    
     def get_running_containers(self, server_config: Dict) -> List[str]:
         """获取远程服务器上运行的容器列表"""
         host = server_config['host']
-        username = server_config['username']
-        password = server_config.get('password')
-        key_file = server_config.get('key_file')
-        port = server_config.get('port', 22)
-        timeout = server_config.get('timeout', 10)
         
         try:
-            with self.ssh_pool.get_connection(host, username, password, key_file, port, timeout) as ssh:
-                cmd = "docker ps --format '{{.Names}}'"
-                stdin, stdout, stderr = ssh.exec_command(cmd, timeout=timeout)
-                
-                output = stdout.read().decode('utf-8', errors='ignore').strip()
-                if not output:
-                    return []
-                
-                return output.split('\n')
+            cmd = "docker ps --format '{{.Names}}'"
+            output, _ = self._run_command(server_config, cmd)
+            if not output:
+                return []
+            
+            return output.split('\n')
         
         except Exception as e:
             self.logger.error(f"获取远程容器列表失败 {host} - {e}")
@@ -174,19 +769,11 @@ class RemoteDockerManager:
     def check_docker_availability(self, server_config: Dict) -> bool:
         """检查远程服务器Docker可用性"""
         host = server_config['host']
-        username = server_config['username']
-        password = server_config.get('password')
-        key_file = server_config.get('key_file')
-        port = server_config.get('port', 22)
-        timeout = server_config.get('timeout', 10)
         
         try:
-            with self.ssh_pool.get_connection(host, username, password, key_file, port, timeout) as ssh:
-                cmd = "docker --version"
-                stdin, stdout, stderr = ssh.exec_command(cmd, timeout=timeout)
-                
-                output = stdout.read().decode('utf-8', errors='ignore').strip()
-                return 'Docker version' in output
+            cmd = "docker --version"
+            output, _ = self._run_command(server_config, cmd)
+            return 'Docker version' in output
         
         except Exception as e:
             self.logger.error(f"检查Docker可用性失败 {host} - {e}")
@@ -1,30 +1,62 @@
 #!/usr/bin/env python3
+import glob
+import os
 import time
 import argparse
 import sys
+import threading
 from pathlib import Path
 
 # 添加src目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent))
 
-from core.config import ConfigManager
+from core.cluster import ClusterMember
+from core.config import ConfigManager, ConfigWatcher
+from core.correlation import IncidentCorrelator
+from core.drain import DrainMiner
+from core.settings import Settings
 from core.monitor import DockerLogMonitor
+from core.priority import PriorityLane, PrioritySender
 from core.remote_monitor import MultiServerMonitor
+from core.replay import ReplayLogMonitor, container_name_for, iter_log_lines
+from core.sharding import ShardCoordinator
 from notifications.factory import NotificationFactory
-from utils.logger import setup_logger
+from notifications.rendering import RenderedNotification
+from utils.logger import configure_logging, setup_logger
+from utils.profiler import LoopProfiler
+from utils.metrics import (
+    MetricsServer, NOTIFICATION_DURATION, NOTIFICATIONS_SENT, STAGE_DURATION, TICK_DURATION, TICK_OVERRUNS
+)
 
 
 class DockerLogMonitorApp:
     """Docker日志监控应用主类"""
     
-    def __init__(self, config_file: str = 'config.json'):
+    def __init__(self, config_file: str = 'config.json', profile: bool = False, shards: int = None):
         self.config_manager = ConfigManager(config_file)
+        configure_logging(self.config_manager.config)
         self.logger = setup_logger()
         self.notification_providers = []
+        # 主循环和紧急告警发送线程都会调用提供者，提供者本身不是线程安全的，逐条事件加锁分发
+        self._dispatch_lock = threading.Lock()
         self.local_monitor = None
         self.remote_monitor = None
+        self.shard_coordinator = None
+        self.cluster = None
+        self.metrics_server = None
+        self.profiler = None
+        self.config_watcher = None
+        self.template_miner = None
+        self.correlator = None
+        # 紧急告警快速通道，本地和远程监控器共用，命中后交给发送线程立即发送
+        self.priority_sender = PrioritySender(self.send_notifications)
+        self.priority_lane = PriorityLane(self.config_manager.settings, sink=self.priority_sender.submit)
+        self._last_template_save = time.time()
         self._setup_notifications()
-        self._setup_monitors()
+        self._setup_correlation(self.config_manager.settings)
+        self._setup_cluster()
+        self._setup_monitors(shards)
+        self._setup_profiler(profile)
     
     def _setup_notifications(self):
         """设置通知提供者"""
@@ -39,51 +71,321 @@ class DockerLogMonitorApp:
                 except Exception as e:
                     self.logger.error(f"❌ 初始化 {provider_type} 通知失败: {e}")
     
-    def _setup_monitors(self):
+    def _setup_correlation(self, settings: Settings):
+        """启用跨容器、跨服务器的故障关联，已开启的故障在配置变化后保留"""
+        if not settings.get('correlation.enabled', False):
+            self.correlator = None
+        elif self.correlator:
+            self.correlator.update_config(settings)
+        else:
+            self.correlator = IncidentCorrelator(settings)
+            self.logger.info(f"🔗 已启用故障关联，窗口 {self.correlator.window}秒")
+    
+    def _setup_cluster(self):
+        """加入集群，按租约分摊远程服务器"""
+        settings = self.config_manager.settings
+        if not settings.get('cluster.enabled', False):
+            return
+        
+        self.cluster = ClusterMember(settings)
+        owned = self.cluster.sync()
+        self.cluster.take_changes()
+        self.logger.info(f"🔗 已加入集群: {self.cluster.instance_id}，"
+                         f"负责 {len(owned)}/{len(settings.remote_servers)} 台远程服务器")
+    
+    def _monitor_settings(self, settings: Settings) -> Settings:
+        """集群模式下只保留本实例负责的远程服务器"""
+        return self.cluster.owned_settings(settings) if self.cluster else settings
+    
+    def _close_notifications(self):
+        """关闭通知提供者，批量出口会先写完队列中的事件"""
+        for provider in self.notification_providers:
+            try:
+                provider.close()
+            except Exception as e:
+                self.logger.error(f"❌ 关闭 {provider.get_name()} 通知失败: {e}")
+        self.notification_providers = []
+    
+    def _setup_monitors(self, shards: int = None):
         """设置监控器"""
+        settings = self.config_manager.settings
+        for pattern in settings.invalid_patterns:
+            self.logger.warning(f"⚠️ 忽略无效的黑名单正则: {pattern}")
+        
+        # 分片模式：本地和远程监控都在工作进程中运行
+        workers = settings.shard_workers if shards is None else shards
+        if self.cluster and workers > 1:
+            self.logger.warning("⚠️ 集群模式下不支持分片，已忽略分片进程数（可在同一主机上运行多个实例）")
+            workers = 0
+        settings = self._monitor_settings(settings)
+        if workers > 1:
+            self.shard_coordinator = ShardCoordinator(settings, workers)
+            self.logger.info(f"✅ 已启用分片模式: {workers} 个工作进程")
+            return
+        self._setup_template_miner(settings)
+        
         # 本地监控
-        if self.config_manager.get('local_monitoring.enabled', True):
-            self.local_monitor = DockerLogMonitor(self.config_manager.config)
+        if settings.local_monitoring_enabled:
+            self.local_monitor = DockerLogMonitor(settings, template_miner=self.template_miner,
+                                                  priority=self.priority_lane)
             self.logger.info("✅ 已启用本地Docker监控")
         else:
             self.logger.info("⚠️ 本地Docker监控已禁用")
         
         # 远程监控
-        remote_servers = self.config_manager.get('remote_servers', [])
-        if remote_servers:
-            self.remote_monitor = MultiServerMonitor(self.config_manager.config)
-            self.logger.info(f"✅ 已启用远程服务器监控 ({len(remote_servers)}台)")
+        if settings.remote_servers:
+            self.remote_monitor = MultiServerMonitor(settings, dedup=self._shared_dedup(),
+                                                     template_miner=self.template_miner,
+                                                     priority=self.priority_lane)
+            self.logger.info(f"✅ 已启用远程服务器监控 ({len(settings.remote_servers)}台)")
         else:
             self.logger.info("ℹ️ 未配置远程服务器监控")
     
+    def _start_config_watcher(self):
+        """启动配置热加载"""
+        reload_config = self.config_manager.get('config_reload', {})
+        if not reload_config.get('enabled', True):
+            return
+        
+        self.config_watcher = ConfigWatcher(self.config_manager, reload_config.get('poll_interval', 2))
+        self.config_watcher.install_signal_handler()
+        self.config_watcher.start()
+        self.logger.info(f"🔄 配置热加载已启用: {self.config_manager.config_file}")
+    
+    def apply_config(self, settings: Settings):
+        """在两轮检查之间应用新配置，保留未变化容器的读取位置、缓冲区和去重状态"""
+        start = time.perf_counter()
+        new_config = settings.to_dict()
+        old_config = self.config_manager.config
+        if new_config == old_config:
+            return
+        self.config_manager.config = new_config
+        self.config_manager.settings = settings
+        changes = []
+        
+        if new_config.get('logging') != old_config.get('logging'):
+            configure_logging(new_config)
+            changes.append("日志配置")
+        
+        if new_config.get('notifications') != old_config.get('notifications'):
+            with self._dispatch_lock:
+                self._close_notifications()
+                self._setup_notifications()
+            changes.append("通知配置")
+        
+        if new_config.get('correlation') != old_config.get('correlation'):
+            self._setup_correlation(settings)
+            changes.append("故障关联配置")
+        
+        if new_config.get('priority') != old_config.get('priority'):
+            self.priority_lane.update_config(settings)
+            changes.append("紧急告警配置")
+        
+        if self.cluster:
+            self.cluster.update_config(settings)
+            self.cluster.take_changes()
+            settings = self._monitor_settings(settings)
+        
+        if self.shard_coordinator:
+            self.shard_coordinator.update_config(settings)
+            changes.append("已下发到分片进程")
+        else:
+            if new_config.get('fingerprint') != old_config.get('fingerprint'):
+                self._save_templates()
+                self._setup_template_miner(settings)
+                if self.local_monitor:
+                    self.local_monitor.template_miner = self.template_miner
+                if self.remote_monitor:
+                    self.remote_monitor.set_template_miner(self.template_miner)
+                changes.append("错误指纹配置")
+            self._apply_monitor_config(settings, changes)
+        
+        elapsed = (time.perf_counter() - start) * 1000
+        self.logger.info(f"🔄 配置已重新加载 ({elapsed:.1f}ms){': ' + '; '.join(changes) if changes else ''}")
+    
+    def _apply_monitor_config(self, settings: Settings, changes: list):
+        """更新本进程中的监控器"""
+        # 本地监控
+        if settings.local_monitoring_enabled:
+            if self.local_monitor:
+                self.local_monitor.update_config(settings)
+            else:
+                try:
+                    self.local_monitor = DockerLogMonitor(settings, template_miner=self.template_miner,
+                                                          priority=self.priority_lane)
+                    changes.append("启用本地监控")
+                except Exception as e:
+                    self.logger.error(f"❌ 启用本地Docker监控失败: {e}")
+        elif self.local_monitor:
+            self.local_monitor = None
+            changes.append("停用本地监控")
+        
+        # 远程监控
+        if settings.remote_servers:
+            if not self.remote_monitor:
+                # 空服务器列表构造避免在主循环中等待启动探测，服务器由update_config在后台接入
+                self.remote_monitor = MultiServerMonitor({**settings.raw, 'remote_servers': []},
+                                                         dedup=self._shared_dedup(),
+                                                         template_miner=self.template_miner,
+                                                         priority=self.priority_lane)
+            result = self.remote_monitor.update_config(settings)
+            for key, label in (('added', '新增'), ('removed', '移除'), ('reconnected', '重连')):
+                if result[key]:
+                    changes.append(f"{label}服务器 {', '.join(result[key])}")
+        elif self.remote_monitor:
+            self.remote_monitor.cleanup()
+            self.remote_monitor = None
+            changes.append("停用远程监控")
+    
+    def _setup_template_miner(self, settings: Settings):
+        """fingerprint.mode为drain时创建本地和远程监控共用的模板树，并从状态文件恢复已有模板"""
+        self.template_miner = None
+        if settings.fingerprint_mode != 'drain':
+            return
+        
+        miner = DrainMiner.from_settings(settings)
+        path = self._template_path(settings)
+        if path and os.path.exists(path):
+            try:
+                miner = DrainMiner.load(path, **miner.params())
+                self.logger.info(f"🧬 已恢复 {len(miner)} 个日志模板: {path}")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.logger.warning(f"⚠️ 读取日志模板状态失败，重新建立模板: {e}")
+        if self.cluster:
+            # 各实例的模板编号各自分配，共享去重库中的指纹带实例ID，服务器迁移后不会套用其他实例同编号模板的计数和冷却
+            miner.scope = f"{self.cluster.instance_id}:"
+        self.template_miner = miner
+    
+    def _template_path(self, settings: Settings) -> str:
+        """模板状态文件，集群模式下加实例ID后缀，同一主机上的多个实例不会互相覆盖"""
+        path = settings.get('fingerprint.state_file', '')
+        if path and self.cluster:
+            return f"{path}.{self.cluster.instance_id.replace(os.sep, '_')}"
+        return path
+    
+    def _save_templates(self):
+        """保存日志模板，重启后模板编号保持不变"""
+        path = self._template_path(self.config_manager.settings)
+        if not self.template_miner or not path:
+            return
+        try:
+            self.template_miner.save(path)
+        except OSError as e:
+            self.logger.error(f"❌ 保存日志模板失败: {e}")
+        self._last_template_save = time.time()
+    
+    def _shared_dedup(self):
+        """集群模式下远程服务器使用共享的去重状态"""
+        return self.cluster.dedup if self.cluster else None
+    
+    def apply_cluster_changes(self):
+        """集群重新分配后增量更新远程监控"""
+        changes = []
+        self._apply_monitor_config(self._monitor_settings(self.config_manager.settings), changes)
+        if changes:
+            self.logger.info(f"🔀 已应用集群分配: {'; '.join(changes)}")
+    
+    def _setup_profiler(self, force: bool = False):
+        """设置性能分析"""
+        profiling_config = self.config_manager.get('profiling', {})
+        if not (force or profiling_config.get('enabled', False)):
+            return
+        
+        self.profiler = LoopProfiler(
+            output_dir=profiling_config.get('output_dir', 'profiles'),
+            mode=profiling_config.get('mode', 'cprofile'),
+            profile_ticks=profiling_config.get('profile_ticks', 10),
+            dump_interval=profiling_config.get('dump_interval', 0),
+            sample_interval=profiling_config.get('sample_interval', 0.005)
+        )
+        if self.profiler.install_signal_handler():
+            self.logger.info("🔬 已启用性能分析，发送 SIGUSR1 导出阶段耗时报告")
+        else:
+            self.logger.info("🔬 已启用性能分析（当前平台不支持SIGUSR1，仅按dump_interval导出）")
+    
+    def _monitors(self) -> list:
+        """当前所有监控器"""
+        monitors = [self.local_monitor] if self.local_monitor else []
+        if self.remote_monitor:
+            monitors.extend(self.remote_monitor.get_monitors())
+        return monitors
+    
+    def _start_metrics_server(self):
+        """启动Prometheus指标导出服务"""
+        metrics_config = self.config_manager.get('metrics', {})
+        if not metrics_config.get('enabled', False):
+            return
+        
+        host = metrics_config.get('host', '127.0.0.1')
+        port = metrics_config.get('port', 9108)
+        try:
+            self.metrics_server = MetricsServer(host, port)
+            self.metrics_server.start()
+            self.logger.info(f"📈 指标导出地址: http://{host}:{port}/metrics")
+        except OSError as e:
+            self.logger.error(f"❌ 启动指标服务失败: {e}")
+    
+    def _wait_next_tick(self, seconds: float):
+        """等待下一轮检查，分片模式下等待期间工作进程上报的紧急告警立即发送"""
+        if not self.shard_coordinator:
+            time.sleep(seconds)
+            return
+        
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self.send_notifications(self.shard_coordinator.take_priority(remaining))
+    
     def send_notifications(self, errors: list):
         """发送通知到所有配置的提供者"""
         if not errors:
             return
         
+        notify_start = time.perf_counter()
         for error in errors:
             server_name = error.get('server', '本地')
             container_name = error['container']
+            dispatch_start = time.perf_counter()
             
             title = f"🚨 Docker错误 - {server_name}:{container_name}"
             context = error['context']
+            fields = {
+                'container': container_name,
+                'timestamp': error['timestamp'],
+                'count': error['count'],
+                'threshold': error['threshold'],
+                'server': server_name,
+            }
+            if error.get('priority'):
+                title = f"🔥 紧急告警[{error['priority']}] - {server_name}:{container_name}"
+                fields['priority'] = error['priority']
+            # 每个事件只渲染一次，所有提供者共用
+            rendered = RenderedNotification(title, context, **fields)
             
-            for provider in self.notification_providers:
-                try:
-                    success = provider.send(
-                        title=title,
-                        message=context,
-                        container=container_name,
-                        timestamp=error['timestamp'],
-                        count=error['count'],
-                        threshold=error['threshold']
-                    )
-                    if success:
-                        self.logger.info(f"✅ {provider.get_name()} 通知发送成功")
-                    else:
-                        self.logger.warning(f"⚠️ {provider.get_name()} 通知发送失败")
-                except Exception as e:
-                    self.logger.error(f"❌ {provider.get_name()} 通知异常: {e}")
+            with self._dispatch_lock:
+                for provider in self.notification_providers:
+                    provider_name = provider.get_name()
+                    send_start = time.perf_counter()
+                    try:
+                        success = provider.send(title=title, message=context, rendered=rendered, **fields)
+                        if success:
+                            NOTIFICATIONS_SENT.inc(1, (provider_name, 'success'))
+                            self.logger.info(f"✅ {provider_name} 通知发送成功")
+                        else:
+                            NOTIFICATIONS_SENT.inc(1, (provider_name, 'failure'))
+                            self.logger.warning(f"⚠️ {provider_name} 通知发送失败")
+                    except Exception as e:
+                        NOTIFICATIONS_SENT.inc(1, (provider_name, 'error'))
+                        self.logger.error(f"❌ {provider_name} 通知异常: {e}")
+                    NOTIFICATION_DURATION.observe(time.perf_counter() - send_start, (provider_name,))
+            
+            if self.profiler:
+                self.profiler.record(error.get('server', 'local'), container_name, 'dispatch',
+                                     time.perf_counter() - dispatch_start)
+        
+        STAGE_DURATION.observe(time.perf_counter() - notify_start, ('notify',))
     
     def run(self):
         """运行监控应用"""
@@ -100,17 +402,44 @@ class DockerLogMonitorApp:
             self.logger.info(f"🌐 远程服务器数量: {server_count}台")
             for server_name in self.remote_monitor.monitors.keys():
                 self.logger.info(f"   📍 {server_name}")
+            for server_name in self.remote_monitor.get_degraded_servers():
+                self.logger.info(f"   ⏳ {server_name} (降级，后台重试中)")
+        
+        if self.shard_coordinator:
+            self.logger.info(f"🧩 分片工作进程: {self.shard_coordinator.workers}个，去重和通知由主进程统一处理")
+        
+        if self.cluster:
+            instances = self.cluster.leases.live_instances(time.time(), self.cluster.lease_ttl)
+            self.logger.info(f"🔗 集群实例: {self.cluster.instance_id} (共{len(instances)}个)，租约库 {self.cluster.path}")
         
         self.logger.info(f"🎯 日志级别: {', '.join(self.config_manager.get('log_levels', ['所有']))}")
         self.logger.info(f"🔍 关键词: {', '.join(self.config_manager.get('keywords', ['无']))}")
         self.logger.info(f"⏱️ 检查间隔: {self.config_manager.get('check_interval', 5)}秒")
         self.logger.info(f"🔢 错误阈值: {self.config_manager.get('error_threshold', 3)}次")
         self.logger.info(f"🕒 冷却时间: {self.config_manager.get('cooldown_minutes', 30)}分钟")
+        if self.priority_lane.enabled:
+            self.logger.info(f"🔥 紧急告警: {', '.join(self.priority_lane.keywords)}"
+                             f"（冷却 {self.priority_lane.cooldown}秒）")
         self.logger.info(f"📧 通知提供者: {[p.get_name() for p in self.notification_providers]}")
         self.logger.info("=" * 60)
+        self._start_metrics_server()
+        self._start_config_watcher()
+        self.priority_sender.start()
+        if self.cluster:
+            self.cluster.start()
         
         while True:
             try:
+                if self.config_watcher:
+                    new_config = self.config_watcher.take_pending()
+                    if new_config is not None:
+                        self.apply_config(new_config)
+                if self.cluster and self.cluster.take_changes() is not None:
+                    self.apply_cluster_changes()
+                
+                tick_start = time.perf_counter()
+                if self.profiler:
+                    self.profiler.begin_tick(self._monitors())
                 all_errors = []
                 
                 # 处理本地监控
@@ -125,45 +454,145 @@ class DockerLogMonitorApp:
                     remote_errors = self.remote_monitor.process_all_servers()
                     all_errors.extend(remote_errors)
                 
+                # 收集分片进程的候选事件并去重
+                if self.shard_coordinator:
+                    all_errors.extend(self.shard_coordinator.collect())
+                    self.send_notifications(self.shard_coordinator.take_priority())
+                
+                # 合并同一故障在多个容器和服务器上的事件
+                if self.correlator:
+                    all_errors = self.correlator.process(all_errors)
+                
                 # 发送通知
                 if all_errors:
                     self.send_notifications(all_errors)
                 
+                save_interval = self.config_manager.settings.get('fingerprint.save_interval', 300)
+                if self.template_miner and time.time() - self._last_template_save >= save_interval:
+                    self._save_templates()
+                
                 # 定期清理
                 if self.local_monitor and self.local_monitor.should_cleanup():
                     self.local_monitor.cleanup_old_errors()
                     self.logger.info(f"🧹 本地内存清理完成，当前活跃条目: {len(self.local_monitor.error_counts)}")
                 
-                time.sleep(self.config_manager.get('check_interval', 5))
+                check_interval = self.config_manager.settings.check_interval
+                tick_duration = time.perf_counter() - tick_start
+                TICK_DURATION.observe(tick_duration)
+                if tick_duration > check_interval:
+                    TICK_OVERRUNS.inc()
+                    self.logger.warning(f"⚠️ 本轮检查耗时 {tick_duration:.1f}秒，超过检查间隔 {check_interval}秒")
+                if self.profiler:
+                    self.profiler.end_tick(tick_duration, check_interval)
+                
+                self._wait_next_tick(check_interval)
                 
             except KeyboardInterrupt:
                 self.logger.info("\n👋 正在停止监控器...")
                 if self.remote_monitor:
                     self.remote_monitor.cleanup()
+                if self.shard_coordinator:
+                    self.shard_coordinator.stop()
+                if self.cluster:
+                    self.cluster.stop()
+                self._save_templates()
+                self.priority_sender.stop()
+                self._close_notifications()
+                if self.metrics_server:
+                    self.metrics_server.stop()
+                if self.profiler:
+                    self.profiler.close()
+                if self.config_watcher:
+                    self.config_watcher.stop()
                 break
             except Exception as e:
                 self.logger.error(f"❌ 监控异常: {e}")
                 time.sleep(10)
+
+
+def run_setup(args):
+    """创建默认配置文件，不连接Docker、不创建通知提供者"""
+    config_manager = ConfigManager(args.config)
+    config_manager.save_config()
+    print(f"✅ 默认配置文件已创建: {config_manager.config_file}")
+
+
+def run_replay(args):
+    """回放归档日志，输出检测到的事件和耗时统计，不发送通知"""
+    config_manager = ConfigManager(args.config)
+    monitor = ReplayLogMonitor(config_manager.settings, batch_size=args.batch_size)
+    
+    for path in args.replay:
+        container_name = args.container if args.container and len(args.replay) == 1 else container_name_for(path)
+        monitor.add_source(container_name, iter_log_lines(path, use_mmap=args.mmap))
+    
+    def print_event(error):
+        first_line = error['context'].split('\n', 1)[0]
+        print(f"🚨 [{error['timestamp']}] {error['container']} (第{error['count']}次): {first_line}")
     
-    def setup_config(self):
-        """创建默认配置文件"""
-        self.config_manager.save_config()
-        self.logger.info(f"✅ 默认配置文件已创建: {self.config_manager.config_file}")
+    stats = monitor.replay(on_event=None if args.quiet else print_event)
+    
+    print("=" * 60)
+    print(f"📊 回放完成: {stats['lines']} 行, {stats['bytes'] / 1024 / 1024:.2f} MB")
+    print(f"⏱️ 耗时 {stats['elapsed']:.2f}秒, {stats['lines_per_sec']:.0f} 行/秒, {stats['mb_per_sec']:.1f} MB/秒")
+    print(f"🔁 检查批次 {stats['ticks']} 次, 单批耗时 p50 {stats['tick_p50'] * 1000:.2f}ms / "
+          f"p99 {stats['tick_p99'] * 1000:.2f}ms / max {stats['tick_max'] * 1000:.2f}ms")
+    print(f"🚨 检测到事件 {stats['events']} 个, 去重表条目 {stats['dedup_entries']}")
+
+
+def run_templates(args):
+    """查看保存的日志模板"""
+    config_manager = ConfigManager(args.config)
+    path = config_manager.settings.get('fingerprint.state_file', '')
+    # 分片模式下每个分片一个.shard<编号>文件，集群模式下每个实例一个.<实例ID>文件
+    paths = [path] + sorted(glob.glob(f"{glob.escape(path)}.*")) if path else []
+    paths = [candidate for candidate in paths if os.path.isfile(candidate)]
+    if not paths:
+        print(f"❌ 没有找到日志模板状态文件: {path or '未配置fingerprint.state_file'}")
+        return
+    
+    for path in paths:
+        miner = DrainMiner.load(path)
+        print(f"🧬 {path}: {len(miner)} 个日志模板")
+        print("=" * 60)
+        if args.tree:
+            print(miner.format_tree())
+        else:
+            for cluster in miner.top(args.templates):
+                print(f"T{cluster.cluster_id:<8}{cluster.size:>10}次  {cluster.template_text}")
+        print()
 
 
 def main():
     parser = argparse.ArgumentParser(description='Docker日志监控器')
     parser.add_argument('--config', default='config.json', help='配置文件路径')
     parser.add_argument('--setup', action='store_true', help='创建默认配置文件')
+    parser.add_argument('--replay', nargs='+', metavar='PATH', help='回放归档日志文件（纯文本/gzip/docker json-file）')
+    parser.add_argument('--container', help='回放单个文件时使用的容器名，默认取文件名')
+    parser.add_argument('--batch-size', type=int, default=500, help='回放时每次检查读取的行数')
+    parser.add_argument('--mmap', action='store_true', help='回放未压缩文件时使用内存映射')
+    parser.add_argument('--quiet', action='store_true', help='回放时只输出统计信息')
+    parser.add_argument('--profile', action='store_true', help='启用性能分析（等同于profiling.enabled）')
+    parser.add_argument('--shards', type=int, help='分片工作进程数，大于1时启用分片模式（覆盖sharding.workers）')
+    parser.add_argument('--templates', type=int, nargs='?', const=50, metavar='N',
+                        help='查看保存的日志模板（按出现次数前N个，默认50）')
+    parser.add_argument('--tree', action='store_true', help='与--templates一起使用，按解析树展示全部模板')
     
     args = parser.parse_args()
     
+    if args.replay:
+        run_replay(args)
+        return
+    
+    if args.templates is not None:
+        run_templates(args)
+        return
+    
     if args.setup:
-        app = DockerLogMonitorApp(args.config)
-        app.setup_config()
+        run_setup(args)
         return
     
-    app = DockerLogMonitorApp(args.config)
+    app = DockerLogMonitorApp(args.config, profile=args.profile, shards=args.shards)
     app.run()
 
 
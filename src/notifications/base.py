@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any
+from .rendering import RenderedNotification
 
 
 class NotificationProvider(ABC):
@@ -15,13 +16,21 @@ class NotificationProvider(ABC):
         Args:
             title: 通知标题
             message: 通知内容
-            **kwargs: 额外参数
+            **kwargs: 额外参数，rendered为所有提供者共用的RenderedNotification
             
         Returns:
             bool: 发送是否成功
         """
         pass
     
+    @staticmethod
+    def rendered(title: str, message: str, kwargs: Dict[str, Any]) -> RenderedNotification:
+        """取出调用方传入的共享渲染缓存，单独调用send()时现场创建"""
+        rendered = kwargs.pop('rendered', None)
+        if rendered is None:
+            rendered = RenderedNotification(title, message, **kwargs)
+        return rendered
+    
     @abstractmethod
     def validate_config(self) -> bool:
         """验证配置是否有效"""
@@ -30,4 +39,8 @@ class NotificationProvider(ABC):
     @abstractmethod
     def get_name(self) -> str:
         """获取提供者名称"""
+        pass
+    
+    def close(self):
+        """释放资源，带后台发送的提供者在此写完剩余通知"""
         pass
\ No newline at end of file
@@ -4,6 +4,28 @@ from email.mime.multipart import MIMEMultipart
 from typing import Dict, Any
 from .base import NotificationProvider
 from .message_formatter import MessageFormatter
+from .rendering import CompiledTemplate
+
+# 创建HTML格式的邮件内容
+_HTML_TEMPLATE = CompiledTemplate("""
+                <html>
+                <body style="font-family: Arial, sans-serif;">
+                    <h2 style="color: #d32f2f;">{title}</h2>
+                    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px;">
+                        <pre style="white-space: pre-wrap; word-wrap: break-word;">{body}</pre>
+                    </div>
+                </body>
+                </html>
+                """, base=MessageFormatter.body_template('markdown'))
+
+# 创建纯文本格式的邮件内容
+_TEXT_TEMPLATE = CompiledTemplate("""{title}
+
+{body}
+
+---
+发送时间: {footer_timestamp}
+容器: {footer_container}""", base=MessageFormatter.body_template('text'))
 
 
 class EmailProvider(NotificationProvider):
@@ -21,41 +43,11 @@ class EmailProvider(NotificationProvider):
             msg['To'] = ', '.join(self.config['to_emails'])
             msg['Subject'] = f"[Docker监控] {title}"
             
-            # 使用格式化器生成消息内容
-            formatted_message = MessageFormatter.format_message(
-                self.format_type,
-                title=title,
-                container=kwargs.get('container', 'unknown'),
-                count=kwargs.get('count', 1),
-                threshold=kwargs.get('threshold', 1),
-                timestamp=kwargs.get('timestamp', 'unknown'),
-                context_lines=len(message.split('\n')) if message else 0,
-                context=message or "无上下文"
-            )
-            
+            notification = self.rendered(title, message, kwargs)
             if self.format_type == 'markdown':
-                # 创建HTML格式的邮件内容
-                html_content = f"""
-                <html>
-                <body style="font-family: Arial, sans-serif;">
-                    <h2 style="color: #d32f2f;">{title}</h2>
-                    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px;">
-                        <pre style="white-space: pre-wrap; word-wrap: break-word;">{formatted_message}</pre>
-                    </div>
-                </body>
-                </html>
-                """
-                msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+                msg.attach(MIMEText(notification.render(_HTML_TEMPLATE), 'html', 'utf-8'))
             else:
-                # 创建纯文本格式的邮件内容
-                text_content = f"""{title}
-
-{formatted_message}
-
----
-发送时间: {kwargs.get('timestamp', 'N/A')}
-容器: {kwargs.get('container', 'N/A')}"""
-                msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+                msg.attach(MIMEText(notification.render(_TEXT_TEMPLATE), 'plain', 'utf-8'))
             
             # 连接SMTP服务器并发送
             if self.config.get('ssl', True):
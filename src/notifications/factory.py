@@ -1,26 +1,41 @@
-from typing import Dict, Any, List
+import importlib
+from typing import Dict, Any, List, Type, Union
 from notifications.base import NotificationProvider
-from notifications.mattermost import MattermostProvider
-from notifications.email import EmailProvider
-from notifications.terminal import TerminalNotificationProvider
 
 
 class NotificationFactory:
-    """通知工厂类，用于创建和管理通知提供者"""
+    """通知工厂类，用于创建和管理通知提供者
     
-    _providers = {
-        'mattermost': MattermostProvider,
-        'email': EmailProvider,
-        'terminal': TerminalNotificationProvider,
+    内置提供者登记为"模块.类名"，创建时才导入对应模块，未启用的通知不会加载mattermostdriver、smtplib等依赖。
+    """
+    
+    _providers: Dict[str, Union[str, Type[NotificationProvider]]] = {
+        'mattermost': 'notifications.mattermost.MattermostProvider',
+        'email': 'notifications.email.EmailProvider',
+        'terminal': 'notifications.terminal.TerminalNotificationProvider',
+        # 批量写出的本地事件出口
+        'ndjson_file': 'notifications.sinks.NdjsonFileSink',
+        'unix_socket': 'notifications.sinks.UnixSocketSink',
+        'webhook': 'notifications.sinks.WebhookSink',
     }
     
     @classmethod
-    def create_provider(cls, provider_type: str, config: Dict[str, Any]) -> NotificationProvider:
-        """创建通知提供者实例"""
+    def get_provider_class(cls, provider_type: str) -> Type[NotificationProvider]:
+        """获取提供者类，首次使用时导入所在模块"""
         if provider_type not in cls._providers:
             raise ValueError(f"不支持的通知类型: {provider_type}")
         
         provider_class = cls._providers[provider_type]
+        if isinstance(provider_class, str):
+            module_name, class_name = provider_class.rsplit('.', 1)
+            provider_class = getattr(importlib.import_module(module_name), class_name)
+            cls._providers[provider_type] = provider_class
+        return provider_class
+    
+    @classmethod
+    def create_provider(cls, provider_type: str, config: Dict[str, Any]) -> NotificationProvider:
+        """创建通知提供者实例"""
+        provider_class = cls.get_provider_class(provider_type)
         provider = provider_class(config)
         
         if not provider.validate_config():
@@ -34,6 +49,6 @@ class NotificationFactory:
         return list(cls._providers.keys())
     
     @classmethod
-    def register_provider(cls, name: str, provider_class):
-        """注册新的通知提供者"""
+    def register_provider(cls, name: str, provider_class: Union[str, Type[NotificationProvider]]):
+        """注册新的通知提供者，可以传入类或"模块.类名"（创建时才导入）"""
         cls._providers[name] = provider_class
\ No newline at end of file
@@ -1,30 +1,13 @@
 from typing import Dict, Any
+from .rendering import CompiledTemplate
 
 
 class MessageFormatter:
     """消息格式化器，支持markdown和纯文本格式"""
     
-    @staticmethod
-    def format_message(format_type: str, **kwargs) -> str:
-        """根据格式类型格式化消息
-        
-        Args:
-            format_type: 'markdown' 或 'text'
-            **kwargs: 包含title, container, count, threshold, timestamp, context_lines, context
-            
-        Returns:
-            str: 格式化后的消息
-        """
-        if format_type == 'markdown':
-            return MessageFormatter._format_markdown(**kwargs)
-        else:
-            return MessageFormatter._format_text(**kwargs)
-    
-    @staticmethod
-    def _format_markdown(title: str, container: str, count: int, threshold: int, 
-                        timestamp: str, context_lines: int, context: str) -> str:
-        """格式化为markdown格式"""
-        return f"""### {title}
+    # 通知正文模板，按格式类型预编译，各提供者在此基础上加标题或HTML外壳
+    TEMPLATES = {
+        'markdown': CompiledTemplate("""### {title}
 **📦 容器:** `{container}`
 **🔢 计数:** `{count}/{threshold}` ✅
 **⏰ 时间:** `{timestamp}`
@@ -33,13 +16,8 @@ class MessageFormatter:
 **📄 完整错误上下文:**
 ```
 {context}
-```"""
-    
-    @staticmethod
-    def _format_text(title: str, container: str, count: int, threshold: int, 
-                    timestamp: str, context_lines: int, context: str) -> str:
-        """格式化为纯文本格式"""
-        return f"""{title}
+```"""),
+        'text': CompiledTemplate("""{title}
 ==================================================
 📦 容器: {container}
 🔢 计数: {count}/{threshold} ✅
@@ -47,4 +25,23 @@ class MessageFormatter:
 📊 上下文行数: {context_lines}
 
 📄 完整错误上下文:
-{context}"""
\ No newline at end of file
+{context}"""),
+    }
+    
+    @staticmethod
+    def body_template(format_type: str) -> CompiledTemplate:
+        """格式类型对应的正文模板，未知格式按纯文本处理"""
+        return MessageFormatter.TEMPLATES.get(format_type, MessageFormatter.TEMPLATES['text'])
+    
+    @staticmethod
+    def format_message(format_type: str, **kwargs) -> str:
+        """根据格式类型格式化消息
+        
+        Args:
+            format_type: 'markdown' 或 'text'
+            **kwargs: 包含title, container, count, threshold, timestamp, context_lines, context
+        
+        Returns:
+            str: 格式化后的消息
+        """
+        return MessageFormatter.body_template(format_type).render(kwargs)
\ No newline at end of file
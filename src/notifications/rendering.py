@@ -0,0 +1,99 @@
+import json
+from string import Formatter
+from typing import Any, Dict, List, Optional
+
+
+class CompiledTemplate:
+    """预编译的消息模板
+    
+    构造时用string.Formatter解析一次，把模板拆成字面文本和字段名，渲染时只做查找和拼接。
+    只支持{name}形式的字段，不支持格式说明和转换。base不为空时先渲染base，结果作为{body}字段。
+    """
+    
+    __slots__ = ('source', 'base', '_parts', '_fields')
+    
+    def __init__(self, source: str, base: Optional['CompiledTemplate'] = None):
+        self.source = source
+        self.base = base
+        # 字面文本原样保存，字段位置保存为None，渲染时按_fields中的顺序填入
+        self._parts: List[Optional[str]] = []
+        self._fields: List[tuple] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                self._parts.append(literal)
+            if field is None:
+                continue
+            if not field or spec or conversion:
+                raise ValueError(f"模板只支持{{name}}形式的字段: {source[:40]!r}")
+            self._fields.append((len(self._parts), field))
+            self._parts.append(None)
+    
+    def render(self, values: Dict[str, Any]) -> str:
+        parts = self._parts.copy()
+        for index, field in self._fields:
+            parts[index] = str(values[field])
+        return ''.join(parts)
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """编码为一行NDJSON"""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+
+
+class RenderedNotification:
+    """一条通知事件的渲染缓存
+    
+    发送通知时为每个事件创建一次，交给所有提供者共用：模板字段（包括按上下文计算的行数）只计算一次，
+    每个模板只渲染一次，多个提供者使用同一格式的正文或多个批量出口写出同一事件时直接复用结果。
+    """
+    
+    __slots__ = ('title', 'message', 'fields', '_values', '_cache', '_encoded')
+    
+    def __init__(self, title: str, message: str, **fields):
+        self.title = title
+        self.message = message
+        self.fields = fields
+        self._values: Optional[Dict[str, Any]] = None
+        self._cache: Dict[CompiledTemplate, str] = {}
+        self._encoded: Optional[bytes] = None
+    
+    @property
+    def values(self) -> Dict[str, Any]:
+        """模板可用的字段"""
+        if self._values is None:
+            fields = self.fields
+            message = self.message
+            self._values = {
+                'title': self.title,
+                'container': fields.get('container') or 'unknown',
+                'count': fields.get('count', 1),
+                'threshold': fields.get('threshold', 1),
+                'timestamp': fields.get('timestamp') or 'unknown',
+                'server': fields.get('server') or '本地',
+                'context_lines': message.count('\n') + 1 if message else 0,
+                'context': message or "无上下文",
+                # 邮件纯文本页脚的缺省值为N/A
+                'footer_timestamp': fields.get('timestamp', 'N/A'),
+                'footer_container': fields.get('container', 'N/A'),
+            }
+        return self._values
+    
+    def render(self, template: CompiledTemplate) -> str:
+        """按模板渲染，同一模板只渲染一次"""
+        text = self._cache.get(template)
+        if text is None:
+            values = self.values
+            if template.base is not None:
+                values = {**values, 'body': self.render(template.base)}
+            text = self._cache[template] = template.render(values)
+        return text
+    
+    def record(self) -> Dict[str, Any]:
+        """批量出口写出的原始事件"""
+        return {'title': self.title, 'message': self.message, **self.fields}
+    
+    def encoded(self) -> bytes:
+        """NDJSON编码结果，所有批量出口共用"""
+        if self._encoded is None:
+            self._encoded = encode_record(self.record())
+        return self._encoded
\ No newline at end of file
@@ -0,0 +1,328 @@
+import http.client
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+
+from .base import NotificationProvider
+from utils.logger import setup_logger
+from utils.metrics import SINK_EVENTS, SINK_FLUSH_DURATION, SINK_QUEUE_DEPTH
+
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+
+
+def _writev_all(fd: int, buffers: List[bytes]):
+    """用writev一次写出多条记录，处理部分写入和IOV_MAX限制"""
+    if not hasattr(os, 'writev'):
+        data = memoryview(b''.join(buffers))
+        while data:
+            data = data[os.write(fd, data):]
+        return
+    
+    views = [memoryview(buffer) for buffer in buffers]
+    index = 0
+    while index < len(views):
+        written = os.writev(fd, views[index:index + _IOV_MAX])
+        while written and index < len(views):
+            size = len(views[index])
+            if written >= size:
+                written -= size
+                index += 1
+            else:
+                views[index] = views[index][written:]
+                written = 0
+
+
+class BatchingSink(NotificationProvider):
+    """批量写出的事件出口基类
+
+    send()只把事件放入有界队列后立即返回，不阻塞主循环；后台线程在攒够batch_size条或
+    等待flush_interval秒后把一批事件编码为NDJSON交给write_batch()写出。
+    队列满时按overflow处理：drop_oldest丢弃最旧的事件（默认），drop_newest丢弃新事件，
+    block最多等待block_timeout秒。写出失败时调用reset()并在retry_interval秒后重试同一批，
+    超过max_retries次后丢弃。紧急告警（带priority字段）放入单独的队列，按到达顺序排在下一批最前、
+    不等攒批立即写出；紧急告警已按冷却时间限流，不占用max_queue，也不会因队列满被丢弃。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.batch_size = max(1, config.get('batch_size', 100))
+        self.flush_interval = config.get('flush_interval', 1.0)
+        self.max_queue = max(1, config.get('max_queue', 10000))
+        self.overflow = config.get('overflow', 'drop_oldest')
+        self.block_timeout = config.get('block_timeout', 1.0)
+        self.max_retries = config.get('max_retries', 3)
+        self.retry_interval = config.get('retry_interval', 1.0)
+        self.stats = {'accepted': 0, 'written': 0, 'dropped': 0, 'failed': 0}
+        self.logger = setup_logger()
+        
+        self._queue = deque()
+        self._urgent = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+    
+    def validate_config(self) -> bool:
+        return self.overflow in ('drop_oldest', 'drop_newest', 'block')
+    
+    def write_batch(self, payload: List[bytes]):
+        """写出一批已编码的记录，失败时抛出异常"""
+        raise NotImplementedError
+    
+    def reset(self):
+        """写出失败后丢弃连接或文件句柄，下次写出时重新建立"""
+    
+    def release(self):
+        """关闭时释放资源"""
+        self.reset()
+    
+    def send(self, title: str, message: str, **kwargs) -> bool:
+        """事件入队，返回False表示因队列已满或已关闭被丢弃"""
+        urgent = bool(kwargs.get('priority'))
+        record = self.rendered(title, message, kwargs)
+        name = self.get_name()
+        
+        with self._cond:
+            if self._closed:
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'sink-{name}', daemon=True)
+                self._thread.start()
+            
+            if urgent:
+                self.stats['accepted'] += 1
+                self._urgent.append(record)
+                self._cond.notify_all()
+                return True
+            
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == 'block':
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                if self.overflow == 'drop_oldest':
+                    self._queue.popleft()
+                    self._drop(name)
+                elif len(self._queue) >= self.max_queue or self._closed:
+                    self._drop(name)
+                    return False
+            
+            self.stats['accepted'] += 1
+            self._queue.append(record)
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+    
+    def _drop(self, name: str):
+        self.stats['dropped'] += 1
+        SINK_EVENTS.inc(1, (name, 'dropped'))
+    
+    def _run(self):
+        name = self.get_name()
+        while True:
+            with self._cond:
+                while not self._queue and not self._urgent and not self._closed:
+                    self._cond.wait()
+                if not self._queue and not self._urgent:
+                    return
+                
+                # 攒批：未满batch_size时最多再等flush_interval秒
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._closed and not self._urgent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                
+                batch = [self._urgent.popleft() for _ in range(min(self.batch_size, len(self._urgent)))]
+                batch += [self._queue.popleft() for _ in range(min(self.batch_size - len(batch), len(self._queue)))]
+                SINK_QUEUE_DEPTH.set(len(self._queue) + len(self._urgent), (name,))
+                # 唤醒等待队列空位的send()
+                self._cond.notify_all()
+            
+            # 多个出口写出同一事件时共用编码结果
+            self._write(name, [record.encoded() for record in batch])
+    
+    def _write(self, name: str, payload: List[bytes]):
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self.write_batch(payload)
+                SINK_FLUSH_DURATION.observe(time.perf_counter() - start, (name,))
+                self.stats['written'] += len(payload)
+                SINK_EVENTS.inc(len(payload), (name, 'written'))
+                return
+            except Exception as e:
+                self.logger.warning(f"⚠️ {name} 写出 {len(payload)} 条事件失败(第{attempt + 1}次): {e}")
+                self.reset()
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_interval)
+        
+        self.stats['failed'] += len(payload)
+        SINK_EVENTS.inc(len(payload), (name, 'failed'))
+        self.logger.error(f"❌ {name} 丢弃 {len(payload)} 条写出失败的事件")
+    
+    def close(self, timeout: float = 5.0):
+        """写完队列中剩余的事件后释放资源
+
+        写出线程在timeout秒内没有退出时不释放资源，避免关闭仍在写出的连接或文件句柄。
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                with self._cond:
+                    pending = len(self._queue) + len(self._urgent)
+                self.logger.warning(f"⚠️ {self.get_name()} 写出线程 {timeout}秒内未结束，放弃等待，"
+                                    f"队列中剩余的 {pending} 条事件可能不会写出")
+                return
+        self.release()
+
+
+class NdjsonFileSink(BatchingSink):
+    """追加写入NDJSON文件，每批事件一次writev，超过max_bytes时轮转"""
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.path = config.get('path', 'events/events.ndjson')
+        self.max_bytes = config.get('max_bytes', 100 * 1024 * 1024)
+        self.backup_count = config.get('backup_count', 5)
+        self._fd = None
+        self._size = 0
+    
+    def get_name(self) -> str:
+        return "NDJSON文件"
+    
+    def validate_config(self) -> bool:
+        return super().validate_config() and bool(self.path)
+    
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = os.fstat(self._fd).st_size
+    
+    def _rotate(self):
+        """events.ndjson -> events.ndjson.1 -> ... -> events.ndjson.<backup_count>"""
+        self.reset()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+    
+    def write_batch(self, payload: List[bytes]):
+        if self._fd is None:
+            self._open()
+        size = sum(map(len, payload))
+        if self.max_bytes and self._size and self._size + size > self.max_bytes:
+            self._rotate()
+        _writev_all(self._fd, payload)
+        self._size += size
+    
+    def reset(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class UnixSocketSink(BatchingSink):
+    """通过Unix域套接字（流式）发送NDJSON，断开后自动重连"""
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.path = config.get('path', '')
+        self.timeout = config.get('timeout', 5)
+        self._sock = None
+    
+    def get_name(self) -> str:
+        return "Unix套接字"
+    
+    def validate_config(self) -> bool:
+        return super().validate_config() and bool(self.path) and hasattr(socket, 'AF_UNIX')
+    
+    def write_batch(self, payload: List[bytes]):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        self._sock.sendall(b''.join(payload))
+    
+    def reset(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class WebhookSink(BatchingSink):
+    """把一批事件POST到HTTP接口，复用keep-alive连接
+
+    format为ndjson时请求体是NDJSON（application/x-ndjson），为json时是JSON数组。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.url = config.get('url', '')
+        self.headers = config.get('headers', {})
+        self.format = config.get('format', 'ndjson')
+        self.timeout = config.get('timeout', 5)
+        self._conn = None
+        parts = urlsplit(self.url)
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+    
+    def get_name(self) -> str:
+        return "Webhook"
+    
+    def validate_config(self) -> bool:
+        return (super().validate_config() and self._scheme in ('http', 'https') and bool(self._netloc)
+                and self.format in ('ndjson', 'json'))
+    
+    def write_batch(self, payload: List[bytes]):
+        if self.format == 'json':
+            body = b'[' + b','.join(record.rstrip(b'\n') for record in payload) + b']'
+            content_type = 'application/json'
+        else:
+            body = b''.join(payload)
+            content_type = 'application/x-ndjson'
+        
+        if self._conn is None:
+            connection_class = http.client.HTTPSConnection if self._scheme == 'https' else http.client.HTTPConnection
+            self._conn = connection_class(self._netloc, timeout=self.timeout)
+        self._conn.request('POST', self._path, body=body, headers={
+            'Content-Type': content_type,
+            'Connection': 'keep-alive',
+            **self.headers,
+        })
+        response = self._conn.getresponse()
+        # 读完响应体才能复用连接
+        response.read()
+        if response.status >= 300:
+            raise RuntimeError(f"HTTP {response.status} {response.reason}")
+    
+    def reset(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
\ No newline at end of file
@@ -24,17 +24,11 @@ class TerminalNotificationProvider(NotificationProvider):
             return False
             
         try:
-            # 使用格式化器生成消息
-            formatted_message = MessageFormatter.format_message(
-                self.format_type,
-                title=title,
-                container=container or "unknown",
-                count=count,
-                threshold=kwargs.get('threshold', count),
-                timestamp=timestamp or "unknown",
-                context_lines=len(message.split('\n')) if message else 0,
-                context=message or "无上下文"
-            )
+            notification = self.rendered(title, message, {
+                **kwargs, 'container': container, 'timestamp': timestamp,
+                'count': count, 'threshold': kwargs.get('threshold', count),
+            })
+            formatted_message = notification.render(MessageFormatter.body_template(self.format_type))
 
             print(f"\n{formatted_message}")
             return True
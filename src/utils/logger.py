@@ -1,39 +1,193 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-import os
-from datetime import datetime
+import threading
+import time
 from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_LOG_DIR = Path(__file__).parent.parent.parent / 'logs'
+# 日志队列上限，写出跟不上时丢弃新日志而不是阻塞调用方
+QUEUE_SIZE = 10000
+
+
+class RateLimitFilter(logging.Filter):
+    """重复日志限流
+    
+    同一条min_level及以上级别的消息（按未格式化的消息文本区分）在interval秒内最多记录burst条，
+    其余丢弃；窗口结束后该消息再次出现时注明此前省略的条数。interval为0时不限流。
+    """
+    
+    def __init__(self, interval: float = 60.0, burst: int = 5, min_level: int = logging.WARNING,
+                 max_keys: int = 1000):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.min_level = min_level
+        self.max_keys = max_keys
+        # 消息 -> [窗口开始时间, 窗口内出现次数, 窗口内省略次数]，按窗口开始时间排列
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level or self.interval <= 0:
+            return True
+        
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None and now - window[0] < self.interval:
+                window[1] += 1
+                if window[1] <= self.burst:
+                    return True
+                window[2] += 1
+                return False
+            
+            suppressed = window[2] if window is not None else 0
+            self._windows.pop(key, None)
+            self._windows[key] = [now, 1, 0]
+            while len(self._windows) > self.max_keys:
+                del self._windows[next(iter(self._windows))]
+        
+        if suppressed:
+            record.msg = f"{record.msg} (此前{self.interval:g}秒内重复的{suppressed}条已省略)"
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """只把日志放入队列的处理器，队列满时丢弃并在之后补记丢弃条数"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同一进程内由监听线程格式化，调用方不做格式化
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.dropped:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': record.name, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"⚠️ 日志队列已满，丢弃了 {self.dropped} 条日志",
+                }))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LoggerState:
+    """一个日志记录器的队列、后台写出线程和实际写出的处理器"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+        self.queue: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self.handler = _NonBlockingQueueHandler(self.queue)
+        self.rate_limit = RateLimitFilter()
+        self.handler.addFilter(self.rate_limit)
+        self.file_options: Optional[tuple] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        
+        self.console = logging.StreamHandler(sys.stdout)
+        self.console.setFormatter(self.formatter)
+        self.start(DEFAULT_LOG_DIR, backup_count=7, rotate=True)
+        atexit.register(self.stop)
+    
+    def _file_handler(self, log_dir: Path, backup_count: int, rotate: bool) -> logging.Handler:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        log_file = log_dir / f'{self.name}.log'
+        if rotate:
+            # 每天零点切换，旧文件为 <name>.log.YYYY-MM-DD
+            handler = logging.handlers.TimedRotatingFileHandler(
+                log_file, when='midnight', backupCount=backup_count, encoding='utf-8')
+        else:
+            # 由其他进程负责切换，文件被改名后自动重新打开
+            handler = logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+        handler.setFormatter(self.formatter)
+        return handler
+    
+    def start(self, log_dir: Path, backup_count: int, rotate: bool):
+        """按文件选项（重新）启动后台写出线程，先写完队列中已有的日志"""
+        options = (Path(log_dir), backup_count, rotate)
+        if options == self.file_options:
+            return
+        
+        handlers = [self.console]
+        try:
+            handlers.append(self._file_handler(*options))
+        except OSError as e:
+            print(f"❌ 无法写入日志目录 {log_dir}: {e}", file=sys.stderr)
+        
+        self.stop()
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers)
+        self.listener.start()
+        self.file_options = options
+    
+    def stop(self):
+        """写完队列中的日志并停止后台线程"""
+        listener, self.listener = self.listener, None
+        if listener is None:
+            return
+        listener.stop()
+        for handler in listener.handlers:
+            if handler is not self.console:
+                handler.close()
+
+
+_states: Dict[str, _LoggerState] = {}
+_states_lock = threading.Lock()
 
 
 def setup_logger(name: str = 'docker_monitor', level: int = logging.INFO) -> logging.Logger:
-    """设置日志记录器"""
+    """设置日志记录器
+    
+    调用方只把日志放入队列，控制台和按天切换的日志文件由后台线程写出，不会因为磁盘或标准输出阻塞。
+    """
     logger = logging.getLogger(name)
     
     if logger.handlers:
         return logger
     
+    with _states_lock:
+        if logger.handlers:
+            return logger
+        state = _states[name] = _LoggerState(name)
+        logger.setLevel(level)
+        logger.addHandler(state.handler)
+    
+    return logger
+
+
+def configure_logging(config: Dict[str, Any], name: str = 'docker_monitor', rotate: Optional[bool] = None):
+    """按配置中的logging部分调整日志级别、限流和日志文件，可在运行中重复调用
+    
+    rotate为False时不按天切换日志文件，用于与主进程写同一文件的子进程。
+    """
+    logger = setup_logger(name)
+    state = _states[name]
+    options = config.get('logging', {})
+    
+    level_name = str(options.get('level', 'INFO')).upper()
+    level = logging.getLevelName(level_name)
+    if not isinstance(level, int):
+        logger.warning(f"⚠️ 未知的日志级别 {level_name}，使用INFO")
+        level = logging.INFO
     logger.setLevel(level)
     
-    # 创建格式化器
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # 创建控制台处理器
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # 创建文件处理器
-    log_dir = Path(__file__).parent.parent.parent / 'logs'
-    log_dir.mkdir(exist_ok=True)
-    
-    log_file = log_dir / f'{name}_{datetime.now().strftime("%Y%m%d")}.log'
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(level)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+    rate_limit = options.get('rate_limit', {})
+    state.rate_limit.interval = rate_limit.get('interval', 60)
+    state.rate_limit.burst = rate_limit.get('burst', 5)
+    
+    # 相对路径相对于项目根目录，与默认的logs目录一致
+    log_dir = DEFAULT_LOG_DIR.parent / options.get('dir', 'logs')
+    state.start(log_dir, options.get('backup_count', 7),
+                options.get('rotate', True) if rotate is None else rotate)
\ No newline at end of file
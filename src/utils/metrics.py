@@ -0,0 +1,275 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.logger import setup_logger
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    """转义标签值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence, extra: str = '') -> str:
+    """生成 {a="x",b="y"} 形式的标签串"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类，按标签值元组保存样本"""
+    type_name = ''
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    type_name = 'counter'
+    
+    def inc(self, amount: float = 1, labels: Tuple = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    type_name = 'gauge'
+    
+    def set(self, value: float, labels: Tuple = ()):
+        with self._lock:
+            self._values[labels] = value
+    
+    def remove(self, labels: Tuple):
+        with self._lock:
+            self._values.pop(labels, None)
+
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+    type_name = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数..., sum, count]
+        self._series: Dict[Tuple, List[float]] = {}
+    
+    def observe(self, value: float, labels: Tuple = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = [0] * (len(self.buckets) + 2)
+                self._series[labels] = series
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {_format_value(series[-1])}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    除了直接更新的指标外，还可以注册采集函数，在导出时现场读取状态
+    （例如SSH连接池统计）。采集函数返回 [(name, type, help, [(labels_dict, value), ...]), ...]。
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable] = []
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def register_collector(self, collector: Callable):
+        """注册导出时调用的采集函数"""
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def unregister_collector(self, collector: Callable):
+        """注销采集函数"""
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+    
+    def render(self) -> str:
+        """导出Prometheus文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                setup_logger().error(f"指标采集失败: {e}")
+                continue
+            for name, type_name, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                for labels, value in samples:
+                    label_str = _format_labels(list(labels.keys()), list(labels.values()))
+                    lines.append(f"{name}{label_str} {_format_value(value)}")
+        
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# 监控热路径指标
+LINES_INGESTED = registry.counter(
+    'dlog_lines_ingested_total', '读取到的日志行数', ['server', 'container'])
+BYTES_FETCHED = registry.counter(
+    'dlog_bytes_fetched_total', '读取到的日志字节数（解码后）', ['server', 'container'])
+FILTER_CHECKED = registry.counter(
+    'dlog_filter_checked_total', '经过过滤规则检查的日志行数', ['server'])
+FILTER_MATCHED = registry.counter(
+    'dlog_filter_matched_total', '命中过滤规则的日志行数', ['server'])
+STAGE_DURATION = registry.histogram(
+    'dlog_stage_duration_seconds', '各处理阶段耗时', ['stage'])
+DEDUP_ENTRIES = registry.gauge(
+    'dlog_dedup_entries', '去重表条目数', ['server'])
+SSH_BYTES_RECEIVED = registry.counter(
+    'dlog_ssh_bytes_received_total', '从远程服务器接收的字节数（压缩后）', ['server'])
+OVERLOAD_LINES = registry.counter(
+    'dlog_overload_lines_total', '因过载或缓冲区已满未分类的日志行数（dropped/sampled/evicted）',
+    ['server', 'container', 'result'])
+TRUNCATED_FETCHES = registry.counter(
+    'dlog_truncated_fetches_total', '读取达到docker logs --tail上限、更早的新日志未被读取的次数',
+    ['server', 'container'])
+DEGRADED_CONTAINERS = registry.gauge(
+    'dlog_degraded_containers', '处于过载降级模式的容器数', ['server'])
+PRIORITY_EVENTS = registry.counter(
+    'dlog_priority_events_total', '紧急告警快速通道的事件数（sent/suppressed）', ['result'])
+
+# 通知指标
+NOTIFICATION_DURATION = registry.histogram(
+    'dlog_notification_duration_seconds', '通知发送耗时', ['provider'])
+NOTIFICATIONS_SENT = registry.counter(
+    'dlog_notifications_total', '通知发送次数', ['provider', 'result'])
+SINK_EVENTS = registry.counter(
+    'dlog_sink_events_total', '批量出口处理的事件数（written/dropped/failed）', ['sink', 'result'])
+SINK_QUEUE_DEPTH = registry.gauge(
+    'dlog_sink_queue_depth', '批量出口队列中等待写出的事件数', ['sink'])
+SINK_FLUSH_DURATION = registry.histogram(
+    'dlog_sink_flush_duration_seconds', '批量出口每批写出耗时', ['sink'])
+
+# 故障关联指标
+CORRELATED_EVENTS = registry.counter(
+    'dlog_correlation_events_total', '关联阶段收到、发出的通知事件数和超出上限淘汰的故障数（received/notified/evicted）', ['result'])
+OPEN_INCIDENTS = registry.gauge(
+    'dlog_open_incidents', '关联窗口内尚未关闭的故障数')
+
+# 主循环指标
+TICK_DURATION = registry.histogram(
+    'dlog_tick_duration_seconds', '每轮检查耗时')
+TICK_OVERRUNS = registry.counter(
+    'dlog_tick_overruns_total', '单轮耗时超过check_interval的次数')
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """/metrics 请求处理"""
+    registry: MetricsRegistry = registry
+    
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """在本地端口上以Prometheus文本格式导出指标"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 9108,
+                 metrics_registry: Optional[MetricsRegistry] = None):
+        self.host = host
+        self.port = port
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': metrics_registry or registry})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+    
+    def start(self):
+        """在后台线程中启动HTTP服务"""
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """停止HTTP服务"""
+        self.server.shutdown()
+        self.server.server_close()
\ No newline at end of file
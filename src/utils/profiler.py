@@ -0,0 +1,266 @@
+import cProfile
+import io
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter as _Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import setup_logger
+
+
+# 监控器方法 -> (阶段名, 第一个参数是否为容器名)。fetch包含split（本地日志的解码和切分）
+STAGE_METHODS = (
+    ('get_container_logs', 'fetch', True),
+    ('split_log_lines', 'split', True),
+    ('should_notify', 'filter', True),
+    ('get_fingerprint', 'fingerprint', False),
+    ('aggregate_error_context', 'context', True),
+)
+
+# 参数中没有容器名的阶段按服务器汇总，记在这个容器名下
+ALL_CONTAINERS = '*'
+
+
+class _StageStats:
+    __slots__ = ('calls', 'total', 'max')
+    
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class _Sampler(threading.Thread):
+    """采样分析器：定时抓取所有线程的调用栈，可以覆盖线程池中的远程处理"""
+    
+    def __init__(self, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = _Counter()
+        self.total_counts = _Counter()
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.samples += 1
+                seen = set()
+                top = True
+                while frame is not None:
+                    code = frame.f_code
+                    key = f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+                    if top:
+                        self.self_counts[key] += 1
+                        top = False
+                    if key not in seen:
+                        self.total_counts[key] += 1
+                        seen.add(key)
+                    frame = frame.f_back
+    
+    def stop(self) -> str:
+        self._stop_event.set()
+        self.join()
+        lines = [f"采样 {self.samples} 次（间隔 {self.interval * 1000:.0f}ms，覆盖所有线程）", "",
+                 f"{'self%':>7} {'total%':>7}  函数"]
+        for key, count in self.self_counts.most_common(40):
+            lines.append(f"{count / max(self.samples, 1):>7.1%} {self.total_counts[key] / max(self.samples, 1):>7.1%}  {key}")
+        return '\n'.join(lines)
+
+
+class LoopProfiler:
+    """监控循环的按需性能分析
+
+    - 阶段计时：包装监控器实例上的方法，按(服务器, 容器, 阶段)累计调用次数和耗时，未开启时没有任何开销
+    - 深度分析：收到SIGUSR1或到达dump_interval时，先导出阶段报告，再对接下来的profile_ticks轮
+      运行cProfile（只覆盖主线程）或采样分析器（覆盖所有线程），结束后写入文件
+    """
+    
+    def __init__(self, output_dir: str = 'profiles', mode: str = 'cprofile', profile_ticks: int = 10,
+                 dump_interval: float = 0, sample_interval: float = 0.005):
+        if mode not in ('cprofile', 'sampling'):
+            raise ValueError(f"不支持的分析模式: {mode}")
+        self.output_dir = Path(output_dir)
+        self.mode = mode
+        self.profile_ticks = profile_ticks
+        self.dump_interval = dump_interval
+        self.sample_interval = sample_interval
+        self.logger = setup_logger()
+        
+        self._stats: Dict[Tuple[str, str, str], _StageStats] = {}
+        self._lock = threading.Lock()
+        self._dump_requested = False
+        self._window_start = time.time()
+        self._last_dump = time.time()
+        self._ticks: List[float] = []
+        self._overruns = 0
+        
+        self._active = None
+        self._remaining_ticks = 0
+    
+    def install_signal_handler(self):
+        """注册SIGUSR1，收到信号后在本轮结束时导出"""
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.request_dump())
+            return True
+        return False
+    
+    def request_dump(self):
+        """请求导出（可在信号处理函数中调用）"""
+        self._dump_requested = True
+    
+    def instrument(self, monitor):
+        """为监控器实例安装阶段计时，重复调用无副作用"""
+        if getattr(monitor, '_profiled', False):
+            return
+        server = getattr(monitor, 'server_label', 'local')
+        for method_name, stage, per_container in STAGE_METHODS:
+            func = getattr(monitor, method_name, None)
+            if func is not None:
+                setattr(monitor, method_name, self._wrap(server, stage, func, per_container))
+        monitor._profiled = True
+    
+    def _wrap(self, server: str, stage: str, func, per_container: bool = True):
+        record = self.record
+        perf_counter = time.perf_counter
+        
+        if not per_container:
+            def stage_wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    record(server, ALL_CONTAINERS, stage, perf_counter() - start)
+            return stage_wrapper
+        
+        def wrapper(container_name, *args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(container_name, *args, **kwargs)
+            finally:
+                record(server, container_name, stage, perf_counter() - start)
+        return wrapper
+    
+    def record(self, server: str, container_name: str, stage: str, seconds: float):
+        """累计一次阶段耗时"""
+        key = (server, container_name, stage)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _StageStats()
+            stats.calls += 1
+            stats.total += seconds
+            if seconds > stats.max:
+                stats.max = seconds
+    
+    def begin_tick(self, monitors: Iterable):
+        """每轮开始时调用"""
+        for monitor in monitors:
+            self.instrument(monitor)
+    
+    def end_tick(self, duration: float, check_interval: float):
+        """每轮结束时调用，处理导出请求和深度分析的启停"""
+        self._ticks.append(duration)
+        if duration > check_interval:
+            self._overruns += 1
+        
+        if self._active is not None:
+            self._remaining_ticks -= 1
+            if self._remaining_ticks <= 0:
+                self._finish_profile()
+        
+        due = self.dump_interval and time.time() - self._last_dump >= self.dump_interval
+        if self._dump_requested or due:
+            self._dump_requested = False
+            self._last_dump = time.time()
+            self.dump_stages()
+            if self._active is None and self.profile_ticks > 0:
+                self._start_profile()
+    
+    def _start_profile(self):
+        if self.mode == 'cprofile':
+            self._active = cProfile.Profile()
+            self._active.enable()
+        else:
+            self._active = _Sampler(self.sample_interval)
+            self._active.start()
+        self._remaining_ticks = self.profile_ticks
+        self.logger.info(f"🔬 开始{self.mode}分析，持续 {self.profile_ticks} 轮")
+    
+    def _finish_profile(self):
+        active, self._active = self._active, None
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        if isinstance(active, cProfile.Profile):
+            active.disable()
+            stats_file = self.output_dir / f'profile-{stamp}.pstats'
+            active.dump_stats(str(stats_file))
+            text = io.StringIO()
+            pstats.Stats(active, stream=text).sort_stats('cumulative').print_stats(40)
+            report = text.getvalue()
+        else:
+            stats_file = None
+            report = active.stop()
+        
+        report_file = self.output_dir / f'profile-{stamp}.txt'
+        report_file.write_text(report, encoding='utf-8')
+        self.logger.info(f"🔬 分析结果已写入: {stats_file or report_file}")
+    
+    def format_stages(self) -> str:
+        """生成阶段耗时报告"""
+        with self._lock:
+            items = [(key, stats.calls, stats.total, stats.max) for key, stats in self._stats.items()]
+        ticks = list(self._ticks)
+        window = time.time() - self._window_start
+        
+        lines = [f"统计窗口: {window:.0f}秒, {len(ticks)} 轮"]
+        if ticks:
+            lines.append(f"每轮耗时: 平均 {sum(ticks) / len(ticks) * 1000:.1f}ms, "
+                         f"最大 {max(ticks) * 1000:.1f}ms, 超过检查间隔 {self._overruns} 轮")
+        lines.append("注: fetch包含split；远程容器的解码和切分在fetch中完成")
+        
+        by_stage: Dict[str, List[float]] = {}
+        for (_, _, stage), calls, total, _ in items:
+            entry = by_stage.setdefault(stage, [0, 0.0])
+            entry[0] += calls
+            entry[1] += total
+        
+        lines += ["", "== 按阶段 ==", f"{'阶段':<12}{'调用次数':>12}{'总耗时ms':>14}{'平均us':>12}"]
+        for stage, (calls, total) in sorted(by_stage.items(), key=lambda x: -x[1][1]):
+            lines.append(f"{stage:<12}{calls:>12}{total * 1000:>14.1f}{total / calls * 1e6:>12.1f}")
+        
+        lines += ["", "== 按容器 ==", f"{'服务器':<16}{'容器':<28}{'阶段':<12}{'调用次数':>10}"
+                  f"{'总耗时ms':>12}{'平均us':>10}{'最大ms':>10}"]
+        for (server, container, stage), calls, total, max_time in sorted(items, key=lambda x: -x[2]):
+            lines.append(f"{server:<16}{container:<28}{stage:<12}{calls:>10}{total * 1000:>12.1f}"
+                         f"{total / calls * 1e6:>10.1f}{max_time * 1000:>10.2f}")
+        return '\n'.join(lines)
+    
+    def dump_stages(self) -> Optional[Path]:
+        """把阶段报告写入文件并开始新的统计窗口"""
+        report = self.format_stages()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"stages-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+        path.write_text(report, encoding='utf-8')
+        
+        with self._lock:
+            self._stats.clear()
+        self._ticks = []
+        self._overruns = 0
+        self._window_start = time.time()
+        self.logger.info(f"📝 阶段耗时报告已写入: {path}")
+        return path
+    
+    def close(self):
+        """停止进行中的分析并导出"""
+        if self._active is not None:
+            self._finish_profile()
\ No newline at end of file
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
+import os
+import subprocess
 import sys
 import json
+import tempfile
+import time
 from pathlib import Path
 
 # 添加src目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
+from core.cluster import SharedDedupTracker
 from core.config import ConfigManager
+from core.correlation import IncidentCorrelator
+from core.dedup import DedupTracker
+from core.health import CircuitState, ServerHealthTracker
+from core.settings import Settings
 from core.remote_monitor import MultiServerMonitor
 from core.monitor import DockerLogMonitor
+from core.remote_filter import RemoteLogFilter
+from utils.profiler import ALL_CONTAINERS, LoopProfiler
 
 def test_config():
     """测试配置加载"""
@@ -24,6 +35,40 @@ def test_config():
     
     return True
 
+def test_config_set_rebuilds_settings():
+    """测试set()同步更新settings，且settings.raw不能被修改"""
+    print("🧪 测试配置修改后的settings...")
+    with tempfile.TemporaryDirectory() as workdir:
+        cm = ConfigManager(os.path.join(workdir, 'config.json'))
+    
+    cm.set('error_threshold', 7)
+    cm.set('context_settings.max_context_lines', 40)
+    assert cm.settings.error_threshold == 7
+    assert cm.settings.max_context_lines == 40
+    assert cm.settings.get('context_settings.max_context_lines') == 40
+    
+    try:
+        cm.set('error_threshold', 'many')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("无效的配置值应被拒绝")
+    assert cm.get('error_threshold') == 7, "校验失败时配置应保持不变"
+    
+    for mutate in (lambda raw: raw.__setitem__('error_threshold', 1),
+                   lambda raw: raw['context_settings'].__setitem__('max_context_lines', 1),
+                   lambda raw: raw['log_levels'].append('DEBUG')):
+        try:
+            mutate(cm.settings.raw)
+        except (TypeError, AttributeError):
+            pass
+        else:
+            raise AssertionError("settings.raw不应允许修改")
+    assert cm.settings.to_dict() == cm.config
+    print("✅ set()后settings与配置一致，raw只读")
+    
+    return True
+
 def test_local_monitor():
     """测试本地监控器"""
     print("🧪 测试本地监控器...")
@@ -54,14 +99,120 @@ def test_remote_monitor():
     
     return True
 
+def test_dedup_mark_notified():
+    """测试快速通道发出的通知在两种去重状态中都进入冷却"""
+    print("🧪 测试去重状态记录快速通道通知...")
+    settings = Settings({'error_threshold': 1, 'cooldown_minutes': 30})
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        shared = SharedDedupTracker(settings, os.path.join(workdir, 'cluster.db'))
+        for tracker in (DedupTracker(settings), shared):
+            tracker.mark_notified('app:E1', 1700000000.0)
+            should_send, _ = tracker.record('app:E1', 1700000001.0)
+            assert not should_send, f"{type(tracker).__name__} 冷却期内重复通知"
+            print(f"✅ {type(tracker).__name__}: 冷却期内不再重复通知")
+        shared.store.close()
+    
+    return True
+
+def test_profiler_stage_keys():
+    """测试阶段计时只按容器名（或汇总标签）累计，不把日志内容当作容器"""
+    print("🧪 测试阶段计时的统计键...")
+    monitor = DockerLogMonitor(Settings({'fingerprint': {'mode': 'regex'}}))
+    with tempfile.TemporaryDirectory() as workdir:
+        profiler = LoopProfiler(output_dir=workdir)
+        profiler.instrument(monitor)
+        for i in range(5):
+            line = f"2024-01-01T00:00:0{i}Z ERROR request {i} failed"
+            monitor.should_notify('app', line)
+            monitor.get_fingerprint(line)
+    
+    keys = set(profiler._stats)
+    assert keys == {('local', 'app', 'filter'), ('local', ALL_CONTAINERS, 'fingerprint')}, keys
+    print(f"✅ 统计键: {sorted(keys)}")
+    
+    return True
+
+def test_half_open_probe_without_result():
+    """测试半开探测因非连接错误中断、没有记录结果时，退避结束后重新放行探测"""
+    print("🧪 测试半开探测没有结果时的重试...")
+    tracker = ServerHealthTracker(failure_threshold=1, base_backoff=0.05, max_backoff=0.05)
+    tracker.record_failure('server-1')
+    assert not tracker.allow_request('server-1')
+    time.sleep(0.06)
+    
+    # 探测中抛出KeyError等非连接错误，_session不记录成功或失败
+    assert tracker.allow_request('server-1')
+    assert not tracker.allow_request('server-1'), "同一退避时间内只放行一个探测"
+    time.sleep(0.06)
+    assert tracker.allow_request('server-1'), "半开探测没有结果时不应一直跳过该服务器"
+    
+    tracker.record_success('server-1')
+    assert tracker.get_states()['server-1'] == CircuitState.CLOSED
+    print("✅ 半开探测没有结果时，退避结束后重新探测")
+    
+    return True
+
+def test_remote_filter_keeps_long_trace():
+    """测试远程预过滤保留长堆栈末尾的Caused by:和最终异常行"""
+    print("🧪 测试远程预过滤保留完整堆栈...")
+    stamp = '2024-01-01T00:00:00.000000000Z'
+    logs = [f"{stamp} [INFO] request {i} ok" for i in range(20)]
+    logs.append(f"{stamp} [ERROR] Failed to process order")
+    logs.append(f"{stamp} java.lang.IllegalStateException: order 42")
+    logs += [f"{stamp} \tat com.example.Service.step{i}(Service.java:{i})" for i in range(60)]
+    logs.append(f"{stamp} Caused by: java.sql.SQLException: connection reset")
+    logs += [f"{stamp} \tat com.example.Dao.query{i}(Dao.java:{i})" for i in range(30)]
+    logs += [f"{stamp} [INFO] request {i} ok" for i in range(100, 200)]
+    
+    log_filter = RemoteLogFilter(['ERROR'], before=2, after=3)
+    with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as f:
+        f.write('\n'.join(logs) + '\n')
+    try:
+        result = subprocess.run(['sh', '-c', log_filter.wrap(f"cat {f.name}")], capture_output=True, text=True)
+    finally:
+        os.unlink(f.name)
+    
+    lines = result.stdout.splitlines()
+    assert any('Caused by: java.sql.SQLException' in line for line in lines), "堆栈末尾的Caused by:被截掉"
+    assert any('Dao.query29' in line for line in lines), "堆栈最后一帧被截掉"
+    assert lines == logs[18:113 + 3], "应只保留前2行、完整堆栈和之后3行"
+    print(f"✅ 预过滤保留 {len(lines)}/{len(logs)} 行，堆栈完整")
+    
+    return True
+
+def test_correlation_evict_pending():
+    """测试故障数超过上限时，被淘汰的等待中故障先发送而不是丢弃"""
+    print("🧪 测试故障索引超出上限时的淘汰...")
+    correlator = IncidentCorrelator(Settings({'correlation': {'group_wait': 60, 'max_incidents': 3}}))
+    events = [{'container': 'app', 'server': 'server-1', 'count': 1, 'fingerprint': f"fp-{i}",
+               'context': f"ERROR {i}"} for i in range(5)]
+    
+    output = correlator.process(events, now=1000.0)
+    assert [event['fingerprint'] for event in output] == ['fp-0', 'fp-1'], output
+    assert list(correlator.incidents) == ['fp-2', 'fp-3', 'fp-4']
+    assert correlator.process([], now=1010.0) == [], "未到group_wait的故障不应提前发送"
+    
+    output = correlator.process([], now=1060.0)
+    assert [event['fingerprint'] for event in output] == ['fp-2', 'fp-3', 'fp-4'], output
+    print("✅ 淘汰的故障在淘汰前发送，没有丢失事件")
+    
+    return True
+
 def main():
     print("🚀 Docker日志远程监控测试")
     print("=" * 50)
     
     try:
         test_config()
+        test_config_set_rebuilds_settings()
         test_local_monitor()
         test_remote_monitor()
+        test_dedup_mark_notified()
+        test_profiler_stage_keys()
+        test_half_open_probe_without_result()
+        test_remote_filter_keeps_long_trace()
+        test_correlation_evict_pending()
         
         print("\n✅ 所有测试通过！")
         print("\n📋 使用说明:")